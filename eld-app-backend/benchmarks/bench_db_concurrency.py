@@ -0,0 +1,172 @@
+"""
+Benchmark SQLite write throughput under parallel trip creation.
+
+Each profile runs against a fresh database file: writer processes save planned trips the way trip
+creation does (the trip and its stops, then its ELD logs and the driver's cycle ledger in one
+transaction), while reader processes poll the latest trips with their stops. Compares SQLite's
+defaults with the tuned profile from settings.py (WAL, synchronous=NORMAL, mmap, busy timeout and
+IMMEDIATE transactions) and reports trips per second and "database is locked" failures.
+
+Usage:
+    python benchmarks/bench_db_concurrency.py [--writers 32] [--readers 4] [--trips 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PROFILES = {
+    # Django's SQLite defaults: rollback journal, deferred transactions, 5 second timeout
+    'default': {'DB_SQLITE_TUNING': 'False', 'DB_SQLITE_TRANSACTION_MODE': 'DEFERRED', 'DB_SQLITE_BUSY_TIMEOUT': '5'},
+    'tuned': {'DB_SQLITE_TUNING': 'True', 'DB_SQLITE_TRANSACTION_MODE': 'IMMEDIATE', 'DB_SQLITE_BUSY_TIMEOUT': '20'},
+}
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eld_app.settings')
+    import django
+    django.setup()
+
+
+def write_trips(driver_id, trips, result_queue):
+    """Create trips for a driver the way trip creation saves them, counting lock failures"""
+    import datetime
+    from django.db import OperationalError, connection
+    from eld_logs.utils import generate_eld_logs_for_trip
+    from trips.models import Stop, Trip
+    from trips.utils import build_stops_for_trip
+
+    to_pickup = {'distance': 160000.0, 'duration': 2 * 3600.0}
+    to_dropoff = {'distance': 2400000.0, 'duration': 30 * 3600.0}
+    counts = {'created': 0, 'locked': 0}
+    for i in range(trips):
+        trip = Trip(
+            driver_id=driver_id,
+            current_location="Yard",
+            pickup_location="Shipper",
+            dropoff_location="Receiver",
+            current_cycle_hours=0.0,
+            # A driver's trips follow each other, one every 3 days
+            start_time=datetime.datetime(2024, 1, 1, 6, tzinfo=datetime.timezone.utc) + datetime.timedelta(days=3 * i)
+        )
+        try:
+            # As in TripViewSet.create: save the trip and its stops, then the logs and cycle ledger
+            stops = build_stops_for_trip(trip, to_pickup, to_dropoff)
+            trip.save()
+            Stop.objects.bulk_create(stops)
+            generate_eld_logs_for_trip(trip)
+            counts['created'] += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            counts['locked'] += 1
+    connection.close()
+    result_queue.put(counts)
+
+
+def read_trips(stop_event, result_queue):
+    """Poll the latest trips with their stops until the writers are done"""
+    from django.db import OperationalError, connection
+    from trips.models import Trip
+
+    counts = {'reads': 0, 'locked': 0}
+    while not stop_event.is_set():
+        try:
+            list(Trip.objects.order_by('-created_at').prefetch_related('stops')[:20])
+            counts['reads'] += 1
+        except OperationalError:
+            counts['locked'] += 1
+    connection.close()
+    result_queue.put(counts)
+
+
+def run_profile(args):
+    """Run one profile; DB_NAME and the profile's variables are already set in the environment"""
+    import multiprocessing
+
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connection
+    from trips.models import Driver
+
+    call_command('migrate', verbosity=0)
+    driver_ids = [Driver.objects.create(name=f"Driver {i}").pk for i in range(args.writers)]
+    with connection.cursor() as cursor:
+        journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+    # Worker processes open their own connections
+    connection.close()
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    stop_event = context.Event()
+    writers = [context.Process(target=write_trips, args=(driver_id, args.trips, results)) for driver_id in driver_ids]
+    readers = [context.Process(target=read_trips, args=(stop_event, results)) for _ in range(args.readers)]
+
+    started = time.perf_counter()
+    for process in readers + writers:
+        process.start()
+    counts = {'created': 0, 'locked': 0, 'reads': 0, 'read_errors': 0}
+    for _ in writers:
+        result = results.get()
+        counts['created'] += result['created']
+        counts['locked'] += result['locked']
+    elapsed = time.perf_counter() - started
+    stop_event.set()
+    for _ in readers:
+        result = results.get()
+        counts['reads'] += result['reads']
+        counts['read_errors'] += result['locked']
+    for process in readers + writers:
+        process.join()
+
+    print(json.dumps({
+        'journal_mode': journal_mode,
+        'attempted': args.writers * args.trips,
+        'seconds': elapsed,
+        'trips_per_second': counts['created'] / elapsed,
+        'reads_per_second': counts['reads'] / elapsed,
+        **counts,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=32)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--trips', type=int, default=5, help="trips created by each writer")
+    parser.add_argument('--profiles', nargs='+', choices=sorted(PROFILES), default=['default', 'tuned'])
+    parser.add_argument('--run', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_profile(args)
+        return
+
+    print(f"{'profile':>8} {'journal':>8} {'created':>8} {'locked':>7} {'trips/s':>8} {'reads/s':>8} {'read errors':>11}")
+    for name in args.profiles:
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ, **PROFILES[name],
+                'DB_ENGINE': 'sqlite',
+                'DB_NAME': os.path.join(directory, 'bench.sqlite3'),
+            }
+            output = subprocess.run(
+                [sys.executable, __file__, '--run', '--writers', str(args.writers),
+                 '--readers', str(args.readers), '--trips', str(args.trips)],
+                env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{name:>8} {result['journal_mode']:>8} {result['created']:>8} {result['locked']:>7} "
+            f"{result['trips_per_second']:>8.1f} {result['reads_per_second']:>8.1f} {result['read_errors']:>11}"
+        )
+
+
+if __name__ == '__main__':
+    main()
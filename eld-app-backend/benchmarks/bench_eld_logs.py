@@ -0,0 +1,151 @@
+"""
+Benchmark ELD log generation on long multi-stop trips.
+
+Compares the single-pass timeline sweep in eld_logs.utils.build_eld_logs_for_trip with the
+previous per-day scan, on in-memory stops (no database writes).
+
+Usage:
+    python benchmarks/bench_eld_logs.py [--days 30] [--stops-per-day 8] [--repeat 5]
+"""
+import argparse
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eld_app.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from eld_logs.models import ELDLog  # noqa: E402
+from eld_logs.utils import build_eld_logs_for_trip  # noqa: E402
+from trips.models import Trip, Stop  # noqa: E402
+
+UTC = datetime.timezone.utc
+
+
+def legacy_build_eld_logs_for_trip(trip, stops):
+    """The previous O(days x stops) implementation, kept here as the baseline"""
+    if not stops:
+        return []
+
+    logs = []
+    current_date = trip.start_time.date()
+    end_date = stops[-1].arrival_time.date() + datetime.timedelta(days=1)
+    cycle_hours_used = trip.current_cycle_hours
+
+    while current_date <= end_date:
+        day_stops = [
+            stop for stop in stops
+            if stop.arrival_time.date() <= current_date and
+            (stop.arrival_time + datetime.timedelta(hours=stop.duration)).date() >= current_date
+        ]
+        if not day_stops:
+            current_date += datetime.timedelta(days=1)
+            continue
+
+        off_duty_hours = 0.0
+        sleeper_berth_hours = 0.0
+        driving_hours = 0.0
+        on_duty_not_driving_hours = 0.0
+
+        for stop in day_stops:
+            stop_start = max(stop.arrival_time, datetime.datetime.combine(current_date, datetime.time.min, tzinfo=UTC))
+            stop_end = min(
+                stop.arrival_time + datetime.timedelta(hours=stop.duration),
+                datetime.datetime.combine(current_date + datetime.timedelta(days=1), datetime.time.min, tzinfo=UTC)
+            )
+            stop_hours = (stop_end - stop_start).total_seconds() / 3600
+
+            if stop.type == 'rest':
+                sleeper_berth_hours += min(8.0, stop_hours)
+                off_duty_hours += max(0.0, stop_hours - 8.0)
+            elif stop.type in ['pickup', 'dropoff', 'fuel']:
+                on_duty_not_driving_hours += stop_hours
+            elif stop.type == 'break':
+                off_duty_hours += stop_hours
+
+            if stop != day_stops[-1]:
+                next_stop = day_stops[day_stops.index(stop) + 1]
+                drive_start = stop.arrival_time + datetime.timedelta(hours=stop.duration)
+                drive_end = next_stop.arrival_time
+                drive_start = max(drive_start, datetime.datetime.combine(current_date, datetime.time.min, tzinfo=UTC))
+                drive_end = min(drive_end, datetime.datetime.combine(current_date + datetime.timedelta(days=1), datetime.time.min, tzinfo=UTC))
+                if drive_end > drive_start:
+                    driving_hours += (drive_end - drive_start).total_seconds() / 3600
+
+        total_hours = off_duty_hours + sleeper_berth_hours + driving_hours + on_duty_not_driving_hours
+        if total_hours < 24:
+            off_duty_hours += (24 - total_hours)
+
+        cycle_hours_used += driving_hours + on_duty_not_driving_hours
+        if len(logs) >= 8:
+            cycle_hours_used -= (logs[-8].driving_hours + logs[-8].on_duty_not_driving_hours)
+        cycle_hours_used = max(0, cycle_hours_used)
+
+        logs.append(ELDLog(
+            trip=trip,
+            date=current_date,
+            off_duty_hours=off_duty_hours,
+            sleeper_berth_hours=sleeper_berth_hours,
+            driving_hours=driving_hours,
+            on_duty_not_driving_hours=on_duty_not_driving_hours,
+            locations_visited={'stops': [
+                {'location': stop.location, 'type': stop.type,
+                 'arrival_time': stop.arrival_time.isoformat(), 'duration': stop.duration}
+                for stop in day_stops
+            ]},
+            cycle_hours_used=cycle_hours_used,
+            cycle_hours_remaining=70.0 - cycle_hours_used
+        ))
+        current_date += datetime.timedelta(days=1)
+
+    return logs
+
+
+def make_trip(days, stops_per_day):
+    """A trip with evenly spaced stops cycling through every stop type"""
+    start = datetime.datetime(2024, 1, 1, 6, 0, tzinfo=UTC)
+    trip = Trip(
+        current_location="Seattle, WA",
+        pickup_location="Los Angeles, CA",
+        dropoff_location="Miami, FL",
+        current_cycle_hours=0.0,
+        start_time=start
+    )
+    types = ['fuel', 'break', 'rest', 'pickup', 'dropoff']
+    interval = 24.0 / stops_per_day
+    stops = [
+        Stop(
+            trip=trip,
+            location=f"Stop {i}",
+            type=types[i % len(types)],
+            arrival_time=start + datetime.timedelta(hours=i * interval),
+            duration=min(interval / 2, 10.0),
+            sequence=i + 1
+        )
+        for i in range(days * stops_per_day)
+    ]
+    return trip, stops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, nargs='+', default=[7, 30, 90])
+    parser.add_argument('--stops-per-day', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'days':>6} {'stops':>6} {'legacy ms':>11} {'sweep ms':>10} {'speedup':>8}")
+    for days in args.days:
+        trip, stops = make_trip(days, args.stops_per_day)
+        legacy = min(timeit.repeat(lambda: legacy_build_eld_logs_for_trip(trip, stops), number=1, repeat=args.repeat))
+        sweep = min(timeit.repeat(lambda: build_eld_logs_for_trip(trip, stops), number=1, repeat=args.repeat))
+        print(f"{days:>6} {len(stops):>6} {legacy * 1000:>11.2f} {sweep * 1000:>10.2f} {legacy / sweep:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark the HOS scheduling engine on what-if trips.
+
+Plans random trips with trips.hos.plan_schedule (no database or routing API) and reports how many
+schedules and duty-status timelines are computed per second.
+
+Usage:
+    python benchmarks/bench_hos.py [--trips 10000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trips.hos import Leg, plan_schedule  # noqa: E402
+
+
+def make_legs(count, seed=0):
+    """Random (to_pickup, to_dropoff) legs averaging 50 mph, from local runs to cross-country trips"""
+    rng = random.Random(seed)
+    legs = []
+    for _ in range(count):
+        to_pickup = rng.uniform(0.0, 10.0)
+        to_dropoff = rng.uniform(1.0, 60.0)
+        legs.append((Leg(to_pickup * 50.0, to_pickup), Leg(to_dropoff * 50.0, to_dropoff)))
+    return legs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trips', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    legs = make_legs(args.trips)
+
+    def schedules():
+        for to_pickup, to_dropoff in legs:
+            plan_schedule(to_pickup, to_dropoff)
+
+    def timelines():
+        for to_pickup, to_dropoff in legs:
+            plan_schedule(to_pickup, to_dropoff).timeline()
+
+    print(f"{'':>10} {'trips':>7} {'ms':>9} {'per second':>11}")
+    for name, func in (('schedule', schedules), ('timeline', timelines)):
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(f"{name:>10} {args.trips:>7} {best * 1000:>9.1f} {args.trips / best:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Microbenchmarks for the planning and logging hot paths at several trip lengths.
+
+Times trips.utils.generate_stops_for_trip, eld_logs.utils.generate_eld_logs_for_trip and
+GET /api/eld-logs/summary/ on trips spanning 1, 10 and 30 days by default, against a fresh SQLite
+database and the local fake OpenRouteService (benchmarks/fake_ors.py). The first stop generation of
+each trip goes to the fake service (cold); the rest are served by the route cache. Results are
+printed and saved as JSON (see benchmarks/reporting.py).
+
+Usage:
+    python benchmarks/bench_planning.py [--days 1 10 30] [--repeat 20] [--ors-latency 0] [--output FILE]
+"""
+import argparse
+import datetime
+import math
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fake_ors import EARTH_RADIUS_METERS, start_fake_ors  # noqa: E402
+from reporting import latency_stats, save_results  # noqa: E402
+
+# Slow enough that a 30-day drive fits in half the Earth's circumference
+SPEED_KMH = 60.0
+DETOUR = 1.2
+START_HOUR = 6
+PICKUP_HOURS = 1.0
+
+
+def dropoff_hours(days):
+    """
+    Driving hours to the dropoff of the longest trip that starts at 06:00 and, with the stops the
+    HOS engine adds, finishes before the end of its last day.
+    """
+    from trips.hos import Leg, plan_schedule
+
+    miles_per_hour = SPEED_KMH * 0.621371
+    available = days * 24 - START_HOUR
+
+    def duration(hours):
+        return plan_schedule(
+            Leg(PICKUP_HOURS * miles_per_hour, PICKUP_HOURS), Leg(hours * miles_per_hour, hours)
+        ).duration
+
+    low, high = 0.5, days * 24.0
+    for _ in range(40):
+        middle = (low + high) / 2
+        if duration(middle) < available:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def trip_locations(days):
+    """
+    Current, pickup and dropoff locations (as coordinates along the equator) of a trip whose
+    planned stops span the given number of days on the fake service.
+    """
+    def degrees(hours):
+        return math.degrees(hours * SPEED_KMH / 3.6 * 3600 / DETOUR / EARTH_RADIUS_METERS)
+
+    pickup = degrees(PICKUP_HOURS)
+    dropoff = pickup + degrees(dropoff_hours(days))
+    return "0.0,0.0", f"{pickup:.6f},0.0", f"{dropoff:.6f},0.0"
+
+
+def timed(func, repeat, before=None):
+    """Durations in seconds of repeat calls to func, calling before (untimed) ahead of each"""
+    durations = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def bench_trip(days, repeat):
+    from django.test import Client
+    from eld_logs.models import ELDLog
+    from eld_logs.utils import generate_eld_logs_for_trip
+    from trips.models import Stop, Trip
+    from trips.utils import generate_stops_for_trip
+
+    current, pickup, dropoff = trip_locations(days)
+    trip = Trip.objects.create(
+        current_location=current,
+        pickup_location=pickup,
+        dropoff_location=dropoff,
+        current_cycle_hours=0.0,
+        start_time=datetime.datetime(2024, 1, 1, START_HOUR, tzinfo=datetime.timezone.utc)
+    )
+
+    def clear_stops():
+        Stop.objects.filter(trip=trip).delete()
+
+    def clear_logs():
+        ELDLog.objects.filter(trip=trip).delete()
+
+    # The first run routes the trip through the fake service, the others hit the route cache
+    stop_times = timed(lambda: generate_stops_for_trip(trip), repeat + 1, before=clear_stops)
+    log_times = timed(lambda: generate_eld_logs_for_trip(trip), repeat, before=clear_logs)
+
+    client = Client()
+    url = '/api/eld-logs/summary/'
+    # Also warms up URL resolving and view imports, which would otherwise land in the first sample
+    response = client.get(url, {'trip_id': trip.pk})
+    if response.status_code != 200:
+        raise RuntimeError(f"Summary request failed with {response.status_code}: {response.content[:200]}")
+    summary_times = timed(lambda: client.get(url, {'trip_id': trip.pk}), repeat)
+    grouped_times = timed(lambda: client.get(url, {'trip_id': trip.pk, 'group_by': 'date'}), repeat)
+
+    size = {'days': days, 'log_days': trip.eld_logs.count(), 'stops': trip.stops.count()}
+    return [
+        {'name': f"generate_stops_for_trip/{days}d", **size, 'cold_ms': stop_times[0] * 1000,
+         **latency_stats(stop_times[1:])},
+        {'name': f"generate_eld_logs_for_trip/{days}d", **size, **latency_stats(log_times)},
+        {'name': f"eld_logs_summary/{days}d", **size, **latency_stats(summary_times)},
+        {'name': f"eld_logs_summary_by_date/{days}d", **size, **latency_stats(grouped_times)},
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, nargs='+', default=[1, 10, 30])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--ors-latency', type=float, default=0.0, help="fake OpenRouteService latency in ms")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/planning-<timestamp>.json)")
+    args = parser.parse_args()
+
+    ors = start_fake_ors(latency=args.ors_latency / 1000, speed_kmh=SPEED_KMH, detour=DETOUR)
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update({
+            'DB_ENGINE': 'sqlite',
+            'DB_NAME': os.path.join(directory, 'bench.sqlite3'),
+            'ORS_BASE_URL': ors.base_url,
+        })
+        os.environ.setdefault('OPENROUTESERVICE_API_KEY', 'benchmark')
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eld_app.settings')
+        import django
+        django.setup()
+        from django.core.management import call_command
+        from django.test.utils import setup_test_environment
+
+        call_command('migrate', verbosity=0)
+        # Lets the test client through ALLOWED_HOSTS
+        setup_test_environment()
+
+        results = []
+        for days in args.days:
+            results.extend(bench_trip(days, args.repeat))
+
+    print(f"{'benchmark':<32} {'log days':>8} {'stops':>6} {'cold ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for result in results:
+        cold = f"{result['cold_ms']:.2f}" if 'cold_ms' in result else '-'
+        print(
+            f"{result['name']:<32} {result['log_days']:>8} {result['stops']:>6} {cold:>8} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+        )
+    print(f"Saved {save_results('planning', vars(args), results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Compare two saved benchmark runs (from bench_planning.py or load_test.py).
+
+Prints the p50/p95/p99 latency of every benchmark present in both runs, and requests per second for
+load tests, with the change from the baseline run.
+
+Usage:
+    python benchmarks/compare.py BASELINE.json CANDIDATE.json [--metrics p50_ms p95_ms p99_ms]
+"""
+import argparse
+import json
+
+
+def load(path):
+    with open(path) as f:
+        run = json.load(f)
+    return run, {result['name']: result for result in run['results']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--metrics', nargs='+', default=['p50_ms', 'p95_ms', 'p99_ms', 'requests_per_second'])
+    args = parser.parse_args()
+
+    baseline_run, baseline = load(args.baseline)
+    candidate_run, candidate = load(args.candidate)
+    if baseline_run['benchmark'] != candidate_run['benchmark']:
+        parser.error(f"Cannot compare a {baseline_run['benchmark']} run with a {candidate_run['benchmark']} run")
+    print(f"baseline  {baseline_run['created_at']} ({baseline_run['git_commit']})")
+    print(f"candidate {candidate_run['created_at']} ({candidate_run['git_commit']})")
+
+    print(f"{'benchmark':<32} {'metric':<20} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for name, before in baseline.items():
+        after = candidate.get(name)
+        if after is None:
+            continue
+        for metric in args.metrics:
+            if metric not in before or metric not in after:
+                continue
+            change = (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else float('nan')
+            print(f"{name:<32} {metric:<20} {before[metric]:>10.2f} {after[metric]:>10.2f} {change:>+7.1f}%")
+
+    missing = sorted(set(baseline) ^ set(candidate))
+    if missing:
+        print(f"Only in one run: {', '.join(missing)}")
+
+
+if __name__ == '__main__':
+    main()
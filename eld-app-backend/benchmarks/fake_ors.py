@@ -0,0 +1,182 @@
+"""
+A local stand-in for the OpenRouteService geocoding and directions APIs, for benchmarks.
+
+Place names are geocoded to fixed coordinates within the continental US (derived from a hash of the
+name), and routes follow straight lines between the requested coordinates: the road distance is the
+great-circle distance times a detour factor, and the duration is that distance at a constant speed.
+Every response is delayed by a configurable latency, so the effect of slow routing calls on the API
+can be measured without an API key or network access.
+
+Usage:
+    python benchmarks/fake_ors.py [--port 8081] [--latency 50] [--jitter 10]
+
+then start the app with ORS_BASE_URL=http://127.0.0.1:8081 and any OPENROUTESERVICE_API_KEY.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+EARTH_RADIUS_METERS = 6371000.0
+
+
+def geocode(text):
+    """Fixed (longitude, latitude) of a place name, somewhere in the continental US"""
+    digest = hashlib.md5(text.strip().lower().encode()).digest()
+    lon = -124.0 + 57.0 * int.from_bytes(digest[:4], 'big') / 2 ** 32
+    lat = 25.0 + 24.0 * int.from_bytes(digest[4:8], 'big') / 2 ** 32
+    return round(lon, 6), round(lat, 6)
+
+
+def great_circle_meters(start, end):
+    lon1, lat1, lon2, lat2 = map(math.radians, (*start, *end))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(min(1.0, a)))
+
+
+class FakeORSServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering geocode/search and v2/directions/<profile> requests.
+    latency and jitter are in seconds, speed_kmh is the driving speed of every route and
+    points_per_100km the density of the returned route geometry.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.0, speed_kmh=90.0, detour=1.2, points_per_100km=20):
+        super().__init__(address, FakeORSHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.speed = speed_kmh / 3.6  # meters per second
+        self.detour = detour
+        self.points_per_100km = points_per_100km
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        with self._count_lock:
+            self.request_count += 1
+        seconds = self.latency + random.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def route(self, coordinates):
+        """A directions API response (GeoJSON format) through the coordinates"""
+        segments = []
+        waypoints = [list(coordinates[0])]
+        way_points = [0]
+        for start, end in zip(coordinates, coordinates[1:]):
+            distance = great_circle_meters(start, end) * self.detour
+            segments.append({'distance': round(distance, 1), 'duration': round(distance / self.speed, 1), 'steps': []})
+            points = max(1, int(distance / 100000.0 * self.points_per_100km))
+            for i in range(1, points + 1):
+                waypoints.append([
+                    round(start[0] + (end[0] - start[0]) * i / points, 6),
+                    round(start[1] + (end[1] - start[1]) * i / points, 6),
+                ])
+            way_points.append(len(waypoints) - 1)
+        return {
+            'type': 'FeatureCollection',
+            'features': [{
+                'type': 'Feature',
+                'properties': {
+                    'segments': segments,
+                    'way_points': way_points,
+                    'summary': {
+                        'distance': sum(segment['distance'] for segment in segments),
+                        'duration': sum(segment['duration'] for segment in segments),
+                    },
+                },
+                'geometry': {'type': 'LineString', 'coordinates': waypoints},
+            }],
+        }
+
+
+class FakeORSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.delay()
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != '/geocode/search':
+            self.send_json(404, {'error': 'Not found'})
+            return
+        text = parse_qs(url.query).get('text', [''])[0]
+        if not text:
+            self.send_json(400, {'error': 'Missing text'})
+            return
+        self.send_json(200, {
+            'type': 'FeatureCollection',
+            'features': [{
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': list(geocode(text))},
+                'properties': {'label': text},
+            }],
+        })
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        self.server.delay()
+        if not urlparse(self.path).path.startswith('/v2/directions/'):
+            self.send_json(404, {'error': 'Not found'})
+            return
+        try:
+            coordinates = [tuple(map(float, point)) for point in json.loads(body)['coordinates']]
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {'error': 'Invalid coordinates'})
+            return
+        if len(coordinates) < 2:
+            self.send_json(400, {'error': 'At least two coordinates are required'})
+            return
+        self.send_json(200, self.server.route(coordinates))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_ors(host='127.0.0.1', port=0, **options):
+    """Start a FakeORSServer on a background thread (on a free port by default) and return it"""
+    server = FakeORSServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=50.0, help="milliseconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="random +/- milliseconds around the latency")
+    parser.add_argument('--speed', type=float, default=90.0, help="driving speed in km/h")
+    args = parser.parse_args()
+
+    server = FakeORSServer(
+        (args.host, args.port), latency=args.latency / 1000, jitter=args.jitter / 1000, speed_kmh=args.speed
+    )
+    print(f"Fake OpenRouteService listening on {server.base_url} ({args.latency:g} ms latency)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
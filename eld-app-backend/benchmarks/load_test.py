@@ -0,0 +1,221 @@
+"""
+Load test the main API endpoints and report p50/p95/p99 latency and requests per second.
+
+By default the app is started on a fresh SQLite database with OpenRouteService replaced by the local
+fake service (benchmarks/fake_ors.py) at --ors-latency, after seeding --seed-trips trips for the read
+scenarios. Each scenario then runs for --duration seconds with --concurrency clients. Results are
+printed and saved as JSON (see benchmarks/reporting.py).
+
+The app runs under `manage.py runserver` unless --server-cmd gives another command. The async
+endpoints are ASGI-only, so their scenario (create_trip_async) is not run by default; select it with
+an ASGI server:
+
+    python benchmarks/load_test.py --server-cmd "uvicorn eld_app.asgi:application --port {port} --workers 4" \
+        --scenarios create_trip create_trip_async
+
+To load test an app that is already running (configured with ORS_BASE_URL pointing at a fake_ors.py
+instance), pass --url http://127.0.0.1:8000 instead.
+
+Usage:
+    python benchmarks/load_test.py [--concurrency 8] [--duration 10] [--ors-latency 50]
+                                   [--scenarios create_trip retrieve_trip ...] [--output FILE]
+"""
+import argparse
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from fake_ors import start_fake_ors
+from reporting import latency_stats, save_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SERVER_CMD = f"{shlex.quote(sys.executable)} manage.py runserver 127.0.0.1:{{port}} --noreload"
+
+CITIES = [
+    "New York, NY", "Los Angeles, CA", "Chicago, IL", "Houston, TX", "Phoenix, AZ", "Philadelphia, PA",
+    "San Antonio, TX", "San Diego, CA", "Dallas, TX", "Jacksonville, FL", "Austin, TX", "Columbus, OH",
+    "Charlotte, NC", "Indianapolis, IN", "Seattle, WA", "Denver, CO", "Nashville, TN", "Oklahoma City, OK",
+    "Boston, MA", "Portland, OR", "Las Vegas, NV", "Memphis, TN", "Louisville, KY", "Baltimore, MD",
+    "Milwaukee, WI", "Albuquerque, NM", "Atlanta, GA", "Kansas City, MO", "Omaha, NE", "Miami, FL",
+]
+
+
+def trip_payload(rng):
+    current, pickup, dropoff = rng.sample(CITIES, 3)
+    return {
+        'current_location': current,
+        'pickup_location': pickup,
+        'dropoff_location': dropoff,
+        'current_cycle_hours': round(rng.uniform(0.0, 20.0), 1),
+        'start_time': f"2024-03-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00Z",
+    }
+
+
+# Scenario name -> function of (random generator, seeded trip ids) returning (method, path, json body)
+SCENARIOS = {
+    'create_trip': lambda rng, ids: ('POST', '/api/trips/', trip_payload(rng)),
+    'create_trip_async': lambda rng, ids: ('POST', '/api/trips/async/', trip_payload(rng)),
+    'plan_trip': lambda rng, ids: ('POST', '/api/trips/plan/', trip_payload(rng)),
+    'list_trips': lambda rng, ids: ('GET', '/api/trips/', None),
+    'retrieve_trip': lambda rng, ids: ('GET', f'/api/trips/{rng.choice(ids)}/', None),
+    'trip_eld_logs': lambda rng, ids: ('GET', f'/api/trips/{rng.choice(ids)}/eld_logs/', None),
+    'eld_logs_summary': lambda rng, ids: ('GET', f'/api/eld-logs/summary/?trip_id={rng.choice(ids)}', None),
+}
+
+
+# Scenarios for the ASGI-only async endpoints
+ASGI_SCENARIOS = {'create_trip_async'}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, process, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"The app server exited with code {process.returncode}")
+        try:
+            requests.get(f"{url}/api/trips/", timeout=1.0)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f"The app server did not start within {timeout:g} seconds")
+
+
+def seed_trips(url, count, seed):
+    """Create trips for the read scenarios and return their ids"""
+    rng = random.Random(seed)
+    ids = []
+    with requests.Session() as session:
+        for _ in range(count):
+            response = session.post(f"{url}/api/trips/", json=trip_payload(rng), timeout=60)
+            response.raise_for_status()
+            ids.append(response.json()['id'])
+    return ids
+
+
+def run_scenario(url, name, trip_ids, concurrency, duration, seed):
+    """Send requests from concurrency clients for duration seconds and summarize their latencies"""
+    make_request = SCENARIOS[name]
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(seed * 1000 + index)
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                method, path, body = make_request(rng, trip_ids)
+                started = time.perf_counter()
+                try:
+                    response = session.request(method, f"{url}{path}", json=body, timeout=60)
+                    outcome = response.status_code
+                except requests.RequestException as e:
+                    outcome = type(e).__name__
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[outcome] = statuses.get(outcome, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for outcome, count in statuses.items() if not isinstance(outcome, int) or outcome >= 400)
+    return {
+        'name': name,
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed,
+        'errors': errors,
+        'statuses': {str(outcome): count for outcome, count in sorted(statuses.items(), key=str)},
+        **latency_stats(latencies),
+    }
+
+
+def start_app(args, directory, ors):
+    """Migrate a fresh database and start the app server, returning (url, process)"""
+    port = free_port()
+    env = {
+        **os.environ,
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': os.path.join(directory, 'load.sqlite3'),
+        'ORS_BASE_URL': ors.base_url,
+        'OPENROUTESERVICE_API_KEY': os.environ.get('OPENROUTESERVICE_API_KEY') or 'benchmark',
+        'PYTHONUNBUFFERED': '1',
+    }
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], env=env, cwd=BACKEND_DIR, check=True)
+    log = open(os.path.join(directory, 'server.log'), 'w')
+    process = subprocess.Popen(
+        shlex.split(args.server_cmd.format(port=port)), env=env, cwd=BACKEND_DIR, stdout=log, stderr=subprocess.STDOUT
+    )
+    return f"http://127.0.0.1:{port}", process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        '--scenarios', nargs='+', choices=list(SCENARIOS), default=[name for name in SCENARIOS if name not in ASGI_SCENARIOS]
+    )
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument('--seed-trips', type=int, default=20)
+    parser.add_argument('--ors-latency', type=float, default=50.0, help="fake OpenRouteService latency in ms")
+    parser.add_argument('--ors-jitter', type=float, default=0.0, help="random +/- ms around the latency")
+    parser.add_argument('--server-cmd', default=DEFAULT_SERVER_CMD, help="command starting the app on {port}")
+    parser.add_argument('--url', help="load test an already running app instead of starting one")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="results file (default: benchmarks/results/load-<timestamp>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        process = None
+        if args.url:
+            url = args.url.rstrip('/')
+        else:
+            ors = start_fake_ors(latency=args.ors_latency / 1000, jitter=args.ors_jitter / 1000)
+            url, process = start_app(args, directory, ors)
+        try:
+            wait_for(url, process)
+            trip_ids = seed_trips(url, args.seed_trips, args.seed)
+            results = [
+                run_scenario(url, name, trip_ids, args.concurrency, args.duration, args.seed)
+                for name in args.scenarios
+            ]
+        except Exception:
+            if process is not None:
+                with open(os.path.join(directory, 'server.log')) as log:
+                    sys.stderr.write(log.read()[-4000:])
+            raise
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print(f"{'scenario':<20} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for result in results:
+        print(
+            f"{result['name']:<20} {result['count']:>8} {result['errors']:>6} {result['requests_per_second']:>8.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f}"
+        )
+    print(f"Saved {save_results('load', vars(args), results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Latency statistics and JSON result files shared by the benchmark scripts.
+
+Each run is written to benchmarks/results/<benchmark>-<timestamp>.json (or --output) with the git
+commit, Python version and options it ran with, so runs can be compared with benchmarks/compare.py.
+"""
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def latency_stats(seconds):
+    """Count, mean, min, max and p50/p95/p99 in milliseconds of a list of durations in seconds"""
+    if not seconds:
+        return {'count': 0}
+    ms = np.asarray(seconds) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        'count': len(ms),
+        'mean_ms': float(ms.mean()),
+        'min_ms': float(ms.min()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(ms.max()),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(benchmark, options, results, output=None):
+    """Write a run's results with its metadata to a JSON file and return the file's path"""
+    started = datetime.datetime.now(datetime.timezone.utc)
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{benchmark}-{started:%Y%m%d-%H%M%S}.json")
+    with open(output, 'w') as f:
+        json.dump({
+            'benchmark': benchmark,
+            'created_at': started.isoformat(),
+            'git_commit': git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'options': options,
+            'results': results,
+        }, f, indent=2)
+    return output
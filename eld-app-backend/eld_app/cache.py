@@ -0,0 +1,267 @@
+"""
+Cache backends for the named caches in settings.CACHES.
+
+Each backend records hits, misses, writes and evictions so the caches can be sized from real data
+(see cache_stats and /api/internal/cache-stats/). Counters are shared per cache location, as Django
+creates a backend instance per thread.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache as DjangoFileBasedCache
+from django.core.cache.backends.locmem import LocMemCache as DjangoLocMemCache
+
+_MISSING = object()
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0})
+
+
+class StatsMixin(ABC):
+    """Count lookups, writes and evictions of a cache backend"""
+    eviction_policy = None
+
+    def _count(self, name, amount=1):
+        with _stats_lock:
+            _stats[self.stats_location][name] += amount
+
+    @property
+    def stats_location(self):
+        return f"{type(self).__name__}:{self._stats_location}"
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('hits')
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        super().set(key, value, timeout, version)
+        self._count('sets')
+
+    @abstractmethod
+    def entry_count(self):
+        """Number of entries currently stored"""
+
+    def stats(self):
+        with _stats_lock:
+            stats = dict(_stats[self.stats_location])
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['entries'] = self.entry_count()
+        stats['max_entries'] = self._max_entries
+        stats['eviction'] = self.eviction_policy
+        return stats
+
+    def reset_stats(self):
+        with _stats_lock:
+            _stats.pop(self.stats_location, None)
+
+
+class LocMemCache(StatsMixin, DjangoLocMemCache):
+    """In-process cache; evicts the least recently used entries once MAX_ENTRIES is reached"""
+    eviction_policy = 'lru'
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._stats_location = name
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = super().add(key, value, timeout, version)
+        if added:
+            self._count('sets')
+        return added
+
+    def _cull(self):
+        before = len(self._cache)
+        super()._cull()
+        self._count('evictions', before - len(self._cache))
+
+    def entry_count(self):
+        return len(self._cache)
+
+
+class FileBasedCache(StatsMixin, DjangoFileBasedCache):
+    """
+    One file per entry in a directory shared by all processes; evicts a random 1/CULL_FREQUENCY
+    of the entries once MAX_ENTRIES is reached.
+    """
+    eviction_policy = 'random'
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._stats_location = self._dir
+
+    # add() goes through set(), so writes are already counted there
+
+    def _cull(self):
+        # Django checks the entry count on every write; only recount when it actually culls
+        before = len(self._list_cache_files())
+        if before < self._max_entries:
+            return
+        super()._cull()
+        self._count('evictions', max(0, before - len(self._list_cache_files())))
+
+    def entry_count(self):
+        return len(self._list_cache_files())
+
+
+class SQLiteCache(StatsMixin, BaseCache):
+    """
+    Cache stored in its own SQLite file, shared by all processes on the host. Once MAX_ENTRIES is
+    reached, 1/CULL_FREQUENCY of the entries are evicted by OPTIONS['EVICTION']: 'lru' (least
+    recently read, the default) or 'fifo' (oldest written). Each instance keeps a running entry
+    count and only re-reads it from the table once every MAX_ENTRIES / 100 writes, so writes from
+    other processes can take the cache that far past MAX_ENTRIES before it culls.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, path, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.eviction_policy = options.get('EVICTION', 'lru')
+        if self.eviction_policy not in ('lru', 'fifo'):
+            raise ValueError("SQLite cache EVICTION must be 'lru' or 'fifo'")
+        self._path = os.path.abspath(path)
+        self._stats_location = self._path
+        self._connection = None
+        self._entries = None
+        self._writes = 0
+        self._recount_every = max(1, self._max_entries // 100)
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, '
+                'created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_created ON cache (created)')
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+            self._connection = connection
+        return self._connection
+
+    def _load(self, key, now):
+        row = self.connection.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return _MISSING
+        value, expires = row
+        if expires is not None and expires <= now:
+            self.connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+            return _MISSING
+        return pickle.loads(value)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        value = self._load(key, now)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        if self.eviction_policy == 'lru':
+            self.connection.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        self._count('hits')
+        return value
+
+    def _write(self, key, value, timeout, replace):
+        now = time.time()
+        if self._entries is None or self._writes % self._recount_every == 0:
+            self._entries = self.entry_count()
+        self._writes += 1
+        if self._entries >= self._max_entries:
+            self._cull(now)
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        cursor = self.connection.execute(
+            f'{verb} INTO cache (key, value, expires, created, accessed) VALUES (?, ?, ?, ?, ?)',
+            (key, pickle.dumps(value, self.pickle_protocol), self.get_backend_timeout(timeout), now, now)
+        )
+        # Replacing a key counts as a new entry too; overcounting only brings the next recount forward
+        self._entries += cursor.rowcount
+        return cursor.rowcount > 0
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(key, value, timeout, replace=True)
+        self._count('sets')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        if self._load(key, now) is not _MISSING:
+            return False
+        added = self._write(key, value, timeout, replace=False)
+        if added:
+            self._count('sets')
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.connection.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._load(key, time.time()) is not _MISSING
+
+    def clear(self):
+        self.connection.execute('DELETE FROM cache')
+        self._entries = 0
+
+    def _cull(self, now):
+        """Drop expired entries, then 1/CULL_FREQUENCY of the rest by the eviction policy"""
+        self.connection.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (now,))
+        count = self._entries = self.entry_count()
+        if count < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            self.clear()
+            self._count('evictions', count)
+            return
+        column = 'accessed' if self.eviction_policy == 'lru' else 'created'
+        culled = self.connection.execute(
+            f'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY {column} LIMIT ?)',
+            (max(1, count // self._cull_frequency),)
+        ).rowcount
+        self._entries = count - culled
+        self._count('evictions', culled)
+
+    def entry_count(self):
+        return self.connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def close(self, **kwargs):
+        # Keep the connection open between requests (Django calls close() when a request finishes)
+        pass
+
+
+def cache_stats():
+    """Hit, miss, write and eviction counts, size and eviction policy of every configured cache"""
+    stats = {}
+    for alias, config in settings.CACHES.items():
+        cache = caches[alias]
+        entry = {'backend': config['BACKEND'].rsplit('.', 1)[-1]}
+        if isinstance(cache, StatsMixin):
+            entry.update(cache.stats())
+        stats[alias] = entry
+    return stats
@@ -0,0 +1,12 @@
+from django.conf import settings
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """
+    Apply settings.SQLITE_PRAGMAS to each new SQLite connection (connected to connection_created).
+    Pragmas are run on the raw connection so they don't show up in query logs.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,157 @@
+import base64
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique ordering, e.g. ('-created_at', '-id').
+
+    Each page is fetched with a WHERE clause on the last row of the previous page instead of an
+    OFFSET, so deep pages cost the same as the first one. Cursors are opaque base64 tokens, the
+    page size can be set with ?page_size= up to max_page_size, and the total count is only
+    computed when requested with ?count=true.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = queryset.count() if self.wants_count(request) else None
+
+        values, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.reversed_ordering() if reverse else self.ordering
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, values))
+
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        # Walking backwards, the extra row tells us whether there is a previous page;
+        # any cursor at all means there is a page after this one, and vice versa
+        if reverse:
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = values is not None, has_more
+        return rows
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def reversed_ordering(self):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering)
+
+    def seek_filter(self, ordering, values):
+        """
+        Rows strictly after the cursor position in the given ordering:
+        (a > va) OR (a = va AND b > vb) OR ..., with < for descending fields.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for field in self.ordering:
+            value = getattr(row, field.lstrip('-'))
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            values.append(value)
+        token = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        """
+        Return (values, reverse) from the cursor query parameter, or (None, False) on the first page.
+        Each value is converted with its ordering field's to_python, so tampered cursors are
+        rejected here rather than failing in the seek query.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            values, reverse = data['v'], bool(data['r'])
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError(values)
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+            if any(value is None for value in values):
+                raise ValueError(values)
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1], False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[0], True))
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'integer'}},
+            {'name': self.count_query_param, 'required': False, 'in': 'query', 'schema': {'type': 'boolean'}},
+        ]
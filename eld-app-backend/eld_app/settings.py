@@ -85,12 +85,56 @@ WSGI_APPLICATION = 'eld_app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE selects the profile: 'sqlite' (default) or 'postgres'.
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'eld_app'),
+            'USER': os.getenv('DB_USER', 'eld_app'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # Keep connections open between requests, checking them before reuse
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),  # seconds
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    if os.getenv('DB_POOL', 'False') == 'True':
+        # psycopg 3 connection pool (pip install "psycopg[pool]"), which replaces persistent connections
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10.0)),  # seconds to wait for a connection
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds a connection waits for a lock before failing with "database is locked"
+                'timeout': float(os.getenv('DB_SQLITE_BUSY_TIMEOUT', 20.0)),
+                # Take the write lock when a transaction starts, so concurrent writers queue on the busy
+                # timeout instead of failing when a read lock can't be upgraded
+                'transaction_mode': os.getenv('DB_SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+            },
+        }
+    }
+
+# Pragmas applied to every new SQLite connection (see eld_app.db); DB_SQLITE_TUNING=False disables them.
+# WAL lets readers proceed while a trip is being written, and synchronous=NORMAL is durable under WAL
+# except for the last transactions on power loss.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.getenv('DB_SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),  # bytes
+    'busy_timeout': int(float(os.getenv('DB_SQLITE_BUSY_TIMEOUT', 20.0)) * 1000),  # milliseconds
+} if os.getenv('DB_SQLITE_TUNING', 'True') == 'True' else {}
 
 
 # Password validation
@@ -146,3 +190,97 @@ REST_FRAMEWORK = {
 
 # OpenRouteService API key
 OPENROUTESERVICE_API_KEY = os.getenv('OPENROUTESERVICE_API_KEY', '')
+
+# Geocode cache (the 'geocode' named cache in front of the GeocodeCacheEntry table)
+GEOCODE_CACHE = {
+    'TTL': int(os.getenv('GEOCODE_CACHE_TTL', 30 * 24 * 3600)),  # seconds
+    'CACHE': 'geocode',
+    'DB_MAX_ENTRIES': int(os.getenv('GEOCODE_CACHE_DB_MAX_ENTRIES', 50000)),
+}
+
+# Route cache (calculate_route results keyed on rounded coordinates and profile, with the
+# 'routes' named cache in front of the RouteCacheEntry table)
+ROUTE_CACHE = {
+    'TTL': int(os.getenv('ROUTE_CACHE_TTL', 7 * 24 * 3600)),  # seconds
+    'CACHE': 'routes',
+    'COORDINATE_PRECISION': int(os.getenv('ROUTE_CACHE_COORDINATE_PRECISION', 4)),  # decimal places
+    'POLYLINE_PRECISION': 5,
+}
+
+# Named caches. Each one can use the in-process 'locmem' backend, 'file' (one file per entry, shared
+# by all processes) or 'sqlite' (its own SQLite file), set with <NAME>_CACHE_BACKEND or for all of
+# them with CACHE_BACKEND, with its own size limit (<NAME>_CACHE_MAX_ENTRIES). Hit, miss and eviction
+# counts are served at /api/internal/cache-stats/.
+CACHE_DIR = Path(os.getenv('CACHE_DIR', BASE_DIR / 'var' / 'cache'))
+CACHE_BACKENDS = {
+    'locmem': 'eld_app.cache.LocMemCache',
+    'file': 'eld_app.cache.FileBasedCache',
+    'sqlite': 'eld_app.cache.SQLiteCache',
+}
+
+
+def named_cache(name, max_entries, timeout=300, eviction='lru'):
+    backend = os.getenv(f'{name.upper()}_CACHE_BACKEND', os.getenv('CACHE_BACKEND', 'locmem'))
+    location = {
+        'locmem': name,
+        'file': str(CACHE_DIR / name),
+        'sqlite': str(CACHE_DIR / f'{name}.sqlite3'),
+    }[backend]
+    options = {'MAX_ENTRIES': int(os.getenv(f'{name.upper()}_CACHE_MAX_ENTRIES', max_entries))}
+    if backend == 'sqlite':
+        # Which entries to evict once full: least recently read ('lru') or oldest written ('fifo')
+        options['EVICTION'] = os.getenv(f'{name.upper()}_CACHE_EVICTION', eviction)
+    return {
+        'BACKEND': CACHE_BACKENDS[backend],
+        'LOCATION': location,
+        'TIMEOUT': timeout,
+        'OPTIONS': options,
+    }
+
+
+CACHES = {
+    'default': named_cache('default', 1000),
+    # In-process tier of the geocode cache (in front of the GeocodeCacheEntry table)
+    'geocode': named_cache('geocode', os.getenv('GEOCODE_CACHE_MEMORY_MAX_ENTRIES', 1024), timeout=None),
+    # Decoded routes in front of the RouteCacheEntry table
+    'routes': named_cache('routes', 256, timeout=None),
+    # Serialized trip responses, see RESPONSE_CACHE
+    'responses': named_cache('responses', 5000, timeout=None),
+}
+
+# Response cache for trip detail, stops and ELD logs (entries are keyed on Trip.version, so the
+# timeout only bounds how long superseded versions stay around)
+RESPONSE_CACHE = {
+    'CACHE': 'responses',
+    'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', 24 * 3600)),  # seconds
+}
+
+# How trip legs are routed: 'multi_waypoint' (one directions request for all three locations)
+# or 'sequential' (one request per leg)
+TRIP_ROUTING_MODE = os.getenv('TRIP_ROUTING_MODE', 'multi_waypoint')
+
+# OpenRouteService HTTP client (pooled session, timeouts, retries and circuit breaker)
+ORS_CLIENT = {
+    'BASE_URL': os.getenv('ORS_BASE_URL', 'https://api.openrouteservice.org'),
+    'CONNECT_TIMEOUT': float(os.getenv('ORS_CONNECT_TIMEOUT', 3.05)),  # seconds
+    'READ_TIMEOUT': float(os.getenv('ORS_READ_TIMEOUT', 15.0)),  # seconds
+    'MAX_RETRIES': int(os.getenv('ORS_MAX_RETRIES', 2)),
+    'BACKOFF_BASE': float(os.getenv('ORS_BACKOFF_BASE', 0.5)),  # seconds
+    'BACKOFF_MAX': float(os.getenv('ORS_BACKOFF_MAX', 8.0)),  # seconds
+    'POOL_SIZE': int(os.getenv('ORS_POOL_SIZE', 10)),
+    'CIRCUIT_FAILURE_THRESHOLD': int(os.getenv('ORS_CIRCUIT_FAILURE_THRESHOLD', 5)),
+    'CIRCUIT_RESET_TIMEOUT': float(os.getenv('ORS_CIRCUIT_RESET_TIMEOUT', 30.0)),  # seconds
+}
+
+# Trip planning pipeline. With ASYNC enabled (or ?async=true on POST /api/trips/) trip creation returns
+# 202 and planning runs in the in-process thread pool ('thread') or in `manage.py run_planning_worker` ('worker').
+TRIP_PLANNING = {
+    'ASYNC': os.getenv('TRIP_PLANNING_ASYNC', 'False') == 'True',
+    'EXECUTOR': os.getenv('TRIP_PLANNING_EXECUTOR', 'thread'),
+    'WORKERS': int(os.getenv('TRIP_PLANNING_WORKERS', 4)),
+    # Running jobs older than this many seconds are presumed lost with their worker and are claimed again
+    'JOB_TIMEOUT': int(os.getenv('TRIP_PLANNING_JOB_TIMEOUT', 600)),
+    # POST /api/trips/bulk/: outbound geocoding/routing concurrency and maximum batch size
+    'BULK_CONCURRENCY': int(os.getenv('TRIP_PLANNING_BULK_CONCURRENCY', 8)),
+    'BULK_MAX_ITEMS': int(os.getenv('TRIP_PLANNING_BULK_MAX_ITEMS', 500)),
+}
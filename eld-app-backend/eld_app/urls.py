@@ -18,10 +18,13 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.documentation import include_docs_urls
 
+from .views import CacheStatsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('trips.urls')),
     path('api/', include('eld_logs.urls')),
+    path('api/internal/cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
     path('api-auth/', include('rest_framework.urls')),
     path('docs/', include_docs_urls(title='ELD App API')),
 ]
@@ -0,0 +1,24 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from trips.geocache import geocode_cache
+from trips.responsecache import response_cache
+from trips.routecache import route_cache
+from .cache import cache_stats
+
+
+class CacheStatsView(APIView):
+    """
+    Hit, miss and eviction counts of the named caches (per backend, since the process started),
+    plus the lookup counts of the geocode, route and response caches built on them.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'caches': cache_stats(),
+            'geocode': geocode_cache.stats(),
+            'routes': route_cache.stats(),
+            'responses': response_cache.stats(),
+        })
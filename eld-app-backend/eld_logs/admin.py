@@ -1,14 +1,22 @@
 from django.contrib import admin
-from .models import ELDLog
+from .models import ELDLog, DriverDutyDay, DriverHOSSnapshot
 
 @admin.register(ELDLog)
 class ELDLogAdmin(admin.ModelAdmin):
     list_display = ('id', 'trip', 'date', 'driving_hours', 'on_duty_not_driving_hours', 'off_duty_hours', 'sleeper_berth_hours', 'is_compliant')
-    list_filter = ('date',)
+    list_filter = ('date', 'is_compliant')
     search_fields = ('trip__current_location', 'trip__pickup_location', 'trip__dropoff_location')
-    readonly_fields = ('total_hours', 'is_compliant')
+    readonly_fields = ('total_hours', 'violations', 'is_compliant')
+
 
-    def is_compliant(self, obj):
-        return obj.is_compliant
-    is_compliant.boolean = True
-    is_compliant.short_description = 'Compliant'
+@admin.register(DriverDutyDay)
+class DriverDutyDayAdmin(admin.ModelAdmin):
+    list_display = ('id', 'driver', 'date', 'on_duty_hours', 'cycle_hours_used')
+    list_filter = ('date',)
+    search_fields = ('driver__name',)
+
+@admin.register(DriverHOSSnapshot)
+class DriverHOSSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('driver', 'date', 'available_driving_hours', 'driving_hours_remaining', 'on_duty_hours_remaining', 'cycle_hours_remaining')
+    list_filter = ('date',)
+    search_fields = ('driver__name',)
@@ -0,0 +1,204 @@
+import datetime
+
+from django.db.models import F, Min, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ELDLog, DriverDutyDay, DriverHOSSnapshot
+from trips.hos import DRIVING_LIMIT_HOURS, ON_DUTY_LIMIT_HOURS
+from trips.models import Driver, Trip
+
+# 70-hour/8-day rule
+CYCLE_DAYS = 8
+CYCLE_LIMIT_HOURS = 70.0
+
+ON_DUTY_HOURS = F('driving_hours') + F('on_duty_not_driving_hours')
+# Hours a ledger day adds to the cycle
+LEDGER_HOURS = F('on_duty_hours') + F('carried_hours')
+
+
+def _days(start_date, end_date):
+    day = start_date
+    while day <= end_date:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def refresh_driver_ledger(driver_id, start_date, end_date):
+    """
+    Update a driver's ledger after their ELD logs for start_date..end_date changed.
+    Daily totals are re-summed from the logs of those days only, and the carried-in hours and
+    rolling cycle are then recomputed for every day whose 8-day window contains one of them.
+
+    A trip whose first log day has no on-duty hours in the 7 days before it carries its declared
+    current_cycle_hours in on that day, as its logs do (see build_eld_logs_for_trip).
+    """
+    window = datetime.timedelta(days=CYCLE_DAYS - 1)
+    hours = {}
+    carried = {}
+    stored = (
+        DriverDutyDay.objects
+        .filter(driver_id=driver_id, date__range=(start_date - window, end_date + window))
+        .exclude(date__range=(start_date, end_date))
+        .values_list('date', 'on_duty_hours', 'carried_hours')
+    )
+    for date, on_duty, carried_in in stored:
+        hours[date] = on_duty
+        if date < start_date:
+            carried[date] = carried_in
+    hours.update(
+        ELDLog.objects
+        .filter(trip__driver_id=driver_id, date__range=(start_date, end_date))
+        .values('date')
+        .annotate(hours=Sum(ON_DUTY_HOURS))
+        .values_list('date', 'hours')
+    )
+
+    # Carried-in hours of the trips starting on a day whose window contains a changed day
+    first_days = (
+        Trip.objects.filter(driver_id=driver_id)
+        .annotate(first_date=Min('eld_logs__date'))
+        .filter(first_date__range=(start_date, end_date + window))
+        .values_list('first_date', 'current_cycle_hours')
+    )
+    for first_date, declared in first_days:
+        if any(hours.get(first_date - datetime.timedelta(days=offset), 0.0) > 0 for offset in range(1, CYCLE_DAYS)):
+            continue
+        carried[first_date] = max(carried.get(first_date, 0.0), declared)
+
+    rows = []
+    for day in _days(start_date, end_date + window):
+        if day not in hours:
+            continue
+        cycle_hours_used = sum(
+            hours.get(date, 0.0) + carried.get(date, 0.0)
+            for date in (day - datetime.timedelta(days=offset) for offset in range(CYCLE_DAYS))
+        )
+        rows.append(DriverDutyDay(
+            driver_id=driver_id,
+            date=day,
+            on_duty_hours=hours[day],
+            carried_hours=carried.get(day, 0.0),
+            cycle_hours_used=cycle_hours_used
+        ))
+
+    if rows:
+        DriverDutyDay.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['driver', 'date'],
+            update_fields=['on_duty_hours', 'carried_hours', 'cycle_hours_used', 'updated_at']
+        )
+    # Days in the range that no longer have any logs
+    DriverDutyDay.objects.filter(driver_id=driver_id, date__range=(start_date, end_date)).exclude(
+        date__in=[row.date for row in rows]
+    ).delete()
+
+    refresh_hos_snapshots([driver_id])
+
+
+def refresh_ledger_for_logs(driver_id, dates):
+    """Refresh the ledger for the days spanned by a set of written or deleted log dates"""
+    dates = list(dates)
+    if driver_id is not None and dates:
+        refresh_driver_ledger(driver_id, min(dates), max(dates))
+
+
+def get_cycle_hours_used(driver_id, date):
+    """
+    Hours a driver has used in the 8-day cycle ending on date.
+    Days with logs read the stored rolling total; other days sum at most 8 ledger rows.
+    """
+    used = DriverDutyDay.objects.filter(driver_id=driver_id, date=date).values_list('cycle_hours_used', flat=True).first()
+    if used is not None:
+        return used
+    window_start = date - datetime.timedelta(days=CYCLE_DAYS - 1)
+    return DriverDutyDay.objects.filter(driver_id=driver_id, date__range=(window_start, date)).aggregate(
+        total=Coalesce(Sum(LEDGER_HOURS), 0.0)
+    )['total']
+
+
+def get_cycle_hours_remaining(driver_id, date):
+    return max(0.0, CYCLE_LIMIT_HOURS - get_cycle_hours_used(driver_id, date))
+
+
+def get_other_trip_hours(trip, start_date, end_date):
+    """
+    On-duty hours per day that the trip's driver logged on their other trips, covering the 8-day
+    windows of start_date..end_date. Read from the ledger minus this trip's own stored logs.
+    Hours carried in by trips that started before start_date count too; later carried-in hours
+    are this trip's own or were declared independently of it.
+    Returns None for trips without a driver.
+    """
+    if trip.driver_id is None:
+        return None
+
+    date_range = (start_date - datetime.timedelta(days=CYCLE_DAYS - 1), end_date)
+    hours = {
+        date: on_duty + (carried if date < start_date else 0.0)
+        for date, on_duty, carried in (
+            DriverDutyDay.objects
+            .filter(driver_id=trip.driver_id, date__range=date_range)
+            .values_list('date', 'on_duty_hours', 'carried_hours')
+        )
+    }
+    if trip.pk is not None:
+        own_hours = (
+            trip.eld_logs.filter(date__range=date_range)
+            .annotate(hours=ON_DUTY_HOURS)
+            .values_list('date', 'hours')
+        )
+        for date, own in own_hours:
+            hours[date] = hours.get(date, 0.0) - own
+
+    # Ignore float noise left after subtracting this trip's hours
+    return {date: value for date, value in hours.items() if value > 1e-9}
+
+
+def refresh_hos_snapshots(driver_ids=None, date=None):
+    """
+    Recompute the HOS snapshot of the given drivers (default: every driver) as of date (default: today).
+    The day's logs and the cycle window are each read with one grouped query, and all snapshots are
+    upserted together. Returns the number of snapshots written.
+    """
+    date = date or timezone.now().date()
+    drivers = Driver.objects.all()
+    logs = ELDLog.objects.filter(trip__driver__isnull=False, date=date)
+    duty_days = DriverDutyDay.objects.filter(date__range=(date - datetime.timedelta(days=CYCLE_DAYS - 1), date))
+    if driver_ids is not None:
+        drivers = drivers.filter(pk__in=driver_ids)
+        logs = logs.filter(trip__driver_id__in=driver_ids)
+        duty_days = duty_days.filter(driver_id__in=driver_ids)
+
+    day_hours = {
+        row['trip__driver']: row
+        for row in logs.values('trip__driver').annotate(driving=Sum('driving_hours'), on_duty=Sum(ON_DUTY_HOURS))
+    }
+    cycle_hours = dict(duty_days.values('driver').annotate(total=Sum(LEDGER_HOURS)).values_list('driver', 'total'))
+
+    snapshots = []
+    for driver_id in drivers.values_list('pk', flat=True):
+        hours = day_hours.get(driver_id, {'driving': 0.0, 'on_duty': 0.0})
+        driving_remaining = max(0.0, DRIVING_LIMIT_HOURS - hours['driving'])
+        on_duty_remaining = max(0.0, ON_DUTY_LIMIT_HOURS - hours['on_duty'])
+        cycle_remaining = max(0.0, CYCLE_LIMIT_HOURS - cycle_hours.get(driver_id, 0.0))
+        snapshots.append(DriverHOSSnapshot(
+            driver_id=driver_id,
+            date=date,
+            driving_hours_remaining=driving_remaining,
+            on_duty_hours_remaining=on_duty_remaining,
+            cycle_hours_remaining=cycle_remaining,
+            available_driving_hours=min(driving_remaining, on_duty_remaining, cycle_remaining)
+        ))
+
+    if snapshots:
+        DriverHOSSnapshot.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=['driver'],
+            update_fields=[
+                'date', 'driving_hours_remaining', 'on_duty_hours_remaining',
+                'cycle_hours_remaining', 'available_driving_hours', 'updated_at'
+            ]
+        )
+    return len(snapshots)
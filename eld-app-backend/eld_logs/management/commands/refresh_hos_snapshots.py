@@ -0,0 +1,23 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eld_logs.ledger import refresh_hos_snapshots
+
+
+class Command(BaseCommand):
+    help = "Recompute every driver's HOS availability snapshot (run daily so snapshots roll over to the new day)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Day to compute availability for (YYYY-MM-DD, default today)")
+
+    def handle(self, *args, **options):
+        date = None
+        if options['date']:
+            try:
+                date = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format")
+
+        count = refresh_hos_snapshots(date=date)
+        self.stdout.write(f"Refreshed {count} HOS snapshots")
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:08
+
+from django.db import migrations, models
+
+
+def backfill_compliance(apps, schema_editor):
+    ELDLog = apps.get_model('eld_logs', 'ELDLog')
+    batch = []
+    for log in ELDLog.objects.only(
+        'off_duty_hours', 'sleeper_berth_hours', 'driving_hours',
+        'on_duty_not_driving_hours', 'cycle_hours_used'
+    ).iterator(chunk_size=2000):
+        log.total_hours = (
+            log.off_duty_hours + log.sleeper_berth_hours +
+            log.driving_hours + log.on_duty_not_driving_hours
+        )
+        log.violations = (
+            (1 if log.driving_hours > 11 else 0) |
+            (2 if log.driving_hours + log.on_duty_not_driving_hours > 14 else 0) |
+            (4 if abs(log.total_hours - 24) > 0.01 else 0) |
+            (8 if log.cycle_hours_used > 70 else 0)
+        )
+        log.is_compliant = log.violations == 0
+        batch.append(log)
+        if len(batch) >= 2000:
+            ELDLog.objects.bulk_update(batch, ['total_hours', 'violations', 'is_compliant'])
+            batch = []
+    if batch:
+        ELDLog.objects.bulk_update(batch, ['total_hours', 'violations', 'is_compliant'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld_logs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eldlog',
+            name='is_compliant',
+            field=models.BooleanField(default=True, help_text='Whether the log has no HOS violations'),
+        ),
+        migrations.AddField(
+            model_name='eldlog',
+            name='total_hours',
+            field=models.FloatField(default=0.0, help_text='Total hours accounted for in this log'),
+        ),
+        migrations.AddField(
+            model_name='eldlog',
+            name='violations',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Bitmask of HOS violations (see ELDLog.VIOLATION_FLAGS)'),
+        ),
+        migrations.AddIndex(
+            model_name='eldlog',
+            index=models.Index(fields=['is_compliant'], name='eld_logs_el_is_comp_cf2f85_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eldlog',
+            index=models.Index(fields=['violations'], name='eld_logs_el_violati_e8f061_idx'),
+        ),
+        migrations.RunPython(backfill_compliance, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld_logs', '0002_compliance_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eldlog',
+            index=models.Index(fields=['date'], name='eld_logs_el_date_4b1d90_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld_logs', '0003_date_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='eldlog',
+            name='eld_logs_el_date_4b1d90_idx',
+        ),
+        migrations.AddIndex(
+            model_name='eldlog',
+            index=models.Index(fields=['date', 'id'], name='eld_logs_el_date_bac49b_idx'),
+        ),
+    ]
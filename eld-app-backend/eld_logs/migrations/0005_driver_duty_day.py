@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld_logs', '0004_keyset_index'),
+        ('trips', '0009_driver'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverDutyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Calendar day')),
+                ('on_duty_hours', models.FloatField(default=0.0, help_text='Driving and on-duty hours logged that day, across all trips')),
+                ('cycle_hours_used', models.FloatField(default=0.0, help_text='On-duty hours in the 8 days ending that day')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duty_days', to='trips.driver')),
+            ],
+            options={
+                'ordering': ['driver', 'date'],
+                'unique_together': {('driver', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld_logs', '0005_driver_duty_day'),
+        ('trips', '0009_driver'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverHOSSnapshot',
+            fields=[
+                ('driver', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='hos_snapshot', serialize=False, to='trips.driver')),
+                ('date', models.DateField(help_text='Day the remaining hours apply to')),
+                ('driving_hours_remaining', models.FloatField(help_text='Hours left under the 11-hour driving limit')),
+                ('on_duty_hours_remaining', models.FloatField(help_text='Hours left under the 14-hour on-duty limit')),
+                ('cycle_hours_remaining', models.FloatField(help_text='Hours left in the 70-hour/8-day cycle')),
+                ('available_driving_hours', models.FloatField(help_text='Driving hours available under all three limits')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-available_driving_hours', 'driver_id'],
+                'indexes': [models.Index(fields=['available_driving_hours', 'driver'], name='eld_logs_dr_availab_464638_idx'), models.Index(fields=['driving_hours_remaining', 'driver'], name='eld_logs_dr_driving_1a83ec_idx'), models.Index(fields=['on_duty_hours_remaining', 'driver'], name='eld_logs_dr_on_duty_703e5b_idx'), models.Index(fields=['cycle_hours_remaining', 'driver'], name='eld_logs_dr_cycle_h_2fec62_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eld_logs', '0006_driver_hos_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverdutyday',
+            name='carried_hours',
+            field=models.FloatField(default=0.0, help_text='Cycle hours a trip starting that day declared (current_cycle_hours) when the driver had no earlier hours'),
+        ),
+        migrations.AlterField(
+            model_name='driverdutyday',
+            name='cycle_hours_used',
+            field=models.FloatField(default=0.0, help_text='On-duty and carried hours in the 8 days ending that day'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.db import models
-from trips.models import Trip
+from trips.models import Trip, Driver
 
 class ELDLog(models.Model):
     trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='eld_logs')
@@ -11,39 +11,134 @@ class ELDLog(models.Model):
     locations_visited = models.JSONField(default=dict, help_text="JSON field for route stops and locations visited")
     cycle_hours_used = models.FloatField(default=0.0, help_text="Cumulative hours used in the 70-hour/8-day cycle")
     cycle_hours_remaining = models.FloatField(default=70.0, help_text="Hours remaining in the 70-hour/8-day cycle")
+    total_hours = models.FloatField(default=0.0, help_text="Total hours accounted for in this log")
+    violations = models.PositiveSmallIntegerField(default=0, help_text="Bitmask of HOS violations (see ELDLog.VIOLATION_FLAGS)")
+    is_compliant = models.BooleanField(default=True, help_text="Whether the log has no HOS violations")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # HOS violation flags stored in the violations bitmask
+    VIOLATION_DRIVING_11H = 1
+    VIOLATION_ON_DUTY_14H = 2
+    VIOLATION_TOTAL_24H = 4
+    VIOLATION_CYCLE_70H = 8
+
+    VIOLATION_FLAGS = {
+        'driving_11h': VIOLATION_DRIVING_11H,
+        'on_duty_14h': VIOLATION_ON_DUTY_14H,
+        'total_24h': VIOLATION_TOTAL_24H,
+        'cycle_70h': VIOLATION_CYCLE_70H,
+    }
+
     def __str__(self):
         return f"ELD Log for {self.trip} on {self.date}"
 
     class Meta:
         ordering = ['date']
+        # The unique (trip, date) index also serves per-trip date range queries
         unique_together = ['trip', 'date']
+        indexes = [
+            models.Index(fields=['date', 'id']),
+            models.Index(fields=['is_compliant']),
+            models.Index(fields=['violations']),
+        ]
 
-    @property
-    def total_hours(self):
-        """Calculate total hours accounted for in this log"""
-        return (
+    # Bulk writes skip these, so bulk callers bump the trip's version themselves
+    def save(self, *args, **kwargs):
+        self.update_compliance()
+        super().save(*args, **kwargs)
+        Trip.bump_versions([self.trip_id])
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Trip.bump_versions([self.trip_id])
+        return result
+
+    def update_compliance(self):
+        """
+        Recompute total_hours, violations and is_compliant from the hour fields.
+        Called on save(); paths that use bulk_create must call it themselves.
+        """
+        self.total_hours = (
             self.off_duty_hours +
             self.sleeper_berth_hours +
             self.driving_hours +
             self.on_duty_not_driving_hours
         )
 
-    @property
-    def is_compliant(self):
-        """Check if the log is compliant with HOS regulations"""
+        violations = 0
+
         # 11-hour driving limit
         if self.driving_hours > 11:
-            return False
+            violations |= self.VIOLATION_DRIVING_11H
 
         # 14-hour on-duty limit
         if self.driving_hours + self.on_duty_not_driving_hours > 14:
-            return False
+            violations |= self.VIOLATION_ON_DUTY_14H
 
         # Total hours should be 24
         if abs(self.total_hours - 24) > 0.01:  # Allow small floating-point error
-            return False
+            violations |= self.VIOLATION_TOTAL_24H
+
+        # 70-hour/8-day limit
+        if self.cycle_hours_used > 70:
+            violations |= self.VIOLATION_CYCLE_70H
+
+        self.violations = violations
+        self.is_compliant = violations == 0
+
+    @property
+    def violation_codes(self):
+        """Names of the violations set in the bitmask"""
+        return [name for name, flag in self.VIOLATION_FLAGS.items() if self.violations & flag]
+
 
-        return True
+class DriverDutyDay(models.Model):
+    """
+    One row per driver and day in the rolling 70-hour/8-day cycle ledger.
+    Rows are kept up to date by eld_logs.ledger whenever a driver's ELD logs are written.
+    """
+    driver = models.ForeignKey(Driver, on_delete=models.CASCADE, related_name='duty_days')
+    date = models.DateField(help_text="Calendar day")
+    on_duty_hours = models.FloatField(default=0.0, help_text="Driving and on-duty hours logged that day, across all trips")
+    carried_hours = models.FloatField(
+        default=0.0,
+        help_text="Cycle hours a trip starting that day declared (current_cycle_hours) when the driver had no earlier hours"
+    )
+    cycle_hours_used = models.FloatField(default=0.0, help_text="On-duty and carried hours in the 8 days ending that day")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.driver} on {self.date}: {self.on_duty_hours:.2f}h"
+
+    class Meta:
+        ordering = ['driver', 'date']
+        unique_together = ['driver', 'date']
+
+
+class DriverHOSSnapshot(models.Model):
+    """
+    Materialized hours-of-service availability of a driver on a given day.
+    Refreshed by eld_logs.ledger whenever the driver's logs change, so fleet-wide availability
+    queries read one indexed table instead of recomputing logs.
+    """
+    driver = models.OneToOneField(Driver, on_delete=models.CASCADE, primary_key=True, related_name='hos_snapshot')
+    date = models.DateField(help_text="Day the remaining hours apply to")
+    driving_hours_remaining = models.FloatField(help_text="Hours left under the 11-hour driving limit")
+    on_duty_hours_remaining = models.FloatField(help_text="Hours left under the 14-hour on-duty limit")
+    cycle_hours_remaining = models.FloatField(help_text="Hours left in the 70-hour/8-day cycle")
+    available_driving_hours = models.FloatField(help_text="Driving hours available under all three limits")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.driver} on {self.date}: {self.available_driving_hours:.2f}h available"
+
+    class Meta:
+        ordering = ['-available_driving_hours', 'driver_id']
+        # Each sort offered by /api/hos/available/, with the driver as tie-breaker for keyset pages
+        indexes = [
+            models.Index(fields=['available_driving_hours', 'driver']),
+            models.Index(fields=['driving_hours_remaining', 'driver']),
+            models.Index(fields=['on_duty_hours_remaining', 'driver']),
+            models.Index(fields=['cycle_hours_remaining', 'driver']),
+        ]
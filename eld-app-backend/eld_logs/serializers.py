@@ -1,9 +1,8 @@
 from rest_framework import serializers
-from .models import ELDLog
+from .models import ELDLog, DriverHOSSnapshot
 
 class ELDLogSerializer(serializers.ModelSerializer):
-    total_hours = serializers.FloatField(read_only=True)
-    is_compliant = serializers.BooleanField(read_only=True)
+    violation_codes = serializers.ListField(child=serializers.CharField(), read_only=True)
 
     class Meta:
         model = ELDLog
@@ -12,10 +11,10 @@ class ELDLogSerializer(serializers.ModelSerializer):
             'sleeper_berth_hours', 'driving_hours',
             'on_duty_not_driving_hours', 'locations_visited',
             'cycle_hours_used', 'cycle_hours_remaining',
-            'total_hours', 'is_compliant',
+            'total_hours', 'is_compliant', 'violations', 'violation_codes',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'total_hours', 'is_compliant', 'violations', 'created_at', 'updated_at']
 
     def validate(self, data):
         """
@@ -40,4 +39,29 @@ class ELDLogSerializer(serializers.ModelSerializer):
         if on_duty_total > 14:
             raise serializers.ValidationError("Total on-duty hours cannot exceed 14 hours")
 
-        return data
\ No newline at end of file
+        return data
+
+class PlannedELDLogSerializer(serializers.ModelSerializer):
+    """Unsaved ELD logs returned by a dry-run plan"""
+    violation_codes = serializers.ListField(child=serializers.CharField(), read_only=True)
+
+    class Meta:
+        model = ELDLog
+        fields = [
+            'date', 'off_duty_hours', 'sleeper_berth_hours', 'driving_hours',
+            'on_duty_not_driving_hours', 'cycle_hours_used', 'cycle_hours_remaining',
+            'total_hours', 'is_compliant', 'violation_codes'
+        ]
+        read_only_fields = fields
+
+class DriverHOSSnapshotSerializer(serializers.ModelSerializer):
+    driver_name = serializers.CharField(source='driver.name', read_only=True)
+
+    class Meta:
+        model = DriverHOSSnapshot
+        fields = [
+            'driver', 'driver_name', 'date', 'driving_hours_remaining',
+            'on_duty_hours_remaining', 'cycle_hours_remaining',
+            'available_driving_hours', 'updated_at'
+        ]
+        read_only_fields = fields
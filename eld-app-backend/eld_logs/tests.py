@@ -2,10 +2,15 @@ from django.test import TestCase, Client
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from .models import ELDLog
-from trips.models import Trip
+from .models import ELDLog, DriverDutyDay, DriverHOSSnapshot
+from .ledger import get_cycle_hours_used, refresh_ledger_for_logs, refresh_hos_snapshots
+from .utils import build_eld_logs_for_trip, generate_eld_logs_for_trip, sync_eld_logs_for_trip
+from trips.models import Driver, Trip, Stop
 from django.utils import timezone
+from unittest import mock
+import csv
 import datetime
+import json
 
 class ELDLogAPITests(APITestCase):
     def setUp(self):
@@ -185,3 +190,427 @@ class ELDLogModelTests(TestCase):
             cycle_hours_remaining=50.0
         )
         self.assertEqual(log.total_hours, 10.0 + 8.0 + 4.0 + 2.0)
+
+class ELDLogGenerationTests(TestCase):
+    def setUp(self):
+        self.start = datetime.datetime(2024, 3, 20, 6, 0, tzinfo=datetime.timezone.utc)
+        self.trip = Trip(
+            current_location="New York, NY",
+            pickup_location="Boston, MA",
+            dropoff_location="Philadelphia, PA",
+            current_cycle_hours=20.0,
+            start_time=self.start
+        )
+
+    def stop(self, type, hours_after_start, duration, sequence):
+        return Stop(
+            trip=self.trip,
+            location=f"{type} location",
+            type=type,
+            arrival_time=self.start + datetime.timedelta(hours=hours_after_start),
+            duration=duration,
+            sequence=sequence
+        )
+
+    def test_multi_day_timeline(self):
+        """Test that hours are split at midnight and every day adds up to 24 hours"""
+        stops = [
+            self.stop('pickup', 4, 1.0, 1),       # drive 06:00-10:00, pickup until 11:00
+            self.stop('rest', 16, 10.0, 2),       # drive 11:00-22:00, rest 22:00-08:00
+            self.stop('dropoff', 40, 1.0, 3),     # drive 08:00-22:00 on day 2
+        ]
+        logs = build_eld_logs_for_trip(self.trip, stops)
+
+        self.assertEqual([log.date for log in logs], [datetime.date(2024, 3, 20), datetime.date(2024, 3, 21)])
+        for log in logs:
+            self.assertAlmostEqual(log.off_duty_hours + log.sleeper_berth_hours + log.driving_hours + log.on_duty_not_driving_hours, 24.0)
+
+        day_one, day_two = logs
+        self.assertAlmostEqual(day_one.driving_hours, 15.0)
+        self.assertAlmostEqual(day_one.on_duty_not_driving_hours, 1.0)
+        self.assertAlmostEqual(day_one.sleeper_berth_hours, 2.0)
+        self.assertAlmostEqual(day_two.sleeper_berth_hours, 6.0)
+        self.assertAlmostEqual(day_two.off_duty_hours, 2.0 + 1.0)
+        self.assertAlmostEqual(day_two.driving_hours, 14.0)
+        self.assertAlmostEqual(day_two.on_duty_not_driving_hours, 1.0)
+        self.assertEqual([stop['type'] for stop in day_two.locations_visited['stops']], ['rest', 'dropoff'])
+        self.assertAlmostEqual(day_two.cycle_hours_used, 20.0 + 16.0 + 15.0)
+
+    def test_days_without_stops_are_logged(self):
+        """Test that a day spent only driving still gets a log"""
+        stops = [
+            self.stop('pickup', 1, 1.0, 1),
+            self.stop('dropoff', 60, 1.0, 2),
+        ]
+        logs = build_eld_logs_for_trip(self.trip, stops)
+        self.assertEqual(len(logs), 3)
+        self.assertAlmostEqual(logs[1].driving_hours, 24.0)
+        self.assertEqual(logs[1].locations_visited['stops'], [])
+
+    def test_cycle_hours_roll_off_after_eight_days(self):
+        """Test that on-duty hours older than 8 days leave the cycle"""
+        stops = [self.stop('pickup', 0, 1.0, 1)]
+        stops += [self.stop('rest', 24 * day, 1.0, day + 1) for day in range(1, 10)]
+        logs = build_eld_logs_for_trip(self.trip, stops)
+        self.assertEqual(len(logs), 10)
+        on_duty = [log.driving_hours + log.on_duty_not_driving_hours for log in logs]
+        self.assertAlmostEqual(logs[-1].cycle_hours_used, 20.0 + sum(on_duty[-8:]))
+
+class ELDLogComplianceTests(APITestCase):
+    def setUp(self):
+        self.trip = Trip.objects.create(
+            current_location="New York, NY",
+            pickup_location="Boston, MA",
+            dropoff_location="Philadelphia, PA",
+            current_cycle_hours=20.0,
+            start_time=timezone.now(),
+            status="planned"
+        )
+
+    def create_log(self, day, **hours):
+        values = {
+            'off_duty_hours': 10.0,
+            'sleeper_berth_hours': 8.0,
+            'driving_hours': 4.0,
+            'on_duty_not_driving_hours': 2.0,
+            'cycle_hours_used': 20.0,
+        }
+        values.update(hours)
+        return ELDLog.objects.create(trip=self.trip, date=datetime.date(2024, 3, day), **values)
+
+    def test_compliance_columns_are_stored(self):
+        """Test that compliance is computed when a log is saved"""
+        log = self.create_log(1, off_duty_hours=4.0, sleeper_berth_hours=6.0, driving_hours=12.0, on_duty_not_driving_hours=3.0)
+        log.refresh_from_db()
+        self.assertAlmostEqual(log.total_hours, 25.0)
+        self.assertFalse(log.is_compliant)
+        self.assertEqual(log.violations, ELDLog.VIOLATION_DRIVING_11H | ELDLog.VIOLATION_ON_DUTY_14H | ELDLog.VIOLATION_TOTAL_24H)
+        self.assertEqual(log.violation_codes, ['driving_11h', 'on_duty_14h', 'total_24h'])
+
+        cycle_log = self.create_log(2, cycle_hours_used=72.0)
+        self.assertEqual(cycle_log.violation_codes, ['cycle_70h'])
+
+    def test_generated_logs_have_compliance_columns(self):
+        """Test that logs built for bulk_create carry compliance columns"""
+        Stop.objects.create(
+            trip=self.trip, location="Boston, MA", type='pickup',
+            arrival_time=self.trip.start_time + datetime.timedelta(hours=2), duration=1.0, sequence=1
+        )
+        logs = build_eld_logs_for_trip(self.trip, list(self.trip.stops.all()))
+        self.assertTrue(all(log.is_compliant for log in logs))
+        self.assertTrue(all(abs(log.total_hours - 24) < 0.01 for log in logs))
+
+    def test_filter_by_compliance_and_violation(self):
+        """Test filtering logs by compliance and violation type"""
+        self.create_log(1)
+        self.create_log(2, off_duty_hours=5.0, sleeper_berth_hours=6.0, driving_hours=12.0, on_duty_not_driving_hours=1.0)
+        self.create_log(3, cycle_hours_used=75.0)
+        url = reverse('eldlog-list')
+
+        response = self.client.get(url, {'compliant': 'false'})
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = self.client.get(url, {'violation': 'driving_11h'})
+        self.assertEqual([log['date'] for log in response.data['results']], ['2024-03-02'])
+
+        response = self.client.get(url, {'violation': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ELDLogSummaryTests(APITestCase):
+    def setUp(self):
+        self.trips = [
+            Trip.objects.create(
+                current_location="New York, NY",
+                pickup_location="Boston, MA",
+                dropoff_location="Philadelphia, PA",
+                current_cycle_hours=0.0
+            )
+            for _ in range(2)
+        ]
+        # Monday and Tuesday of one week, then the Monday after
+        for trip, day, driving in [
+            (self.trips[0], datetime.date(2024, 3, 18), 4.0),
+            (self.trips[0], datetime.date(2024, 3, 19), 12.0),
+            (self.trips[1], datetime.date(2024, 3, 25), 8.0),
+        ]:
+            ELDLog.objects.create(
+                trip=trip,
+                date=day,
+                off_duty_hours=22.0 - driving,
+                driving_hours=driving,
+                on_duty_not_driving_hours=2.0,
+                locations_visited={"stops": []}
+            )
+
+    def test_summary_is_one_query(self):
+        """Test that the summary is computed by a single aggregate query"""
+        url = reverse('eldlog-summary')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data['log_count'], 3)
+        self.assertAlmostEqual(response.data['total_driving_hours'], 24.0)
+        self.assertAlmostEqual(response.data['avg_on_duty_hours'], 2.0)
+        self.assertEqual(response.data['compliant_logs'], 2)
+        self.assertAlmostEqual(response.data['compliance_rate'], 200 / 3)
+
+    def test_summary_group_by(self):
+        """Test per-trip, per-date and per-week breakdowns"""
+        url = reverse('eldlog-summary')
+
+        groups = self.client.get(url, {'group_by': 'trip'}).data['groups']
+        self.assertEqual([group['trip'] for group in groups], [trip.id for trip in self.trips])
+        self.assertAlmostEqual(groups[0]['total_driving_hours'], 16.0)
+        self.assertEqual(groups[0]['compliance_rate'], 50.0)
+
+        groups = self.client.get(url, {'group_by': 'week'}).data['groups']
+        self.assertEqual([group['log_count'] for group in groups], [2, 1])
+
+        groups = self.client.get(url, {'group_by': 'date', 'trip_id': self.trips[0].id}).data['groups']
+        self.assertEqual(len(groups), 2)
+
+        response = self.client.get(url, {'group_by': 'driver'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_is_keyset_paginated_by_date(self):
+        """Test that log pages follow (date, id) order without offsets"""
+        url = reverse('eldlog-list')
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual([log['date'] for log in response.data['results']], ['2024-03-18', '2024-03-19'])
+        self.assertNotIn('count', response.data)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([log['date'] for log in response.data['results']], ['2024-03-25'])
+        self.assertIsNone(response.data['next'])
+
+    def test_summary_without_logs(self):
+        """Test the summary of an empty date range"""
+        response = self.client.get(reverse('eldlog-summary'), {'start_date': '2030-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class ELDLogExportTests(APITestCase):
+    def setUp(self):
+        self.trip = Trip.objects.create(
+            current_location="New York, NY",
+            pickup_location="Boston, MA",
+            dropoff_location="Philadelphia, PA",
+            current_cycle_hours=0.0
+        )
+        for day, driving in [(2, 12.0), (1, 4.0), (3, 6.0)]:
+            ELDLog.objects.create(
+                trip=self.trip,
+                date=datetime.date(2024, 3, day),
+                off_duty_hours=22.0 - driving,
+                driving_hours=driving,
+                on_duty_not_driving_hours=2.0,
+                locations_visited={"stops": [{"location": "Boston, MA", "type": "pickup"}]}
+            )
+        self.url = reverse('eldlog-export')
+
+    def test_export_ndjson(self):
+        """Test that logs are streamed as one JSON object per line in date order"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['date'] for row in rows], ['2024-03-01', '2024-03-02', '2024-03-03'])
+        self.assertEqual(rows[1]['violations'], ELDLog.VIOLATION_DRIVING_11H)
+        self.assertFalse(rows[1]['is_compliant'])
+        self.assertNotIn('locations_visited', rows[0])
+
+    def test_export_csv_with_filters(self):
+        """Test CSV export honouring the list filters"""
+        response = self.client.get(self.url, {
+            'output': 'csv', 'compliant': 'true', 'include_locations': 'true'
+        })
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:3], ['id', 'trip_id', 'date'])
+        self.assertEqual(rows[0][-1], 'locations_visited')
+        self.assertEqual([row[2] for row in rows[1:]], ['2024-03-01', '2024-03-03'])
+        self.assertEqual(json.loads(rows[1][-1])['stops'][0]['type'], 'pickup')
+
+    def test_export_invalid_output(self):
+        """Test that unknown export formats are rejected"""
+        response = self.client.get(self.url, {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class DriverCycleLedgerTests(APITestCase):
+    def setUp(self):
+        self.driver = Driver.objects.create(name="Pat Doe")
+        self.first_trip = self.create_trip(datetime.datetime(2024, 3, 1, 6, 0, tzinfo=datetime.timezone.utc))
+
+    def create_trip(self, start, current_cycle_hours=30.0):
+        """A trip with 10 hours of driving and a 1-hour pickup on its first day"""
+        trip = Trip.objects.create(
+            driver=self.driver,
+            current_location="Seattle, WA",
+            pickup_location="Portland, OR",
+            dropoff_location="Boise, ID",
+            current_cycle_hours=current_cycle_hours,
+            start_time=start
+        )
+        Stop.objects.create(trip=trip, location="Portland, OR", type='pickup',
+                            arrival_time=start + datetime.timedelta(hours=4), duration=1.0, sequence=1)
+        Stop.objects.create(trip=trip, location="Boise, ID", type='dropoff',
+                            arrival_time=start + datetime.timedelta(hours=11), duration=0.0, sequence=2)
+        generate_eld_logs_for_trip(trip)
+        return trip
+
+    def test_ledger_is_written_with_logs(self):
+        """Test that generating logs records the driver's daily on-duty hours"""
+        day = DriverDutyDay.objects.get(driver=self.driver)
+        self.assertEqual(day.date, datetime.date(2024, 3, 1))
+        self.assertAlmostEqual(day.on_duty_hours, 11.0)
+        # The first trip has no history to build on, so the reported hours are carried in
+        self.assertAlmostEqual(day.carried_hours, 30.0)
+        self.assertAlmostEqual(day.cycle_hours_used, 41.0)
+        self.assertAlmostEqual(self.first_trip.eld_logs.get().cycle_hours_used, 41.0)
+
+    def test_cycle_spans_trips(self):
+        """Test that a later trip's cycle includes the driver's earlier trips, not its own estimate"""
+        trip = self.create_trip(datetime.datetime(2024, 3, 4, 6, 0, tzinfo=datetime.timezone.utc), current_cycle_hours=0.0)
+        # The first trip's hours and the 30 hours it carried in
+        self.assertAlmostEqual(trip.eld_logs.get().cycle_hours_used, 52.0)
+        self.assertAlmostEqual(DriverDutyDay.objects.get(date=datetime.date(2024, 3, 4)).cycle_hours_used, 52.0)
+        self.assertAlmostEqual(DriverDutyDay.objects.get(date=datetime.date(2024, 3, 4)).carried_hours, 0.0)
+
+        self.assertAlmostEqual(get_cycle_hours_used(self.driver.pk, datetime.date(2024, 3, 6)), 52.0)
+        # The first trip's day rolls out of the 8-day window
+        self.assertAlmostEqual(get_cycle_hours_used(self.driver.pk, datetime.date(2024, 3, 9)), 11.0)
+        self.assertAlmostEqual(get_cycle_hours_used(self.driver.pk, datetime.date(2024, 3, 20)), 0.0)
+
+    def test_regenerating_a_trip_does_not_count_it_twice(self):
+        """Test that a trip's own ledger hours are excluded when its logs are rebuilt"""
+        self.create_trip(datetime.datetime(2024, 3, 4, 6, 0, tzinfo=datetime.timezone.utc))
+        sync_eld_logs_for_trip(self.first_trip)
+        self.assertAlmostEqual(DriverDutyDay.objects.get(date=datetime.date(2024, 3, 4)).cycle_hours_used, 52.0)
+
+        Stop.objects.filter(trip=self.first_trip, type='dropoff').update(duration=2.0)
+        self.assertEqual(sync_eld_logs_for_trip(self.first_trip)['written'], 1)
+        self.assertAlmostEqual(DriverDutyDay.objects.get(date=datetime.date(2024, 3, 1)).on_duty_hours, 13.0)
+        self.assertAlmostEqual(DriverDutyDay.objects.get(date=datetime.date(2024, 3, 4)).cycle_hours_used, 54.0)
+
+    def test_neighbouring_trips_are_resynced(self):
+        """Test that changing or deleting a trip updates the stored cycle of the driver's later trips"""
+        trip = self.create_trip(datetime.datetime(2024, 3, 4, 6, 0, tzinfo=datetime.timezone.utc), current_cycle_hours=0.0)
+        version = Trip.objects.get(pk=trip.pk).version
+
+        Stop.objects.filter(trip=self.first_trip, type='dropoff').update(duration=2.0)
+        sync_eld_logs_for_trip(self.first_trip)
+        self.assertAlmostEqual(trip.eld_logs.get().cycle_hours_used, 54.0)
+        self.assertAlmostEqual(trip.eld_logs.get().cycle_hours_remaining, 16.0)
+        self.assertEqual(Trip.objects.get(pk=trip.pk).version, version + 1)
+
+        self.client.delete(reverse('trip-detail', kwargs={'pk': self.first_trip.pk}))
+        self.assertAlmostEqual(trip.eld_logs.get().cycle_hours_used, 11.0)
+
+    def test_cycle_endpoint_and_trip_delete(self):
+        """Test the driver cycle lookup and that deleting a trip removes its hours"""
+        url = reverse('driver-cycle', kwargs={'pk': self.driver.pk})
+        response = self.client.get(url, {'date': '2024-03-02'})
+        self.assertAlmostEqual(response.data['cycle_hours_used'], 41.0)
+        self.assertAlmostEqual(response.data['cycle_hours_remaining'], 29.0)
+
+        self.client.delete(reverse('trip-detail', kwargs={'pk': self.first_trip.pk}))
+        self.assertFalse(DriverDutyDay.objects.exists())
+
+        response = self.client.get(url, {'date': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class HOSAvailabilityTests(APITestCase):
+    def setUp(self):
+        self.today = datetime.date(2024, 3, 10)
+        now = mock.patch('django.utils.timezone.now', return_value=datetime.datetime(2024, 3, 10, 12, 0, tzinfo=datetime.timezone.utc))
+        now.start()
+        self.addCleanup(now.stop)
+        self.drivers = {}
+        # name: (driving today, on-duty not driving today, on-duty hours on each of the previous 7 days)
+        for name, driving, on_duty, previous in [
+            ("Rested", 0.0, 0.0, 0.0),
+            ("Half day", 6.0, 1.0, 0.0),
+            ("Cycle nearly spent", 2.0, 0.0, 9.0),
+        ]:
+            driver = Driver.objects.create(name=name)
+            trip = Trip.objects.create(
+                driver=driver,
+                current_location="Seattle, WA",
+                pickup_location="Portland, OR",
+                dropoff_location="Boise, ID",
+                current_cycle_hours=0.0
+            )
+            for offset in range(8):
+                day_driving, day_on_duty = (driving, on_duty) if offset == 0 else (previous, 0.0)
+                ELDLog.objects.create(
+                    trip=trip,
+                    date=self.today - datetime.timedelta(days=offset),
+                    off_duty_hours=24.0 - day_driving - day_on_duty,
+                    driving_hours=day_driving,
+                    on_duty_not_driving_hours=day_on_duty
+                )
+            refresh_ledger_for_logs(driver.pk, [self.today - datetime.timedelta(days=7), self.today])
+            self.drivers[name] = driver
+        refresh_hos_snapshots(date=self.today)
+        self.url = reverse('hos-available')
+
+    def test_snapshot_values(self):
+        """Test that snapshots combine the daily limits and the cycle"""
+        snapshot = DriverHOSSnapshot.objects.get(driver=self.drivers["Half day"])
+        self.assertEqual(snapshot.date, self.today)
+        self.assertAlmostEqual(snapshot.driving_hours_remaining, 5.0)
+        self.assertAlmostEqual(snapshot.on_duty_hours_remaining, 7.0)
+        self.assertAlmostEqual(snapshot.cycle_hours_remaining, 63.0)
+        self.assertAlmostEqual(snapshot.available_driving_hours, 5.0)
+
+        snapshot = DriverHOSSnapshot.objects.get(driver=self.drivers["Cycle nearly spent"])
+        self.assertAlmostEqual(snapshot.cycle_hours_remaining, 70.0 - 65.0)
+        self.assertAlmostEqual(snapshot.available_driving_hours, 5.0)
+
+    def test_available_filters_and_ordering(self):
+        """Test filtering and sorting drivers by remaining hours in one query after the staleness check"""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'min_available': 5})
+        self.assertEqual(
+            [row['driver_name'] for row in response.data['results']],
+            ["Rested", "Half day", "Cycle nearly spent"]
+        )
+
+        response = self.client.get(self.url, {'min_available': 5, 'min_cycle': 10, 'ordering': 'on_duty_hours_remaining'})
+        self.assertEqual([row['driver_name'] for row in response.data['results']], ["Half day", "Rested"])
+
+        response = self.client.get(self.url, {'min_available': 6})
+        self.assertEqual([row['driver_name'] for row in response.data['results']], ["Rested"])
+
+        response = self.client.get(self.url, {'ordering': 'name'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'min_driving': 'lots'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_available_refreshes_stale_snapshots(self):
+        """Test that snapshots from an earlier day are recomputed before they are served"""
+        rested = self.drivers["Rested"]
+        DriverHOSSnapshot.objects.filter(driver=rested).update(
+            date=self.today - datetime.timedelta(days=1), available_driving_hours=0.0
+        )
+        response = self.client.get(self.url, {'min_available': 5})
+        self.assertIn("Rested", [row['driver_name'] for row in response.data['results']])
+        self.assertEqual(DriverHOSSnapshot.objects.get(driver=rested).date, self.today)
+
+    def test_snapshot_follows_new_logs(self):
+        """Test that writing logs refreshes the driver's snapshot"""
+        driver = Driver.objects.create(name="New hire")
+        trip = Trip.objects.create(
+            driver=driver,
+            current_location="Seattle, WA",
+            pickup_location="Portland, OR",
+            dropoff_location="Boise, ID",
+            current_cycle_hours=0.0,
+            start_time=datetime.datetime.combine(timezone.now().date(), datetime.time.min, tzinfo=datetime.timezone.utc)
+        )
+        Stop.objects.create(trip=trip, location="Portland, OR", type='pickup',
+                            arrival_time=trip.start_time, duration=1.0, sequence=1)
+        generate_eld_logs_for_trip(trip)
+        self.assertAlmostEqual(DriverHOSSnapshot.objects.get(driver=driver).on_duty_hours_remaining, 13.0)
@@ -0,0 +1,81 @@
+import datetime
+from collections import namedtuple
+
+from trips.hos import duty_timeline
+
+DUTY_STATUSES = ('off_duty', 'sleeper_berth', 'driving', 'on_duty_not_driving')
+
+Segment = namedtuple('Segment', ['start', 'end', 'status', 'stop'])
+
+
+class DayTotals:
+    __slots__ = ('date', 'off_duty', 'sleeper_berth', 'driving', 'on_duty_not_driving', 'stops')
+
+    def __init__(self, date):
+        self.date = date
+        self.off_duty = 0.0
+        self.sleeper_berth = 0.0
+        self.driving = 0.0
+        self.on_duty_not_driving = 0.0
+        self.stops = []
+
+    @property
+    def on_duty(self):
+        return self.driving + self.on_duty_not_driving
+
+
+def build_timeline(start_time, stops):
+    """
+    Turn a trip's stops into one chronological duty-status timeline, with the duty-status rules of
+    trips.hos.duty_timeline: gaps between stops are driving, stops map to their duty status, and
+    rest stops are split into sleeper berth and off-duty time.
+    """
+    ordered = sorted(stops, key=lambda stop: (stop.arrival_time, stop.sequence))
+    return [
+        Segment._make(segment)
+        for segment in duty_timeline(
+            start_time,
+            ((stop.arrival_time, stop.type, stop.duration, stop) for stop in ordered),
+            hours=lambda value: datetime.timedelta(hours=value)
+        )
+    ]
+
+
+def split_by_day(timeline, tz=datetime.timezone.utc):
+    """
+    Split a timeline at midnight boundaries in one linear sweep.
+    Returns a DayTotals per calendar day from the first to the last segment, with uncovered time
+    counted as off duty so every day adds up to 24 hours.
+    """
+    if not timeline:
+        return []
+
+    first_day = timeline[0].start.astimezone(tz).date()
+    day = DayTotals(first_day)
+    day_end = datetime.datetime.combine(first_day + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz)
+    days = [day]
+
+    for segment in timeline:
+        start = segment.start
+        while True:
+            if start >= day_end:
+                day = DayTotals(day_end.date())
+                day_end += datetime.timedelta(days=1)
+                days.append(day)
+                continue
+
+            end = min(segment.end, day_end)
+            hours = (end - start).total_seconds() / 3600
+            setattr(day, segment.status, getattr(day, segment.status) + hours)
+            if segment.stop is not None and (not day.stops or day.stops[-1] is not segment.stop):
+                day.stops.append(segment.stop)
+
+            if segment.end <= day_end:
+                break
+            start = day_end
+
+    for day in days:
+        covered = day.off_duty + day.sleeper_berth + day.driving + day.on_duty_not_driving
+        if covered < 24:
+            day.off_duty += 24 - covered
+    return days
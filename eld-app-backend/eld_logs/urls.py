@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ELDLogViewSet
+from .views import ELDLogViewSet, HOSSnapshotViewSet
 
 router = DefaultRouter()
 router.register(r'eld-logs', ELDLogViewSet)
+router.register(r'hos', HOSSnapshotViewSet, basename='hos')
 
 urlpatterns = [
     path('', include(router.urls)),
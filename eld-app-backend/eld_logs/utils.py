@@ -1,6 +1,11 @@
 import datetime
+from collections import deque
+from django.db import transaction
+from django.db.models import Min
 from django.utils import timezone
 from .models import ELDLog
+from .ledger import CYCLE_DAYS, get_other_trip_hours, refresh_ledger_for_logs
+from .timeline import build_timeline, split_by_day
 from trips.models import Trip, Stop
 
 def generate_eld_logs_for_trip(trip):
@@ -9,84 +14,166 @@ def generate_eld_logs_for_trip(trip):
     Each day gets its own ELD log with hours allocated according to HOS regulations.
     """
     # Get all stops for the trip, ordered by sequence
-    stops = trip.stops.all().order_by('sequence')
+    stops = list(trip.stops.all().order_by('sequence'))
+    logs = build_eld_logs_for_trip(trip, stops, get_driver_hours(trip, stops))
+
+    # Save all logs and add them to the driver's cycle ledger
+    with transaction.atomic():
+        ELDLog.objects.bulk_create(logs)
+        refresh_driver_logs(trip.driver_id, [log.date for log in logs], exclude=[trip.pk])
+
+    return logs
+
+def get_driver_hours(trip, stops, planned_hours=None):
+    """
+    On-duty hours per day from the driver's other trips over the days the stops span,
+    or None if the trip has no driver.
+    planned_hours (date -> on-duty hours) adds the driver's trips that are planned but not saved
+    yet, e.g. the earlier trips of a bulk request.
+    """
+    if trip.driver_id is None or not stops:
+        return None
+    start_date = trip.start_time.astimezone(datetime.timezone.utc).date()
+    end_time = max(stop.arrival_time + datetime.timedelta(hours=stop.duration) for stop in stops)
+    end_date = end_time.astimezone(datetime.timezone.utc).date()
+    hours = get_other_trip_hours(trip, start_date, end_date)
+    if planned_hours:
+        window_start = start_date - datetime.timedelta(days=CYCLE_DAYS - 1)
+        for date, planned in planned_hours.items():
+            if window_start <= date <= end_date:
+                hours[date] = hours.get(date, 0.0) + planned
+    return hours
+
+# Log columns that depend on the driver's other trips
+CYCLE_SYNC_FIELDS = ['cycle_hours_used', 'cycle_hours_remaining', 'violations', 'is_compliant']
+
+def refresh_driver_logs(driver_id, dates, exclude=()):
+    """
+    Refresh a driver's ledger after their logs for `dates` were written or deleted, then bring the
+    cycle columns of the driver's other trips with logs in the 8-day windows of those days up to
+    date. Trips in `exclude` (e.g. the trip whose logs were just built) are skipped.
+    Returns the number of other trips whose logs changed.
+    """
+    dates = list(dates)
+    refresh_ledger_for_logs(driver_id, dates)
+    if driver_id is None or not dates:
+        return 0
+
+    window_end = max(dates) + datetime.timedelta(days=CYCLE_DAYS - 1)
+    neighbours = (
+        Trip.objects.filter(driver_id=driver_id, eld_logs__date__range=(min(dates), window_end))
+        .exclude(pk__in=list(exclude))
+        .distinct()
+    )
+    changed = []
+    changed_trip_ids = []
+    for trip in neighbours:
+        stops = list(trip.stops.all().order_by('sequence'))
+        logs = {log.date: log for log in build_eld_logs_for_trip(trip, stops, get_driver_hours(trip, stops))}
+        trip_changed = False
+        for row in trip.eld_logs.values('pk', 'date', *CYCLE_SYNC_FIELDS):
+            log = logs.get(row['date'])
+            if log is None or all(row[field] == getattr(log, field) for field in CYCLE_SYNC_FIELDS):
+                continue
+            log.pk = row['pk']
+            log.updated_at = timezone.now()
+            changed.append(log)
+            trip_changed = True
+        if trip_changed:
+            changed_trip_ids.append(trip.pk)
+
+    if changed:
+        ELDLog.objects.bulk_update(changed, CYCLE_SYNC_FIELDS + ['updated_at'])
+        Trip.bump_versions(changed_trip_ids)
+    return len(changed_trip_ids)
+
+# Log columns compared and rewritten when logs are synced
+LOG_SYNC_FIELDS = [
+    'off_duty_hours', 'sleeper_berth_hours', 'driving_hours', 'on_duty_not_driving_hours',
+    'locations_visited', 'cycle_hours_used', 'cycle_hours_remaining',
+    'total_hours', 'violations', 'is_compliant',
+]
+
+def sync_eld_logs_for_trip(trip, since=None):
+    """
+    Bring a trip's stored ELD logs up to date with its stops without deleting and rebuilding them.
+    Logs are recomputed in memory; from the day of `since` (a datetime, e.g. from
+    sync_stops_for_trip, clamped to the first stored and first produced day) onward, only logs that
+    differ from the stored rows are upserted on the (trip, date) unique constraint, and stored days
+    that are no longer produced are deleted.
+    Returns a dict with the number of logs written and deleted.
+    """
+    stops = list(trip.stops.all().order_by('sequence'))
+    logs = build_eld_logs_for_trip(trip, stops, get_driver_hours(trip, stops))
+
+    stored_logs = trip.eld_logs.all()
+    if since is not None:
+        # A moved start can leave stored days before `since` that are no longer produced (or
+        # produce days that were never stored), so never skip days before either set begins
+        first_stored = stored_logs.aggregate(first=Min('date'))['first']
+        if first_stored is not None and logs:
+            since_date = min(since.astimezone(datetime.timezone.utc).date(), first_stored, logs[0].date)
+            logs = [log for log in logs if log.date >= since_date]
+            stored_logs = stored_logs.filter(date__gte=since_date)
+
+    stored = {row.pop('date'): row for row in stored_logs.values('date', *LOG_SYNC_FIELDS)}
+    changed = [
+        log for log in logs
+        if stored.pop(log.date, None) != {field: getattr(log, field) for field in LOG_SYNC_FIELDS}
+    ]
+
+    with transaction.atomic():
+        if changed:
+            ELDLog.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['trip', 'date'],
+                update_fields=LOG_SYNC_FIELDS + ['updated_at']
+            )
+        if stored:
+            trip.eld_logs.filter(date__in=list(stored)).delete()
+        refresh_driver_logs(trip.driver_id, [log.date for log in changed] + list(stored), exclude=[trip.pk])
+
+    return {'written': len(changed), 'deleted': len(stored)}
+
+def build_eld_logs_for_trip(trip, stops, other_trip_hours=None):
+    """
+    Build the (unsaved) ELD logs for a trip from its stops.
+    The stops are turned into one duty-status timeline which is split at day boundaries in a
+    single sweep, so the cost is linear in the number of stops and days.
+
+    Cycle hours are the trip's own hours in the last 8 days plus trip.current_cycle_hours. When
+    other_trip_hours (date -> on-duty hours from the driver's other trips, see get_driver_hours)
+    is given, those hours are added to each 8-day window too, and current_cycle_hours is only
+    carried in if the driver has no hours logged before the trip.
+    """
     if not stops:
         return []
 
-    # Initialize variables
-    logs = []
-    current_date = trip.start_time.date()
-    end_date = stops.last().arrival_time.date() + datetime.timedelta(days=1)  # Include the day after the last stop
+    days = split_by_day(build_timeline(trip.start_time, stops))
+    other_trip_hours = other_trip_hours or {}
 
     # Track cycle hours (70-hour/8-day limit)
-    cycle_hours_used = trip.current_cycle_used
-
-    # Generate a log for each day of the trip
-    while current_date <= end_date:
-        # Get stops that occur on this day
-        day_stops = [
-            stop for stop in stops
-            if stop.arrival_time.date() <= current_date and
-            (stop.arrival_time + datetime.timedelta(hours=stop.duration)).date() >= current_date
-        ]
-
-        if not day_stops:
-            current_date += datetime.timedelta(days=1)
-            continue
-
-        # Initialize hours for this day
-        off_duty_hours = 0.0
-        sleeper_berth_hours = 0.0
-        driving_hours = 0.0
-        on_duty_not_driving_hours = 0.0
-
-        # Calculate hours based on stops
-        for stop in day_stops:
-            stop_start = max(stop.arrival_time, datetime.datetime.combine(current_date, datetime.time.min, tzinfo=timezone.utc))
-            stop_end = min(
-                stop.arrival_time + datetime.timedelta(hours=stop.duration),
-                datetime.datetime.combine(current_date + datetime.timedelta(days=1), datetime.time.min, tzinfo=timezone.utc)
-            )
+    carried_hours = trip.current_cycle_hours
+    if any(date < days[0].date for date in other_trip_hours):
+        carried_hours = 0.0
+    own_hours = 0.0
+    window = deque()
 
-            # Calculate hours for this stop on this day
-            stop_hours = (stop_end - stop_start).total_seconds() / 3600
-
-            if stop.type == 'rest':
-                # Allocate 8 hours to sleeper berth and the rest to off duty
-                sleeper_berth_hours += min(8.0, stop_hours)
-                off_duty_hours += max(0.0, stop_hours - 8.0)
-            elif stop.type in ['pickup', 'dropoff', 'fuel']:
-                on_duty_not_driving_hours += stop_hours
-            elif stop.type == 'break':
-                off_duty_hours += stop_hours
-
-            # For driving time, we need to calculate time between stops
-            if stop != day_stops[-1]:
-                next_stop = day_stops[day_stops.index(stop) + 1]
-                drive_start = stop.arrival_time + datetime.timedelta(hours=stop.duration)
-                drive_end = next_stop.arrival_time
-
-                # Only count driving that occurs on this day
-                drive_start = max(drive_start, datetime.datetime.combine(current_date, datetime.time.min, tzinfo=timezone.utc))
-                drive_end = min(drive_end, datetime.datetime.combine(current_date + datetime.timedelta(days=1), datetime.time.min, tzinfo=timezone.utc))
-
-                if drive_end > drive_start:
-                    drive_hours = (drive_end - drive_start).total_seconds() / 3600
-                    driving_hours += drive_hours
-
-        # Fill remaining hours with off-duty time
-        total_hours = off_duty_hours + sleeper_berth_hours + driving_hours + on_duty_not_driving_hours
-        if total_hours < 24:
-            off_duty_hours += (24 - total_hours)
-
-        # Update cycle hours
-        on_duty_hours = driving_hours + on_duty_not_driving_hours
-        cycle_hours_used += on_duty_hours
-
-        # Remove hours from 8 days ago from the cycle
-        if len(logs) >= 8:
-            eight_days_ago_log = logs[-8]
-            cycle_hours_used -= (eight_days_ago_log.driving_hours + eight_days_ago_log.on_duty_not_driving_hours)
+    logs = []
+    for day in days:
+        # Update cycle hours, removing hours from 8 days ago from the cycle
+        own_hours += day.on_duty
+        window.append(day.on_duty)
+        if len(window) > CYCLE_DAYS:
+            own_hours -= window.popleft()
+
+        cycle_hours_used = carried_hours + own_hours
+        if other_trip_hours:
+            cycle_hours_used += sum(
+                other_trip_hours.get(day.date - datetime.timedelta(days=offset), 0.0)
+                for offset in range(CYCLE_DAYS)
+            )
 
         # Ensure cycle hours don't go below 0
         cycle_hours_used = max(0, cycle_hours_used)
@@ -100,28 +187,23 @@ def generate_eld_logs_for_trip(trip):
                     'arrival_time': stop.arrival_time.isoformat(),
                     'duration': stop.duration
                 }
-                for stop in day_stops
+                for stop in day.stops
             ]
         }
 
-        # Create ELD log for this day
         log = ELDLog(
             trip=trip,
-            date=current_date,
-            off_duty_hours=off_duty_hours,
-            sleeper_berth_hours=sleeper_berth_hours,
-            driving_hours=driving_hours,
-            on_duty_not_driving_hours=on_duty_not_driving_hours,
+            date=day.date,
+            off_duty_hours=day.off_duty,
+            sleeper_berth_hours=day.sleeper_berth,
+            driving_hours=day.driving,
+            on_duty_not_driving_hours=day.on_duty_not_driving,
             locations_visited=locations_visited,
             cycle_hours_used=cycle_hours_used,
             cycle_hours_remaining=70.0 - cycle_hours_used
         )
+        # bulk_create skips save(), so fill in the compliance columns here
+        log.update_compliance()
         logs.append(log)
 
-        # Move to next day
-        current_date += datetime.timedelta(days=1)
-
-    # Save all logs
-    ELDLog.objects.bulk_create(logs)
-
-    return logs
\ No newline at end of file
+    return logs
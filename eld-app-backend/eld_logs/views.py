@@ -1,11 +1,23 @@
+import csv
+import json
 from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from django.db.models import F, Q, Count, Sum, Avg
+from django.db.models.functions import Coalesce, TruncWeek
 from django.shortcuts import get_object_or_404
-from .models import ELDLog
-from .serializers import ELDLogSerializer
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .models import ELDLog, DriverHOSSnapshot
+from .ledger import refresh_hos_snapshots
+from .serializers import ELDLogSerializer, DriverHOSSnapshotSerializer
 from trips.models import Trip
+from eld_app.pagination import KeysetPagination
+
+class ELDLogPagination(KeysetPagination):
+    ordering = ('date', 'id')
 
 class ELDLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -13,6 +25,7 @@ class ELDLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     queryset = ELDLog.objects.all()
     serializer_class = ELDLogSerializer
+    pagination_class = ELDLogPagination
 
     def get_queryset(self):
         queryset = ELDLog.objects.all()
@@ -32,6 +45,21 @@ class ELDLogViewSet(viewsets.ReadOnlyModelViewSet):
         if end_date is not None:
             queryset = queryset.filter(date__lte=end_date)
 
+        # Filter by compliance if compliant is provided
+        compliant = self.request.query_params.get('compliant', None)
+        if compliant is not None:
+            queryset = queryset.filter(is_compliant=compliant.lower() in ('1', 'true', 'yes'))
+
+        # Filter by violation type if violation is provided (e.g. violation=driving_11h)
+        violation = self.request.query_params.get('violation', None)
+        if violation is not None:
+            flag = ELDLog.VIOLATION_FLAGS.get(violation)
+            if flag is None:
+                raise ValidationError({'violation': f"Must be one of: {', '.join(ELDLog.VIOLATION_FLAGS)}"})
+            # Match the bitmasks that contain the flag with IN, which the violations index can serve
+            all_flags = sum(ELDLog.VIOLATION_FLAGS.values())
+            queryset = queryset.filter(violations__in=[code for code in range(all_flags + 1) if code & flag])
+
         return queryset
 
     @action(detail=False, methods=['get'])
@@ -51,44 +79,191 @@ class ELDLogViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(logs, many=True)
         return Response(serializer.data)
 
+    # Aggregates computed in the database for the summary endpoint
+    SUMMARY_AGGREGATES = {
+        'log_count': Count('id'),
+        'total_driving_hours': Coalesce(Sum('driving_hours'), 0.0),
+        'total_on_duty_hours': Coalesce(Sum('on_duty_not_driving_hours'), 0.0),
+        'total_off_duty_hours': Coalesce(Sum('off_duty_hours'), 0.0),
+        'total_sleeper_berth_hours': Coalesce(Sum('sleeper_berth_hours'), 0.0),
+        'avg_driving_hours': Coalesce(Avg('driving_hours'), 0.0),
+        'avg_on_duty_hours': Coalesce(Avg('on_duty_not_driving_hours'), 0.0),
+        'compliant_logs': Count('id', filter=Q(is_compliant=True)),
+    }
+
+    # Breakdowns supported by summary?group_by=
+    SUMMARY_GROUPS = {
+        'trip': ('trip', F('trip_id')),
+        'date': ('date', F('date')),
+        'week': ('week', TruncWeek('date')),
+    }
+
+    @staticmethod
+    def add_compliance_rate(row):
+        log_count = row['log_count']
+        row['compliance_rate'] = (row['compliant_logs'] / log_count) * 100 if log_count > 0 else 0
+        return row
+
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """
         Get a summary of ELD logs for a specific trip or date range.
+        Pass group_by=trip, date or week for a per-group breakdown.
         """
-        logs = self.get_queryset()
+        group_by = request.query_params.get('group_by', None)
+        if group_by is not None and group_by not in self.SUMMARY_GROUPS:
+            return Response(
+                {"error": f"group_by must be one of: {', '.join(self.SUMMARY_GROUPS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        if not logs:
+        # Everything is computed by one aggregate query, so no log rows are loaded
+        logs = self.get_queryset().order_by()
+        summary = logs.aggregate(**self.SUMMARY_AGGREGATES)
+
+        if summary['log_count'] == 0:
             return Response(
                 {"error": "No logs found for the specified filters"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Calculate summary statistics
-        total_driving_hours = sum(log.driving_hours for log in logs)
-        total_on_duty_hours = sum(log.on_duty_not_driving_hours for log in logs)
-        total_off_duty_hours = sum(log.off_duty_hours for log in logs)
-        total_sleeper_berth_hours = sum(log.sleeper_berth_hours for log in logs)
-
-        # Calculate averages
-        log_count = logs.count()
-        avg_driving_hours = total_driving_hours / log_count if log_count > 0 else 0
-        avg_on_duty_hours = total_on_duty_hours / log_count if log_count > 0 else 0
-
-        # Check compliance
-        compliant_logs = sum(1 for log in logs if log.is_compliant)
-        compliance_rate = (compliant_logs / log_count) * 100 if log_count > 0 else 0
-
-        summary = {
-            'log_count': log_count,
-            'total_driving_hours': total_driving_hours,
-            'total_on_duty_hours': total_on_duty_hours,
-            'total_off_duty_hours': total_off_duty_hours,
-            'total_sleeper_berth_hours': total_sleeper_berth_hours,
-            'avg_driving_hours': avg_driving_hours,
-            'avg_on_duty_hours': avg_on_duty_hours,
-            'compliant_logs': compliant_logs,
-            'compliance_rate': compliance_rate,
-        }
+        self.add_compliance_rate(summary)
+
+        if group_by is not None:
+            name, expression = self.SUMMARY_GROUPS[group_by]
+            groups = (
+                logs.annotate(group=expression)
+                .values('group')
+                .annotate(**self.SUMMARY_AGGREGATES)
+                .order_by('group')
+            )
+            summary['groups'] = [
+                self.add_compliance_rate({name: row.pop('group'), **row})
+                for row in groups
+            ]
 
         return Response(summary)
+
+    # Columns written by the export endpoint, in output order
+    EXPORT_FIELDS = (
+        'id', 'trip_id', 'date', 'off_duty_hours', 'sleeper_berth_hours',
+        'driving_hours', 'on_duty_not_driving_hours', 'total_hours',
+        'cycle_hours_used', 'cycle_hours_remaining', 'violations', 'is_compliant',
+    )
+    EXPORT_CHUNK_SIZE = 2000
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every log matching the list filters as NDJSON (default) or CSV (?output=csv).
+        Rows are read in chunks and encoded directly, so memory use stays flat for any range.
+        Pass include_locations=true to add the locations_visited column.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
+            return Response(
+                {"error": "output must be ndjson or csv"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fields = self.EXPORT_FIELDS
+        if request.query_params.get('include_locations', '').lower() in ('1', 'true', 'yes'):
+            fields += ('locations_visited',)
+
+        rows = (
+            self.get_queryset()
+            .order_by('date', 'id')
+            .values_list(*fields)
+            .iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+        )
+
+        if output == 'csv':
+            content = self.export_csv(fields, rows)
+            content_type = 'text/csv'
+        else:
+            content = self.export_ndjson(fields, rows)
+            content_type = 'application/x-ndjson'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="eld-logs.{output}"'
+        return response
+
+    @staticmethod
+    def export_ndjson(fields, rows):
+        encoder = json.JSONEncoder(separators=(',', ':'), default=str)
+        for row in rows:
+            yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+    @staticmethod
+    def export_csv(fields, rows):
+        class Echo:
+            def write(self, value):
+                return value
+
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        if 'locations_visited' in fields:
+            index = fields.index('locations_visited')
+            for row in rows:
+                row = list(row)
+                row[index] = json.dumps(row[index], separators=(',', ':'))
+                yield writer.writerow(row)
+        else:
+            for row in rows:
+                yield writer.writerow(row)
+
+
+class HOSSnapshotPagination(KeysetPagination):
+    ordering = ('-available_driving_hours', 'driver_id')
+
+class HOSSnapshotViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for the per-driver hours-of-service snapshots (read-only).
+    """
+    queryset = DriverHOSSnapshot.objects.select_related('driver')
+    serializer_class = DriverHOSSnapshotSerializer
+    pagination_class = HOSSnapshotPagination
+
+    # ?min_<name>= filters and ?ordering= columns supported by the available endpoint
+    AVAILABILITY_FILTERS = {
+        'min_available': 'available_driving_hours',
+        'min_driving': 'driving_hours_remaining',
+        'min_on_duty': 'on_duty_hours_remaining',
+        'min_cycle': 'cycle_hours_remaining',
+    }
+
+    @action(detail=False, methods=['get'])
+    def available(self, request):
+        """
+        Drivers with at least the requested hours left today, e.g. ?min_available=6&min_cycle=20.
+        Sorted by ?ordering= (default -available_driving_hours) in one indexed query.
+        Snapshots from an earlier day are recomputed for today first.
+        """
+        today = timezone.now().date()
+        stale = list(DriverHOSSnapshot.objects.exclude(date=today).values_list('driver_id', flat=True))
+        if stale:
+            refresh_hos_snapshots(stale, today)
+        queryset = self.get_queryset().filter(date=today)
+        for param, field in self.AVAILABILITY_FILTERS.items():
+            value = request.query_params.get(param, None)
+            if value is None:
+                continue
+            try:
+                queryset = queryset.filter(**{f'{field}__gte': float(value)})
+            except ValueError:
+                return Response(
+                    {"error": f"{param} must be a number"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        ordering = request.query_params.get('ordering', '-available_driving_hours')
+        if ordering.lstrip('-') not in self.AVAILABILITY_FILTERS.values():
+            return Response(
+                {"error": f"ordering must be one of: {', '.join(self.AVAILABILITY_FILTERS.values())}, optionally prefixed with -"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        self.paginator.ordering = (ordering, 'driver_id')
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
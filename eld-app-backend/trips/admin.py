@@ -1,13 +1,18 @@
 from django.contrib import admin
-from .models import Trip, Stop
+from .models import Driver, Trip, Stop, RouteGeometry, GeocodeCacheEntry, RouteCacheEntry, PlanningJob
 
 class StopInline(admin.TabularInline):
     model = Stop
     extra = 0
 
+@admin.register(Driver)
+class DriverAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'license_number', 'created_at')
+    search_fields = ('name', 'license_number')
+
 @admin.register(Trip)
 class TripAdmin(admin.ModelAdmin):
-    list_display = ('id', 'current_location', 'pickup_location', 'dropoff_location', 'status', 'start_time', 'total_distance')
+    list_display = ('id', 'driver', 'current_location', 'pickup_location', 'dropoff_location', 'status', 'start_time', 'total_distance')
     list_filter = ('status', 'start_time')
     search_fields = ('current_location', 'pickup_location', 'dropoff_location')
     inlines = [StopInline]
@@ -18,3 +23,25 @@ class StopAdmin(admin.ModelAdmin):
     list_filter = ('type', 'arrival_time')
     search_fields = ('location',)
     ordering = ('trip', 'sequence')
+
+@admin.register(RouteGeometry)
+class RouteGeometryAdmin(admin.ModelAdmin):
+    list_display = ('trip', 'distance', 'duration', 'point_count', 'updated_at')
+    exclude = ('polyline',)
+
+@admin.register(GeocodeCacheEntry)
+class GeocodeCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'query', 'longitude', 'latitude', 'created_at', 'last_used_at')
+    search_fields = ('query',)
+
+@admin.register(RouteCacheEntry)
+class RouteCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'key', 'profile', 'distance', 'duration', 'created_at')
+    list_filter = ('profile',)
+    search_fields = ('key',)
+    exclude = ('geometry',)
+
+@admin.register(PlanningJob)
+class PlanningJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'trip', 'status', 'step', 'progress', 'created_at', 'finished_at')
+    list_filter = ('status',)
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class TripsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trips'
+
+    def ready(self):
+        from eld_app.db import configure_sqlite_connection
+        connection_created.connect(configure_sqlite_connection, dispatch_uid='configure_sqlite_connection')
@@ -0,0 +1,98 @@
+"""
+asyncio counterparts of the routing helpers in utils.py, used by the async views.
+OpenRouteService calls go through async_ors_client and independent calls run concurrently with
+asyncio.gather; cache and database access runs on Django's sync thread through sync_to_async.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .geocache import geocode_cache
+from .routecache import route_cache
+from .ors_client import async_ors_client
+from .utils import (
+    get_api_key, lookup_locations, geocode_request, route_request, parse_geocode_response,
+    parse_route_response, join_routes
+)
+
+
+async def fetch_coordinates_async(location):
+    """Geocode a location with the OpenRouteService geocoding API, bypassing the cache"""
+    response = await async_ors_client.get('geocode/search', **geocode_request(location))
+    return parse_geocode_response(location, response)
+
+
+async def fetch_route_async(coordinates, profile='driving-hgv'):
+    """Request a route through a list of coordinates, bypassing the cache (see utils.fetch_route)"""
+    response = await async_ors_client.post(f'v2/directions/{profile}', **route_request(coordinates))
+    return parse_route_response(coordinates, response)
+
+
+def store_locations(coordinates):
+    """Add a location -> coordinates dictionary to the geocode cache"""
+    for location, coords in coordinates.items():
+        geocode_cache.set(location, coords)
+
+
+async def geocode_locations_async(locations):
+    """
+    Geocode several locations at once (see utils.geocode_locations).
+    Cache misses are fetched concurrently with asyncio.gather.
+    """
+    get_api_key()
+
+    resolved, pending = await sync_to_async(lookup_locations)(locations)
+    if pending:
+        fetched = await asyncio.gather(*(fetch_coordinates_async(location) for location in pending))
+        fetched = dict(zip(pending, fetched))
+        await sync_to_async(store_locations)(fetched)
+        resolved.update(fetched)
+
+    return [resolved[location] for location in locations]
+
+
+async def calculate_multi_route_async(locations, profile='driving-hgv'):
+    """Calculate a route through several locations (see utils.calculate_multi_route)"""
+    get_api_key()
+
+    coordinates = await geocode_locations_async(locations)
+
+    cached = await sync_to_async(route_cache.get)(coordinates, profile)
+    if cached is not None:
+        return cached
+
+    route = await fetch_route_async(coordinates, profile)
+    await sync_to_async(route_cache.set)(coordinates, profile, route)
+    return route
+
+
+async def calculate_route_async(origin, destination, profile='driving-hgv'):
+    """Calculate a route between two locations (see utils.calculate_route)"""
+    return await calculate_multi_route_async([origin, destination], profile)
+
+
+async def calculate_trip_route_async(trip):
+    """
+    Route a trip from its current location through the pickup to the dropoff
+    (see utils.calculate_trip_route). In 'sequential' mode both legs are routed concurrently.
+    """
+    locations = [trip.current_location, trip.pickup_location, trip.dropoff_location]
+    if getattr(settings, 'TRIP_ROUTING_MODE', 'multi_waypoint') == 'sequential':
+        return join_routes(*await asyncio.gather(
+            calculate_route_async(locations[0], locations[1]),
+            calculate_route_async(locations[1], locations[2]),
+        ))
+
+    return await calculate_multi_route_async(locations)
+
+
+async def route_trip_async(trip):
+    """
+    Route a trip for stop planning (see utils.plan_trip_route).
+    Returns the route dictionary, to be passed to utils.generate_stops_for_trip.
+    """
+    try:
+        return await calculate_trip_route_async(trip)
+    except ValueError as e:
+        raise ValueError(f"Error calculating route: {str(e)}")
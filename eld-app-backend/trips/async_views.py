@@ -0,0 +1,107 @@
+"""
+Async variants of the trip create and plan endpoints, for serving under ASGI.
+DRF viewsets cannot have async actions, so these are plain Django async views that validate and
+serialize with the same serializers as TripViewSet. OpenRouteService calls are awaited (the
+geocoding of a trip's locations concurrently), so a worker is not held while they are in flight.
+
+Under WSGI Django runs each async view on a new event loop, so the views still answer but gain
+neither concurrency across requests nor connection reuse: the loop's httpx client is closed
+after every such request.
+"""
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from .models import Trip
+from .serializers import TripSerializer, TripCreateSerializer
+from .utils import generate_stops_for_trip
+from .async_utils import route_trip_async
+from .ors_client import async_ors_client
+from .bulk import plan_trips_in_bulk_async
+from .views import validate_trip_payload, plan_results
+from eld_logs.utils import generate_eld_logs_for_trip
+
+
+def parse_json(request):
+    try:
+        return json.loads(request.body)
+    except ValueError:
+        raise ValueError("Request body must be valid JSON")
+
+
+def json_response(data, response_status):
+    # Rendered like DRF responses, so both variants return identical bodies
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=response_status)
+
+
+def closes_ors_client_outside_asgi(view):
+    """
+    Close the event loop's OpenRouteService client after requests that are not served under ASGI,
+    where the loop (and so the client's connection pool) only lives for the one request.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        finally:
+            if not isinstance(request, ASGIRequest):
+                await async_ors_client.aclose()
+    return wrapper
+
+
+def save_trip_plan(trip, route):
+    """Save a routed trip with its stops and ELD logs in one transaction and return its serialized data"""
+    with transaction.atomic():
+        generate_stops_for_trip(trip, route)
+        generate_eld_logs_for_trip(trip)
+    return TripSerializer(trip).data
+
+
+@csrf_exempt
+@require_POST
+@closes_ors_client_outside_asgi
+async def create_trip(request):
+    """
+    Create and plan a trip (see TripViewSet.create). The trip is only saved once it has been
+    routed, so a routing failure leaves nothing behind.
+    """
+    try:
+        data = parse_json(request)
+    except ValueError as e:
+        return json_response({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    serializer = TripCreateSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    trip = Trip(**serializer.validated_data)
+    try:
+        route = await route_trip_async(trip)
+        trip_data = await sync_to_async(save_trip_plan)(trip, route)
+    except Exception as e:
+        return json_response({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+    return json_response(trip_data, status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+@require_POST
+@closes_ors_client_outside_asgi
+async def plan_trips(request):
+    """Dry-run planning of one trip or a list of candidate trips (see TripViewSet.plan)"""
+    try:
+        data = parse_json(request)
+        item_errors, items = await sync_to_async(validate_trip_payload)(data)
+        planned = await plan_trips_in_bulk_async(items) if items else []
+    except ValueError as e:
+        return json_response({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    data, response_status = plan_results(item_errors, planned)
+    return json_response(data, response_status)
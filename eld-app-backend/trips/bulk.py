@@ -0,0 +1,276 @@
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .models import Trip, Stop, RouteGeometry
+from .geocache import geocode_cache, normalize_location
+from .routecache import route_cache
+from .planning import get_planning_config
+from .utils import (
+    get_api_key, parse_coordinates, fetch_coordinates, fetch_route, build_stops_for_trip, build_route_geometry
+)
+from .async_utils import fetch_coordinates_async, fetch_route_async
+from .interpolation import RouteIndex
+from eld_logs.models import ELDLog
+from eld_logs.utils import build_eld_logs_for_trip, get_driver_hours, refresh_driver_logs
+
+
+def _run_concurrently(func, keys, max_workers):
+    """
+    Call func for every key on a bounded thread pool.
+    Returns (results, errors) dictionaries keyed like the input.
+    """
+    results = {}
+    errors = {}
+    if not keys:
+        return results, errors
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as executor:
+        futures = {key: executor.submit(func, key) for key in keys}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                errors[key] = str(e)
+    return results, errors
+
+
+async def _gather_concurrently(func, keys, max_concurrency):
+    """
+    Await func for every key, at most max_concurrency at a time (see _run_concurrently).
+    Returns (results, errors) dictionaries keyed like the input.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(key):
+        async with semaphore:
+            return await func(key)
+
+    outcomes = await asyncio.gather(*(run(key) for key in keys), return_exceptions=True)
+    results = {}
+    errors = {}
+    for key, outcome in zip(keys, outcomes):
+        if isinstance(outcome, Exception):
+            errors[key] = str(outcome)
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            results[key] = outcome
+    return results, errors
+
+
+def _lookup_locations(locations):
+    """
+    Split the distinct locations of a batch into those resolved from coordinates or the geocode
+    cache and those still to geocode. Returns (coordinates, pending) dictionaries keyed by
+    normalized location; pending values are the locations to geocode.
+    """
+    coordinates = {}
+    pending = {}
+    for location in locations:
+        key = normalize_location(location)
+        if key in coordinates or key in pending:
+            continue
+        coords = parse_coordinates(location)
+        if coords is None:
+            coords = geocode_cache.get(location)
+        if coords is None:
+            pending[key] = location
+        else:
+            coordinates[key] = tuple(coords)
+    return coordinates, pending
+
+
+def _store_locations(coordinates, pending, fetched):
+    for key, coords in fetched.items():
+        geocode_cache.set(pending[key], coords)
+        coordinates[key] = tuple(coords)
+
+
+def resolve_locations(locations, max_workers):
+    """
+    Geocode the distinct locations of a batch, serving what we can from the geocode cache.
+    Returns (coordinates, errors) dictionaries keyed by normalized location.
+    """
+    coordinates, pending = _lookup_locations(locations)
+    fetched, errors = _run_concurrently(lambda key: fetch_coordinates(pending[key]), list(pending), max_workers)
+    _store_locations(coordinates, pending, fetched)
+    return coordinates, errors
+
+
+async def resolve_locations_async(locations, max_concurrency):
+    """asyncio counterpart of resolve_locations"""
+    coordinates, pending = await sync_to_async(_lookup_locations)(locations)
+    fetched, errors = await _gather_concurrently(
+        lambda key: fetch_coordinates_async(pending[key]), list(pending), max_concurrency
+    )
+    await sync_to_async(_store_locations)(coordinates, pending, fetched)
+    return coordinates, errors
+
+
+def _lookup_routes(coordinate_sequences, profile):
+    """
+    Split the distinct coordinate sequences of a batch into cached routes and those still to route.
+    Returns (routes, pending).
+    """
+    routes = {}
+    pending = []
+    for sequence in dict.fromkeys(coordinate_sequences):
+        cached = route_cache.get(list(sequence), profile)
+        if cached is None:
+            pending.append(sequence)
+        else:
+            routes[sequence] = cached
+    return routes, pending
+
+
+def _store_routes(routes, fetched, profile):
+    for sequence, route in fetched.items():
+        route_cache.set(list(sequence), profile, route)
+        routes[sequence] = route
+
+
+def resolve_routes(coordinate_sequences, max_workers, profile='driving-hgv'):
+    """
+    Route the distinct coordinate sequences of a batch, serving what we can from the route cache.
+    Returns (routes, errors) dictionaries keyed by coordinate tuple.
+    """
+    routes, pending = _lookup_routes(coordinate_sequences, profile)
+    fetched, errors = _run_concurrently(lambda sequence: fetch_route(list(sequence), profile), pending, max_workers)
+    _store_routes(routes, fetched, profile)
+    return routes, errors
+
+
+async def resolve_routes_async(coordinate_sequences, max_concurrency, profile='driving-hgv'):
+    """asyncio counterpart of resolve_routes"""
+    routes, pending = await sync_to_async(_lookup_routes)(coordinate_sequences, profile)
+    fetched, errors = await _gather_concurrently(
+        lambda sequence: fetch_route_async(list(sequence), profile), pending, max_concurrency
+    )
+    await sync_to_async(_store_routes)(routes, fetched, profile)
+    return routes, errors
+
+
+def _batch_locations(items):
+    return [
+        location
+        for item in items
+        for location in (item['current_location'], item['pickup_location'], item['dropoff_location'])
+    ]
+
+
+def _route_sequences(items, coordinates, location_errors):
+    """
+    Match each item to its coordinate sequence. Returns (results, sequences): per-item results with
+    errors for items whose locations failed to geocode (None otherwise), and an index -> coordinate
+    tuple dictionary for the rest.
+    """
+    results = []
+    sequences = {}
+    for index, item in enumerate(items):
+        keys = [normalize_location(item[field]) for field in ('current_location', 'pickup_location', 'dropoff_location')]
+        failed = [key for key in keys if key in location_errors]
+        if failed:
+            results.append({'error': f"Error calculating route: {location_errors[failed[0]]}"})
+        else:
+            sequences[index] = tuple(coordinates[key] for key in keys)
+            results.append(None)
+    return results, sequences
+
+
+def _build_plans(items, results, sequences, routes, route_errors):
+    """
+    Fill in the results of routed items with their unsaved trip, stops and logs.
+    Items are planned in start_time order, and the hours of a driver's earlier items are added to
+    the hours read from the ledger; create_trips_in_bulk re-syncs the earlier items once the later
+    ones are saved, so a driver's trips in one batch count each other.
+    """
+    trips = {index: Trip(**items[index]) for index in sequences}
+    # driver id -> date -> on-duty hours of the items planned so far
+    planned_hours = defaultdict(lambda: defaultdict(float))
+    for index in sorted(trips, key=lambda index: trips[index].start_time):
+        sequence = sequences[index]
+        if sequence in route_errors:
+            results[index] = {'error': f"Error calculating route: {route_errors[sequence]}"}
+            continue
+        trip = trips[index]
+        route = routes[sequence]
+        legs = route['legs']
+        try:
+            stops = build_stops_for_trip(trip, legs[0], legs[1], RouteIndex.from_route(route))
+            other_hours = get_driver_hours(trip, stops, planned_hours.get(trip.driver_id))
+            logs = build_eld_logs_for_trip(trip, stops, other_hours)
+        except Exception as e:
+            results[index] = {'error': str(e)}
+            continue
+        if trip.driver_id is not None:
+            for log in logs:
+                planned_hours[trip.driver_id][log.date] += log.driving_hours + log.on_duty_not_driving_hours
+        results[index] = {'trip': trip, 'stops': stops, 'logs': logs, 'route': route}
+
+    return results
+
+
+def plan_trips_in_bulk(items):
+    """
+    Plan a batch of validated trip payloads without writing any trips, stops or logs.
+    Distinct locations and routes are resolved once for the whole batch on a bounded thread pool,
+    serving what we can from the geocode and route caches. Returns one result per item:
+    {'trip': Trip, 'stops': [Stop], 'logs': [ELDLog], 'route': route} with unsaved objects on
+    success, or {'error': message} on failure.
+    """
+    get_api_key()
+    max_workers = get_planning_config()['BULK_CONCURRENCY']
+
+    coordinates, location_errors = resolve_locations(_batch_locations(items), max_workers)
+    results, sequences = _route_sequences(items, coordinates, location_errors)
+    routes, route_errors = resolve_routes(list(sequences.values()), max_workers)
+    return _build_plans(items, results, sequences, routes, route_errors)
+
+
+async def plan_trips_in_bulk_async(items):
+    """
+    asyncio counterpart of plan_trips_in_bulk: geocoding and directions requests are gathered on
+    the event loop, at most BULK_CONCURRENCY at a time, instead of running on a thread pool.
+    """
+    get_api_key()
+    max_concurrency = get_planning_config()['BULK_CONCURRENCY']
+
+    coordinates, location_errors = await resolve_locations_async(_batch_locations(items), max_concurrency)
+    results, sequences = _route_sequences(items, coordinates, location_errors)
+    routes, route_errors = await resolve_routes_async(list(sequences.values()), max_concurrency)
+    return await sync_to_async(_build_plans)(items, results, sequences, routes, route_errors)
+
+
+def create_trips_in_bulk(items):
+    """
+    Plan and save a batch of validated trip payloads (see plan_trips_in_bulk).
+    All Trip, Stop and ELDLog rows are written with one bulk_create per model in a single transaction.
+    Returns one result per item: {'trip': Trip} on success or {'error': message} on failure.
+    """
+    results = plan_trips_in_bulk(items)
+    planned = [result for result in results if 'error' not in result]
+
+    with transaction.atomic():
+        Trip.objects.bulk_create([result['trip'] for result in planned])
+        Stop.objects.bulk_create([stop for result in planned for stop in result['stops']])
+        ELDLog.objects.bulk_create([log for result in planned for log in result['logs']])
+        geometries = [build_route_geometry(result['trip'], result['route']) for result in planned]
+        RouteGeometry.objects.bulk_create([geometry for geometry in geometries if geometry is not None])
+
+        # One ledger refresh per driver covering all of their new logs. A driver's last planned trip
+        # already counts their other trips; the earlier ones did not see the trips planned after
+        # them, so they are re-synced along with the driver's existing trips.
+        driver_trips = defaultdict(list)
+        for result in planned:
+            if result['trip'].driver_id is not None:
+                driver_trips[result['trip'].driver_id].append(result)
+        for driver_id, driver_results in driver_trips.items():
+            last = max(driver_results, key=lambda result: result['trip'].start_time)
+            dates = [log.date for result in driver_results for log in result['logs']]
+            refresh_driver_logs(driver_id, dates, exclude=[last['trip'].pk])
+
+    return [result if 'error' in result else {'trip': result['trip']} for result in results]
@@ -0,0 +1,122 @@
+import hashlib
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import GeocodeCacheEntry
+
+DEFAULT_GEOCODE_CACHE = {
+    'TTL': 30 * 24 * 3600,
+    'CACHE': 'geocode',
+    'DB_MAX_ENTRIES': 50000,
+}
+
+
+def normalize_location(location):
+    """Normalize a location string so trivially different spellings share a cache key"""
+    return ' '.join(location.lower().split())
+
+
+class GeocodeCache:
+    """
+    Two-tier geocode cache: a named Django cache (settings.CACHES['geocode']) in front of the
+    GeocodeCacheEntry table. Both tiers are keyed on the normalized location string and honour the
+    same TTL.
+    """
+
+    def __init__(self):
+        config = {**DEFAULT_GEOCODE_CACHE, **getattr(settings, 'GEOCODE_CACHE', {})}
+        self.ttl = config['TTL']
+        self.db_max_entries = config['DB_MAX_ENTRIES']
+        self.alias = config['CACHE']
+        self._stats_lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+    @property
+    def memory(self):
+        return caches[self.alias]
+
+    def memory_key(self, key):
+        # Location strings may contain spaces, which not every cache backend accepts in keys
+        return 'geocode:' + hashlib.md5(key.encode()).hexdigest()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, location):
+        """
+        Return cached (longitude, latitude) for a location, or None on a miss.
+        """
+        key = normalize_location(location)
+
+        coords = self.memory.get(self.memory_key(key))
+        if coords is not None:
+            self._count('memory_hits')
+            return coords
+
+        now = timezone.now()
+        entry = GeocodeCacheEntry.objects.filter(
+            query=key,
+            created_at__gte=now - timedelta(seconds=self.ttl)
+        ).first()
+        if entry is None:
+            self._count('misses')
+            return None
+
+        GeocodeCacheEntry.objects.filter(pk=entry.pk).update(last_used_at=now)
+        coords = (entry.longitude, entry.latitude)
+        # Keep the coordinates only for as long as the table entry stays fresh
+        remaining = self.ttl - (now - entry.created_at).total_seconds()
+        self.memory.set(self.memory_key(key), coords, max(1, int(remaining)))
+        self._count('db_hits')
+        return coords
+
+    def set(self, location, coords):
+        """
+        Store coordinates for a location in both tiers, evicting the least recently used rows
+        once the table grows past its size limit.
+        """
+        key = normalize_location(location)
+        now = timezone.now()
+        longitude, latitude = coords
+        GeocodeCacheEntry.objects.update_or_create(
+            query=key,
+            defaults={
+                'longitude': longitude,
+                'latitude': latitude,
+                'created_at': now,
+                'last_used_at': now,
+            }
+        )
+        self.memory.set(self.memory_key(key), (longitude, latitude), self.ttl)
+        self._evict()
+
+    def _evict(self):
+        overflow = GeocodeCacheEntry.objects.count() - self.db_max_entries
+        if overflow <= 0:
+            return
+        stale_ids = list(
+            GeocodeCacheEntry.objects.order_by('last_used_at').values_list('pk', flat=True)[:overflow]
+        )
+        GeocodeCacheEntry.objects.filter(pk__in=stale_ids).delete()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['db_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop the cache tier and reset counters (the table is left untouched)"""
+        self.memory.clear()
+        with self._stats_lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+geocode_cache = GeocodeCache()
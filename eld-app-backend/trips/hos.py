@@ -0,0 +1,195 @@
+"""
+Hours-of-service trip scheduling, independent of Django models and the routing API.
+
+plan_schedule takes the drive to the pickup and the drive to the dropoff and returns the stops a
+property-carrying driver has to make under the 11-hour driving, 14-hour on-duty and 10-hour rest
+rules, with fuel every 1000 miles. Times are hours from the start of the trip, so a schedule can be
+computed (and compared) without touching the database.
+"""
+from collections import deque
+from dataclasses import dataclass
+
+DRIVING_LIMIT_HOURS = 11.0
+ON_DUTY_LIMIT_HOURS = 14.0
+REST_HOURS = 10.0
+REST_SLEEPER_BERTH_HOURS = 8.0
+BREAK_AFTER_DRIVING_HOURS = 8.0
+BREAK_HOURS = 0.5
+PICKUP_HOURS = 1.0
+DROPOFF_HOURS = 1.0
+FUEL_HOURS = 0.5
+FUEL_INTERVAL_MILES = 1000
+
+# Duty status while stopped, by stop type (rest stops are split into sleeper berth and off duty)
+STOP_DUTY_STATUS = {
+    'pickup': 'on_duty_not_driving',
+    'dropoff': 'on_duty_not_driving',
+    'fuel': 'on_duty_not_driving',
+    'break': 'off_duty',
+}
+
+
+@dataclass
+class Leg:
+    __slots__ = ('distance', 'duration')
+    distance: float  # miles
+    duration: float  # hours of driving
+
+
+@dataclass
+class PlannedStop:
+    __slots__ = ('type', 'start', 'duration', 'driven', 'leg')
+    type: str
+    start: float     # hours from the start of the trip
+    duration: float  # hours
+    driven: float    # hours of driving from the start of the trip before the stop
+    leg: int         # index of the leg the stop is on (0: to the pickup, 1: to the dropoff)
+
+    @property
+    def end(self):
+        return self.start + self.duration
+
+
+@dataclass
+class DutySegment:
+    __slots__ = ('start', 'end', 'status')
+    start: float
+    end: float
+    status: str
+
+
+@dataclass
+class Schedule:
+    __slots__ = ('stops', 'total_distance')
+    stops: list
+    total_distance: float
+
+    @property
+    def duration(self):
+        """Hours from the start of the trip to the end of the dropoff"""
+        return self.stops[-1].end if self.stops else 0.0
+
+    def timeline(self):
+        """The schedule as consecutive duty-status segments (see duty_timeline)"""
+        return [
+            DutySegment(start, end, status)
+            for start, end, status, _ in duty_timeline(0.0, ((stop.start, stop.type, stop.duration, stop) for stop in self.stops))
+        ]
+
+
+def duty_timeline(start, stops, hours=lambda value: value):
+    """
+    Turn ordered (arrival, type, duration in hours, stop) tuples into consecutive
+    (start, end, status, stop) segments: driving between stops, the stop's duty status while
+    stopped, and rest stops split into sleeper berth and off-duty time. A stop arriving before the
+    previous one ended is pushed back, so segments never overlap.
+
+    Works on any clock: hours converts a number of hours to the clock's unit, e.g.
+    datetime.timedelta(hours=...) when start and the arrivals are datetimes.
+    """
+    segments = []
+    cursor = start
+    for arrival, stop_type, duration, stop in stops:
+        if arrival > cursor:
+            segments.append((cursor, arrival, 'driving', None))
+            cursor = arrival
+
+        end = cursor + hours(duration)
+        if stop_type == 'rest':
+            sleeper_end = min(end, cursor + hours(REST_SLEEPER_BERTH_HOURS))
+            segments.append((cursor, sleeper_end, 'sleeper_berth', stop))
+            if end > sleeper_end:
+                segments.append((sleeper_end, end, 'off_duty', stop))
+        else:
+            segments.append((cursor, end, STOP_DUTY_STATUS.get(stop_type, 'on_duty_not_driving'), stop))
+        cursor = end
+    return segments
+
+
+def fuel_stop_miles(total_distance):
+    """Miles from the start of the trip at which fuel stops are due"""
+    return [FUEL_INTERVAL_MILES * i for i in range(1, int(total_distance / FUEL_INTERVAL_MILES) + 1)]
+
+
+def fuel_stop_hours(legs):
+    """Hours of driving at which fuel stops are due, assuming a constant speed within each leg"""
+    hours = []
+    leg_start_miles = 0.0
+    leg_start_hours = 0.0
+    marks = deque(fuel_stop_miles(sum(leg.distance for leg in legs)))
+    for leg in legs:
+        while marks and leg.distance > 0 and marks[0] <= leg_start_miles + leg.distance:
+            hours.append(leg_start_hours + (marks.popleft() - leg_start_miles) / leg.distance * leg.duration)
+        leg_start_miles += leg.distance
+        leg_start_hours += leg.duration
+    return hours
+
+
+def plan_schedule(to_pickup, to_dropoff, fuel_due=None):
+    """
+    Schedule the stops of a trip driving the to_pickup leg and then the to_dropoff leg.
+
+    fuel_due lists the hours of driving at which fuel stops are due (e.g. located along the route
+    geometry); by default they are placed every 1000 miles at a constant speed within each leg.
+    The HOS limits are only checked on the drive to the dropoff, as the drive to the pickup is
+    assumed to fit in the current shift; a 30-minute break follows the pickup after 8 hours of driving.
+    """
+    legs = (to_pickup, to_dropoff)
+    fuel_due = deque(fuel_stop_hours(legs) if fuel_due is None else fuel_due)
+
+    stops = []
+    clock = 0.0
+    driven = 0.0
+    shift_driving = 0.0
+    shift_on_duty = 0.0
+
+    for index, leg in enumerate(legs):
+        remaining = leg.duration
+        while remaining > 0:
+            if index == 0:
+                limit = remaining
+            else:
+                limit = min(DRIVING_LIMIT_HOURS - shift_driving, ON_DUTY_LIMIT_HOURS - shift_on_duty)
+
+            if limit <= 0:
+                stops.append(PlannedStop('rest', clock, REST_HOURS, driven, index))
+                clock += REST_HOURS
+                shift_driving = shift_on_duty = 0.0
+                continue
+
+            # Drive until the limit, the end of the leg or the next fuel stop, whichever comes first
+            drive = min(limit, remaining)
+            next_fuel = fuel_due[0] - driven if fuel_due else None
+            refuel = next_fuel is not None and next_fuel <= drive and next_fuel < remaining
+            if refuel:
+                drive = max(0.0, fuel_due.popleft() - driven)
+
+            clock += drive
+            driven += drive
+            shift_driving += drive
+            shift_on_duty += drive
+            remaining -= drive
+
+            if refuel:
+                stops.append(PlannedStop('fuel', clock, FUEL_HOURS, driven, index))
+                clock += FUEL_HOURS
+                shift_on_duty += FUEL_HOURS
+            elif remaining > 0:
+                # Reached a driving limit mid-leg
+                stops.append(PlannedStop('rest', clock, REST_HOURS, driven, index))
+                clock += REST_HOURS
+                shift_driving = shift_on_duty = 0.0
+
+        if index == 0:
+            stops.append(PlannedStop('pickup', clock, PICKUP_HOURS, driven, index))
+            clock += PICKUP_HOURS
+            shift_on_duty += PICKUP_HOURS
+
+            if shift_driving >= BREAK_AFTER_DRIVING_HOURS:
+                stops.append(PlannedStop('break', clock, BREAK_HOURS, driven, index))
+                clock += BREAK_HOURS
+                shift_on_duty += BREAK_HOURS
+                shift_driving = 0.0
+
+    stops.append(PlannedStop('dropoff', clock, DROPOFF_HOURS, driven, 1))
+    return Schedule(stops, to_pickup.distance + to_dropoff.distance)
@@ -0,0 +1,113 @@
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371008.8
+
+
+def format_coordinates(longitude, latitude):
+    """Format a position the way locations are given as coordinates, e.g. "-73.935242,40.730610" """
+    return f"{longitude:.6f},{latitude:.6f}"
+
+
+class RouteIndex:
+    """
+    Cumulative distance and drive-time index over a route's waypoints.
+
+    Great-circle distances between consecutive waypoints are scaled per leg so that each leg matches
+    the distance and duration reported by the routing API, and drive time is spread over a leg in
+    proportion to distance. Lookups are vectorized binary searches, so locating stops stays cheap on
+    cross-country routes with tens of thousands of points.
+    """
+
+    def __init__(self, waypoints, legs=()):
+        points = np.asarray(waypoints, dtype=np.float64)
+        if points.ndim != 2 or len(points) < 2:
+            raise ValueError("A route index needs at least two waypoints")
+        self.points = points[:, :2]
+
+        longitude, latitude = np.radians(self.points).T
+        a = (
+            np.sin(np.diff(latitude) / 2) ** 2 +
+            np.cos(latitude[:-1]) * np.cos(latitude[1:]) * np.sin(np.diff(longitude) / 2) ** 2
+        )
+        step_distance = 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        step_time = np.zeros_like(step_distance)
+
+        for start, end, distance, duration in self._leg_spans(legs, len(self.points)):
+            geometric = step_distance[start:end].sum()
+            if geometric <= 0:
+                continue
+            step_time[start:end] = step_distance[start:end] * (duration / geometric)
+            if distance > 0:
+                step_distance[start:end] *= distance / geometric
+
+        self.distance = np.concatenate(([0.0], np.cumsum(step_distance)))
+        self.time = np.concatenate(([0.0], np.cumsum(step_time)))
+
+    @staticmethod
+    def _leg_spans(legs, point_count):
+        """
+        (start, end, distance, duration) of each leg over the waypoint steps. Legs without waypoint
+        indices (e.g. routes cached before they were recorded) are treated as one span.
+        """
+        spans = []
+        for leg in legs:
+            way_points = leg.get('way_points')
+            if not way_points or len(way_points) != 2:
+                spans = []
+                break
+            spans.append((way_points[0], way_points[1], leg.get('distance', 0.0), leg.get('duration', 0.0)))
+        if not spans:
+            spans = [(
+                0, point_count - 1,
+                sum(leg.get('distance', 0.0) for leg in legs),
+                sum(leg.get('duration', 0.0) for leg in legs),
+            )]
+        return spans
+
+    @classmethod
+    def from_route(cls, route):
+        """Index a route returned by calculate_multi_route, or None if it has no usable geometry"""
+        waypoints = route.get('waypoints') or []
+        if len(waypoints) < 2:
+            return None
+        return cls(waypoints, route.get('legs', ()))
+
+    @property
+    def total_distance(self):
+        return float(self.distance[-1])
+
+    @property
+    def total_time(self):
+        return float(self.time[-1])
+
+    def _locate(self, axis, values):
+        """Step index and fraction along that step for each value on a cumulative axis"""
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        index = np.searchsorted(axis, values, side='right').clip(1, len(axis) - 1)
+        start = axis[index - 1]
+        span = axis[index] - start
+        fraction = np.divide(values - start, span, out=np.zeros_like(values), where=span > 0)
+        return index, fraction.clip(0.0, 1.0)
+
+    def _positions(self, index, fraction):
+        before = self.points[index - 1]
+        return before + (self.points[index] - before) * fraction[:, None]
+
+    def positions_at_times(self, seconds):
+        """(longitude, latitude) rows reached after each number of seconds of driving"""
+        return self._positions(*self._locate(self.time, seconds))
+
+    def positions_at_distances(self, meters):
+        """(longitude, latitude) rows reached after each distance in meters"""
+        return self._positions(*self._locate(self.distance, meters))
+
+    def times_at_distances(self, meters):
+        """Seconds of driving needed to cover each distance in meters"""
+        index, fraction = self._locate(self.distance, meters)
+        before = self.time[index - 1]
+        return before + (self.time[index] - before) * fraction
+
+    def location_at_time(self, seconds):
+        """Location string of the position reached after the given seconds of driving"""
+        longitude, latitude = self.positions_at_times(seconds)[0]
+        return format_coordinates(longitude, latitude)
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from trips.geocache import geocode_cache, normalize_location
+from trips.models import Trip
+from trips.utils import get_coordinates
+
+
+class Command(BaseCommand):
+    help = "Prewarm the geocode cache with the locations of existing trips"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Maximum number of locations to geocode")
+        parser.add_argument('--dry-run', action='store_true', help="Only report the locations that would be geocoded")
+
+    def handle(self, *args, **options):
+        locations = {}
+        rows = Trip.objects.values_list('current_location', 'pickup_location', 'dropoff_location')
+        for row in rows.iterator():
+            for location in row:
+                locations.setdefault(normalize_location(location), location)
+
+        pending = [location for location in locations.values() if geocode_cache.get(location) is None]
+        if options['limit'] is not None:
+            pending = pending[:options['limit']]
+
+        self.stdout.write(f"{len(locations)} distinct locations, {len(pending)} not cached")
+        if options['dry_run']:
+            for location in pending:
+                self.stdout.write(f"  {location}")
+            return
+
+        failed = 0
+        for location in pending:
+            try:
+                get_coordinates(location)
+            except ValueError as e:
+                failed += 1
+                self.stderr.write(f"Could not geocode {location!r}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Geocoded {len(pending) - failed} locations ({failed} failed)"
+        ))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from trips.planning import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued trip planning jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            succeeded = run_job(job)
+            outcome = 'succeeded' if succeeded else 'failed'
+            self.stdout.write(f"Planning job {job.pk} for trip {job.trip_id} {outcome}")
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0002_rename_current_cycle_used_trip_current_cycle_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(help_text='Normalized location string', max_length=255, unique=True)),
+                ('longitude', models.FloatField(help_text='Geocoded longitude')),
+                ('latitude', models.FloatField(help_text='Geocoded latitude')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the location was geocoded')),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Last time the entry was read')),
+            ],
+            options={
+                'ordering': ['-last_used_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0003_geocodecacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Profile and rounded coordinates of the route', max_length=255, unique=True)),
+                ('profile', models.CharField(help_text='OpenRouteService routing profile', max_length=50)),
+                ('distance', models.FloatField(help_text='Route distance (in meters)')),
+                ('duration', models.FloatField(help_text='Route duration (in seconds)')),
+                ('geometry', models.TextField(blank=True, help_text='Route waypoints as an encoded polyline')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the route was calculated')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0004_routecacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routecacheentry',
+            name='legs',
+            field=models.JSONField(default=list, help_text='Distance and duration of each leg between consecutive coordinates'),
+        ),
+        migrations.AlterField(
+            model_name='routecacheentry',
+            name='key',
+            field=models.CharField(help_text='Profile and rounded coordinates of the route waypoints', max_length=255, unique=True),
+        ),
+    ]
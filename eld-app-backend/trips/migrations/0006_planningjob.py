@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0005_routecacheentry_legs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanningJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', help_text='Job status', max_length=20)),
+                ('step', models.CharField(choices=[('queued', 'Waiting for a worker'), ('stops', 'Routing and generating stops'), ('eld_logs', 'Generating ELD logs'), ('done', 'Done')], default='queued', help_text='Current planning step', max_length=20)),
+                ('progress', models.PositiveSmallIntegerField(default=0, help_text='Progress (in percent)')),
+                ('error', models.TextField(blank=True, help_text='Error message if the job failed')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='planning_jobs', to='trips.trip')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='trips_plann_status_68180e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0006_planningjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stop',
+            index=models.Index(fields=['trip', 'sequence'], name='trips_stop_trip_id_1ab614_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stop',
+            index=models.Index(fields=['trip', 'arrival_time'], name='trips_stop_trip_id_b5cf44_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['created_at'], name='trips_trip_created_b7c7fb_idx'),
+        ),
+    ]
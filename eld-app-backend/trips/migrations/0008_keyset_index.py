@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='trip',
+            name='trips_trip_created_b7c7fb_idx',
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['created_at', 'id'], name='trips_trip_created_378c32_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0008_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Driver',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Driver name', max_length=255)),
+                ('license_number', models.CharField(blank=True, help_text="Commercial driver's license number", max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='driver',
+            field=models.ForeignKey(blank=True, help_text='Driver of the trip; their cycle hours are tracked across trips', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trips', to='trips.driver'),
+        ),
+    ]
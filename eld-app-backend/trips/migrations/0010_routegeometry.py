@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0009_driver'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteGeometry',
+            fields=[
+                ('trip', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='route_geometry', serialize=False, to='trips.trip')),
+                ('distance', models.FloatField(help_text='Route distance (in meters)')),
+                ('duration', models.FloatField(help_text='Route duration (in seconds)')),
+                ('polyline', models.TextField(help_text='Route waypoints as an encoded polyline of [longitude, latitude] pairs')),
+                ('precision', models.PositiveSmallIntegerField(default=5, help_text='Decimal places kept by the polyline encoding')),
+                ('point_count', models.PositiveIntegerField(default=0, help_text='Number of waypoints in the polyline')),
+                ('legs', models.JSONField(default=list, help_text='Distance, duration and waypoint index range of each leg')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0010_routegeometry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Incremented whenever the trip, its stops or its logs change'),
+        ),
+    ]
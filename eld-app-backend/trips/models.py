@@ -1,6 +1,21 @@
 from django.db import models
 from django.utils import timezone
 
+from . import polyline
+
+class Driver(models.Model):
+    name = models.CharField(max_length=255, help_text="Driver name")
+    license_number = models.CharField(max_length=50, blank=True, help_text="Commercial driver's license number")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+
+
 class Trip(models.Model):
     STATUS_CHOICES = [
         ('planned', 'Planned'),
@@ -12,18 +27,49 @@ class Trip(models.Model):
     current_location = models.CharField(max_length=255, help_text="Current location as string or coordinates")
     pickup_location = models.CharField(max_length=255, help_text="Pickup location as string or coordinates")
     dropoff_location = models.CharField(max_length=255, help_text="Dropoff location as string or coordinates")
+    driver = models.ForeignKey(
+        Driver, on_delete=models.SET_NULL, null=True, blank=True, related_name='trips',
+        help_text="Driver of the trip; their cycle hours are tracked across trips"
+    )
     current_cycle_hours = models.FloatField(help_text="Current cycle hours used (in hours)")
     start_time = models.DateTimeField(default=timezone.now, help_text="Trip start time")
     total_distance = models.FloatField(null=True, blank=True, help_text="Total trip distance (in miles)")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='planned', help_text="Trip status")
+    version = models.PositiveIntegerField(default=1, help_text="Incremented whenever the trip, its stops or its logs change")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Trip from {self.current_location} to {self.dropoff_location} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        """Saving an existing trip also increments its version, invalidating its cached responses"""
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = [*kwargs['update_fields'], 'version']
+        version = self.version
+        self.version = models.F('version') + 1
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            self.version = version
+            raise
+        self.refresh_from_db(fields=['version'])
+
+    def bump_version(self):
+        """Increment the trip's version in the database, invalidating its cached responses"""
+        if Trip.bump_versions([self.pk]):
+            self.refresh_from_db(fields=['version'])
+
+    @classmethod
+    def bump_versions(cls, pks):
+        """Increment the version of several trips in one query, e.g. after bulk writes to their rows"""
+        return cls.objects.filter(pk__in=pks).update(version=models.F('version') + 1)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at', 'id'])]
 
 
 class Stop(models.Model):
@@ -47,5 +93,100 @@ class Stop(models.Model):
     def __str__(self):
         return f"{self.get_type_display()} at {self.location}"
 
+    # Bulk writes skip these, so bulk callers bump the trip's version themselves
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Trip.bump_versions([self.trip_id])
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Trip.bump_versions([self.trip_id])
+        return result
+
     class Meta:
         ordering = ['sequence']
+        indexes = [
+            models.Index(fields=['trip', 'sequence']),
+            models.Index(fields=['trip', 'arrival_time']),
+        ]
+
+
+class RouteGeometry(models.Model):
+    trip = models.OneToOneField(Trip, on_delete=models.CASCADE, primary_key=True, related_name='route_geometry')
+    distance = models.FloatField(help_text="Route distance (in meters)")
+    duration = models.FloatField(help_text="Route duration (in seconds)")
+    polyline = models.TextField(help_text="Route waypoints as an encoded polyline of [longitude, latitude] pairs")
+    precision = models.PositiveSmallIntegerField(default=5, help_text="Decimal places kept by the polyline encoding")
+    point_count = models.PositiveIntegerField(default=0, help_text="Number of waypoints in the polyline")
+    legs = models.JSONField(default=list, help_text="Distance, duration and waypoint index range of each leg")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Route of {self.trip} ({self.point_count} points)"
+
+    @property
+    def coordinates(self):
+        """The decoded [longitude, latitude] waypoints"""
+        return polyline.decode(self.polyline, self.precision)
+
+
+class GeocodeCacheEntry(models.Model):
+    query = models.CharField(max_length=255, unique=True, help_text="Normalized location string")
+    longitude = models.FloatField(help_text="Geocoded longitude")
+    latitude = models.FloatField(help_text="Geocoded latitude")
+    created_at = models.DateTimeField(default=timezone.now, help_text="When the location was geocoded")
+    last_used_at = models.DateTimeField(default=timezone.now, help_text="Last time the entry was read")
+
+    def __str__(self):
+        return f"{self.query} -> ({self.longitude}, {self.latitude})"
+
+    class Meta:
+        ordering = ['-last_used_at']
+
+
+class RouteCacheEntry(models.Model):
+    key = models.CharField(max_length=255, unique=True, help_text="Profile and rounded coordinates of the route waypoints")
+    profile = models.CharField(max_length=50, help_text="OpenRouteService routing profile")
+    distance = models.FloatField(help_text="Route distance (in meters)")
+    duration = models.FloatField(help_text="Route duration (in seconds)")
+    geometry = models.TextField(blank=True, help_text="Route waypoints as an encoded polyline")
+    legs = models.JSONField(default=list, help_text="Distance and duration of each leg between consecutive coordinates")
+    created_at = models.DateTimeField(default=timezone.now, help_text="When the route was calculated")
+
+    def __str__(self):
+        return self.key
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class PlanningJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    STEP_CHOICES = [
+        ('queued', 'Waiting for a worker'),
+        ('stops', 'Routing and generating stops'),
+        ('eld_logs', 'Generating ELD logs'),
+        ('done', 'Done'),
+    ]
+
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='planning_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', help_text="Job status")
+    step = models.CharField(max_length=20, choices=STEP_CHOICES, default='queued', help_text="Current planning step")
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Progress (in percent)")
+    error = models.TextField(blank=True, help_text="Error message if the job failed")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Planning job {self.id} for trip {self.trip_id} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
@@ -0,0 +1,241 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+DEFAULT_ORS_CLIENT = {
+    'BASE_URL': 'https://api.openrouteservice.org',
+    'CONNECT_TIMEOUT': 3.05,  # seconds
+    'READ_TIMEOUT': 15.0,  # seconds
+    'MAX_RETRIES': 2,
+    'BACKOFF_BASE': 0.5,  # seconds
+    'BACKOFF_MAX': 8.0,  # seconds
+    'POOL_SIZE': 10,
+    'CIRCUIT_FAILURE_THRESHOLD': 5,
+    'CIRCUIT_RESET_TIMEOUT': 30.0,  # seconds
+}
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RoutingError(ValueError):
+    """Raised when OpenRouteService cannot be reached or keeps failing"""
+
+
+class CircuitOpenError(RoutingError):
+    """Raised without making a request while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Opens after a run of consecutive failures and rejects calls until the reset timeout has passed.
+    After that a single trial call is let through: success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self._state()
+            if state == 'open':
+                raise CircuitOpenError("OpenRouteService circuit breaker is open")
+            if state == 'half_open':
+                # Let one trial call through and hold everybody else back until it reports
+                self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ORSClient:
+    """
+    Shared HTTP client for the OpenRouteService API.
+    Keeps connections alive in a pooled session, applies connect/read timeouts, retries 429/5xx
+    responses and connection errors with jittered exponential backoff, and trips a circuit breaker
+    when the service keeps failing.
+    """
+
+    def __init__(self, base_url, connect_timeout, read_timeout, max_retries, backoff_base, backoff_max,
+                 pool_size, circuit_failure_threshold, circuit_reset_timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.breaker = CircuitBreaker(circuit_failure_threshold, circuit_reset_timeout)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULT_ORS_CLIENT, **getattr(settings, 'ORS_CLIENT', {})}
+        return cls(
+            base_url=config['BASE_URL'],
+            connect_timeout=config['CONNECT_TIMEOUT'],
+            read_timeout=config['READ_TIMEOUT'],
+            max_retries=config['MAX_RETRIES'],
+            backoff_base=config['BACKOFF_BASE'],
+            backoff_max=config['BACKOFF_MAX'],
+            pool_size=config['POOL_SIZE'],
+            circuit_failure_threshold=config['CIRCUIT_FAILURE_THRESHOLD'],
+            circuit_reset_timeout=config['CIRCUIT_RESET_TIMEOUT'],
+        )
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def backoff(self, attempt, response=None):
+        """Seconds to wait before the given retry attempt, honouring Retry-After on 429 responses"""
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        # Full jitter: a random delay up to the capped exponential backoff
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method, path, **kwargs):
+        """
+        Send a request to OpenRouteService and return the response.
+        Non-retryable responses (e.g. 4xx) are returned for the caller to handle; a RoutingError is
+        raised once retries are exhausted, and a CircuitOpenError while the circuit is open.
+        """
+        self.breaker.before_call()
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = f"OpenRouteService request failed: {e}"
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    self.breaker.record_success()
+                    return response
+                error = f"OpenRouteService returned {response.status_code}: {response.text}"
+
+            if attempt < self.max_retries:
+                time.sleep(self.backoff(attempt, response))
+
+        self.breaker.record_failure()
+        raise RoutingError(error)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+
+class AsyncORSClient(ORSClient):
+    """
+    asyncio counterpart of ORSClient for async views, built on httpx.AsyncClient.
+    Applies the same timeouts, retry policy and circuit breaker. An httpx client is bound to the
+    event loop it was created on, so one pooled client is kept per running loop; loops that end
+    with the request (async views served under WSGI) must close theirs with aclose().
+    """
+
+    def __init__(self, *args, transport=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transport = transport
+        self._clients = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            connect_timeout, read_timeout = self.timeout
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                transport=self.transport,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Close the running loop's httpx client, if any; the next request on the loop opens a new one"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def request(self, method, path, **kwargs):
+        """
+        Send a request to OpenRouteService and return the response (see ORSClient.request).
+        Waits between retries without blocking the event loop.
+        """
+        self.breaker.before_call()
+        url = f"{self.base_url}/{path.lstrip('/')}"
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = f"OpenRouteService request failed: {e}"
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    self.breaker.record_success()
+                    return response
+                error = f"OpenRouteService returned {response.status_code}: {response.text}"
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff(attempt, response))
+
+        self.breaker.record_failure()
+        raise RoutingError(error)
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+
+ors_client = ORSClient.from_settings()
+async_ors_client = AsyncORSClient.from_settings()
+# Both clients call the same service, so failures seen by either open the circuit for both
+async_ors_client.breaker = ors_client.breaker
@@ -0,0 +1,161 @@
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PlanningJob, Trip, Stop, RouteGeometry
+from .utils import generate_stops_for_trip
+from eld_logs.utils import generate_eld_logs_for_trip, refresh_driver_logs
+
+DEFAULT_TRIP_PLANNING = {
+    'ASYNC': False,
+    'EXECUTOR': 'thread',
+    'WORKERS': 4,
+    # Seconds after which a running job is presumed lost with its worker and can be claimed again
+    'JOB_TIMEOUT': 600,
+    'BULK_CONCURRENCY': 8,
+    'BULK_MAX_ITEMS': 500,
+}
+
+
+def get_planning_config():
+    return {**DEFAULT_TRIP_PLANNING, **getattr(settings, 'TRIP_PLANNING', {})}
+
+
+def clear_trip_plan(trip):
+    """
+    Remove what a failed or interrupted planning run left behind: the trip's stops, ELD logs (and
+    their hours in the driver's ledger), route geometry and distance.
+    """
+    with transaction.atomic():
+        dates = list(trip.eld_logs.values_list('date', flat=True))
+        trip.eld_logs.all().delete()
+        Stop.objects.filter(trip=trip).delete()
+        RouteGeometry.objects.filter(trip=trip).delete()
+        Trip.objects.filter(pk=trip.pk).update(total_distance=None)
+        trip.total_distance = None
+        refresh_driver_logs(trip.driver_id, dates, exclude=[trip.pk])
+
+
+def plan_trip(trip, on_step=None):
+    """
+    Run the full planning pipeline for a trip: routing and stop generation, then ELD logs.
+    on_step is called with (step, progress) before each step. If a step fails, the stops and
+    logs written so far are removed before the error is raised.
+    """
+    try:
+        if on_step:
+            on_step('stops', 10)
+        generate_stops_for_trip(trip)
+
+        if on_step:
+            on_step('eld_logs', 60)
+        generate_eld_logs_for_trip(trip)
+    except Exception:
+        clear_trip_plan(trip)
+        raise
+    finally:
+        # Responses cached while the trip was being planned are now stale
+        trip.bump_version()
+
+
+def claimable_jobs():
+    """Queued jobs, and running jobs whose worker has not finished them within JOB_TIMEOUT"""
+    cutoff = timezone.now() - datetime.timedelta(seconds=get_planning_config()['JOB_TIMEOUT'])
+    return PlanningJob.objects.filter(Q(status='queued') | Q(status='running', started_at__lt=cutoff))
+
+
+def claim_job(job_id):
+    """
+    Atomically move a queued (or timed-out running) job to running.
+    Returns the job, or None if another worker got it first.
+    """
+    claimed = claimable_jobs().filter(pk=job_id).update(
+        status='running',
+        started_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    return PlanningJob.objects.select_related('trip').get(pk=job_id)
+
+
+def claim_next_job():
+    """Claim the oldest queued or timed-out job, or return None if there is none"""
+    while True:
+        job_id = claimable_jobs().order_by('created_at').values_list('pk', flat=True).first()
+        if job_id is None:
+            return None
+        job = claim_job(job_id)
+        if job is not None:
+            return job
+
+
+def run_job(job):
+    """
+    Run a claimed planning job, recording progress and the outcome on the job row.
+    """
+    def on_step(step, progress):
+        PlanningJob.objects.filter(pk=job.pk).update(step=step, progress=progress)
+
+    try:
+        if job.step != 'queued':
+            # Reclaimed from a worker that died mid-run: start over from a clean trip
+            clear_trip_plan(job.trip)
+        plan_trip(job.trip, on_step=on_step)
+    except Exception as e:
+        PlanningJob.objects.filter(pk=job.pk).update(
+            status='failed',
+            error=str(e),
+            finished_at=timezone.now()
+        )
+        return False
+
+    PlanningJob.objects.filter(pk=job.pk).update(
+        status='succeeded',
+        step='done',
+        progress=100,
+        finished_at=timezone.now()
+    )
+    return True
+
+
+def _run_queued_job(job_id):
+    close_old_connections()
+    try:
+        job = claim_job(job_id)
+        if job is not None:
+            run_job(job)
+    finally:
+        close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_planning_config()['WORKERS'],
+                    thread_name_prefix='trip-planning'
+                )
+    return _executor
+
+
+def enqueue_trip_planning(trip):
+    """
+    Queue a planning job for a trip and return it.
+    With the 'thread' executor the job is handed to the in-process worker pool once the current
+    transaction commits; with 'worker' it is left for the run_planning_worker command to pick up.
+    """
+    job = PlanningJob.objects.create(trip=trip)
+    if get_planning_config()['EXECUTOR'] == 'thread':
+        transaction.on_commit(lambda: get_executor().submit(_run_queued_job, job.pk))
+    return job
@@ -0,0 +1,88 @@
+import numpy as np
+
+from .interpolation import EARTH_RADIUS_METERS
+
+
+def encode(coordinates, precision=5):
+    """
+    Encode a list of coordinate pairs with the encoded polyline algorithm.
+    Pairs are encoded in the order given, so [lon, lat] input decodes back to [lon, lat].
+    """
+    factor = 10 ** precision
+    output = []
+    previous = [0, 0]
+    for pair in coordinates:
+        for i in (0, 1):
+            value = int(round(pair[i] * factor))
+            delta = value - previous[i]
+            previous[i] = value
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                output.append(chr((0x20 | (delta & 0x1f)) + 63))
+                delta >>= 5
+            output.append(chr(delta + 63))
+    return ''.join(output)
+
+
+def decode(encoded, precision=5):
+    """
+    Decode an encoded polyline string back into a list of [x, y] coordinate pairs.
+    """
+    factor = 10 ** precision
+    coordinates = []
+    values = [0, 0]
+    index = 0
+    length = len(encoded)
+    while index < length:
+        for i in (0, 1):
+            shift = 0
+            result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            values[i] += ~(result >> 1) if result & 1 else result >> 1
+        coordinates.append([values[0] / factor, values[1] / factor])
+    return coordinates
+
+
+def simplify(coordinates, tolerance):
+    """
+    Simplify a line of [longitude, latitude] pairs with the Douglas-Peucker algorithm, dropping
+    points that lie within tolerance meters of the simplified line. The end points are always kept.
+    """
+    points = np.asarray(coordinates, dtype=np.float64)
+    if len(points) < 3 or tolerance <= 0:
+        return points[:, :2].tolist() if len(points) else []
+
+    # Project onto a local plane in meters, which is accurate enough for the tolerances used for maps
+    xy = np.radians(points[:, :2]) * EARTH_RADIUS_METERS
+    xy[:, 0] *= np.cos(np.radians(points[:, 1].mean()))
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    ranges = [(0, len(points) - 1)]
+    while ranges:
+        start, end = ranges.pop()
+        if end - start < 2:
+            continue
+        origin = xy[start]
+        dx, dy = xy[end] - origin
+        offsets = xy[start + 1:end] - origin
+        length = np.hypot(dx, dy)
+        if length > 0:
+            distances = np.abs(dx * offsets[:, 1] - dy * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            index = start + 1 + farthest
+            keep[index] = True
+            ranges.append((start, index))
+            ranges.append((index, end))
+
+    return points[keep, :2].tolist()
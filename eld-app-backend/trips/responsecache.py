@@ -0,0 +1,77 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_RESPONSE_CACHE = {
+    'CACHE': 'default',
+    'TIMEOUT': 24 * 3600,
+}
+
+
+class ResponseCache:
+    """
+    Cache of serialized trip responses keyed on the trip (its id and creation time, as ids can be
+    reused after a delete), the trip's version, the view and the query string. Trip.version is
+    incremented whenever the trip, its stops or its logs change, so a changed trip simply stops
+    matching its old entries; the timeout only bounds how long entries for superseded versions
+    linger.
+    """
+
+    def __init__(self):
+        config = {**DEFAULT_RESPONSE_CACHE, **getattr(settings, 'RESPONSE_CACHE', {})}
+        self.alias = config['CACHE']
+        self.timeout = config['TIMEOUT']
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def make_key(self, trip, view, query_params=None):
+        """trip is a (pk, version, created_at) tuple"""
+        trip_id, version, created_at = trip
+        # Order-insensitive, so ?fields=id&expand=stops and ?expand=stops&fields=id share an entry
+        query = '&'.join(sorted(
+            f"{name}={value}" for name, values in query_params.lists() for value in values
+        )) if query_params else ''
+        digest = hashlib.md5(f"{created_at.isoformat()}/{view}?{query}".encode()).hexdigest()[:16]
+        return f"trip:{trip_id}:v{version}:{digest}"
+
+    def etag(self, trip, view, query_params=None):
+        """Strong ETag of a trip response, which changes exactly when the trip's version does"""
+        return '"' + self.make_key(trip, view, query_params).replace(':', '-') + '"'
+
+    def get(self, key):
+        data = self.cache.get(key)
+        self._count('misses' if data is None else 'hits')
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data, self.timeout)
+
+    def not_modified(self):
+        self._count('not_modified')
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop cached responses and reset counters"""
+        self.cache.clear()
+        with self._stats_lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,130 @@
+import hashlib
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from . import polyline
+from .models import RouteCacheEntry
+
+DEFAULT_ROUTE_CACHE = {
+    'TTL': 7 * 24 * 3600,
+    'CACHE': 'routes',
+    'COORDINATE_PRECISION': 4,
+    'POLYLINE_PRECISION': 5,
+}
+
+
+class RouteCache:
+    """
+    Database-backed cache of calculate_route results, with decoded routes kept in a named Django
+    cache (settings.CACHES['routes']) in front of the table.
+    Entries are keyed on the routing profile plus the rounded coordinates of every routed location,
+    and the waypoint geometry is stored as an encoded polyline.
+    """
+
+    def __init__(self):
+        config = {**DEFAULT_ROUTE_CACHE, **getattr(settings, 'ROUTE_CACHE', {})}
+        self.ttl = config['TTL']
+        self.coordinate_precision = config['COORDINATE_PRECISION']
+        self.polyline_precision = config['POLYLINE_PRECISION']
+        self.alias = config['CACHE']
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'memory_hits': 0, 'misses': 0}
+
+    @property
+    def memory(self):
+        return caches[self.alias]
+
+    def memory_key(self, key):
+        return 'route:' + hashlib.md5(key.encode()).hexdigest()
+
+    def make_key(self, coordinates, profile):
+        points = ';'.join(
+            f"{lon:.{self.coordinate_precision}f},{lat:.{self.coordinate_precision}f}"
+            for lon, lat in coordinates
+        )
+        return f"{profile}:{points}"
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, coordinates, profile):
+        """
+        Return the cached route for the coordinates and profile, or None on a miss.
+        """
+        key = self.make_key(coordinates, profile)
+        route = self.memory.get(self.memory_key(key))
+        if route is not None:
+            self._count('hits')
+            self._count('memory_hits')
+            return route
+
+        now = timezone.now()
+        entry = RouteCacheEntry.objects.filter(
+            key=key,
+            created_at__gte=now - timedelta(seconds=self.ttl)
+        ).first()
+        if entry is None:
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        route = {
+            'distance': entry.distance,
+            'duration': entry.duration,
+            'waypoints': polyline.decode(entry.geometry, self.polyline_precision),
+            'legs': entry.legs or [{'distance': entry.distance, 'duration': entry.duration}],
+        }
+        # Keep the decoded route only for as long as the table entry stays fresh
+        remaining = self.ttl - (now - entry.created_at).total_seconds()
+        self.memory.set(self.memory_key(key), route, max(1, int(remaining)))
+        return route
+
+    def set(self, coordinates, profile, route):
+        key = self.make_key(coordinates, profile)
+        RouteCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                'profile': profile,
+                'distance': route['distance'],
+                'duration': route['duration'],
+                'geometry': polyline.encode(route['waypoints'], self.polyline_precision),
+                'legs': route['legs'],
+                'created_at': timezone.now(),
+            }
+        )
+        # Store what a table lookup would return, i.e. the geometry after the polyline round trip
+        self.memory.set(self.memory_key(key), {
+            'distance': route['distance'],
+            'duration': route['duration'],
+            'waypoints': polyline.decode(polyline.encode(route['waypoints'], self.polyline_precision), self.polyline_precision),
+            'legs': route['legs'],
+        }, self.ttl)
+
+    def purge_expired(self):
+        """Delete entries older than the TTL and return how many were removed"""
+        deleted, _ = RouteCacheEntry.objects.filter(
+            created_at__lt=timezone.now() - timedelta(seconds=self.ttl)
+        ).delete()
+        return deleted
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop the cache tier and reset counters (the table is left untouched)"""
+        self.memory.clear()
+        with self._stats_lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+route_cache = RouteCache()
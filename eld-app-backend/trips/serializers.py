@@ -1,5 +1,11 @@
 from rest_framework import serializers
-from .models import Trip, Stop
+from .models import Driver, Trip, Stop, PlanningJob
+
+class DriverSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Driver
+        fields = ['id', 'name', 'license_number', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
 
 class StopSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,13 +16,43 @@ class StopSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class PlannedStopSerializer(serializers.ModelSerializer):
+    """Unsaved stops returned by a dry-run plan"""
+    class Meta:
+        model = Stop
+        fields = ['location', 'type', 'arrival_time', 'duration', 'sequence']
+        read_only_fields = fields
+
+def get_requested_fields(request):
+    """
+    Return the sparse fieldset requested with ?fields= (plus anything in ?expand=),
+    or None if the full representation was requested.
+    """
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get('fields', None)
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    expand = request.query_params.get('expand', '')
+    requested.update(name.strip() for name in expand.split(',') if name.strip())
+    return requested
+
 class TripSerializer(serializers.ModelSerializer):
     stops = StopSerializer(many=True, read_only=True)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Drop fields the client did not ask for (e.g. ?fields=id,status skips stops entirely)
+        requested = get_requested_fields(self.context.get('request'))
+        if requested is not None:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
     class Meta:
         model = Trip
         fields = [
-            'id', 'current_location', 'pickup_location',
+            'id', 'driver', 'current_location', 'pickup_location',
             'dropoff_location', 'current_cycle_hours', 'start_time',
             'total_distance', 'status', 'stops', 'created_at', 'updated_at'
         ]
@@ -34,7 +70,7 @@ class TripCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Trip
         fields = [
-            'current_location', 'pickup_location',
+            'driver', 'current_location', 'pickup_location',
             'dropoff_location', 'current_cycle_hours', 'start_time',
             'status'
         ]
@@ -45,4 +81,13 @@ class TripCreateSerializer(serializers.ModelSerializer):
         """
         if 'current_cycle_hours' in data and (data['current_cycle_hours'] < 0 or data['current_cycle_hours'] > 70):
             raise serializers.ValidationError("Current cycle hours must be between 0 and 70 hours")
-        return data
\ No newline at end of file
+        return data
+
+class PlanningJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PlanningJob
+        fields = [
+            'id', 'trip', 'status', 'step', 'progress', 'error',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
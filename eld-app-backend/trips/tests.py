@@ -1,9 +1,41 @@
-from django.test import TestCase, Client
+from unittest import mock
+from django.conf import settings
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+import base64
+import re
 from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from rest_framework import status
 from rest_framework.test import APITestCase
-from .models import Trip, Stop
+from .models import Trip, Stop, GeocodeCacheEntry, RouteCacheEntry, PlanningJob, RouteGeometry, Driver
+from eld_logs.models import ELDLog, DriverDutyDay
+from eld_logs.utils import generate_eld_logs_for_trip, build_eld_logs_for_trip, sync_eld_logs_for_trip
+from .geocache import geocode_cache
+from eld_app.cache import LocMemCache, FileBasedCache, SQLiteCache, StatsMixin
+from .routecache import route_cache
+from .responsecache import response_cache
+from .ors_client import ORSClient, AsyncORSClient, RoutingError, CircuitOpenError
+from .views import TripPagination
+from .utils import (
+    get_coordinates, calculate_route, generate_stops_for_trip, sync_stops_for_trip,
+    build_stops_for_trip, join_routes, fetch_route, meters_to_miles
+)
+from .interpolation import RouteIndex
+from .hos import Leg, PlannedStop, plan_schedule, fuel_stop_hours
+from . import polyline
 from django.utils import timezone
+import datetime
+import tempfile
+import time
+import requests
+import json
+import asyncio
+import httpx
+from asgiref.sync import async_to_sync
 
 class TripViewSetTests(APITestCase):
     def setUp(self):
@@ -128,3 +160,1450 @@ class TripViewSetTests(APITestCase):
         url = reverse('trip-list')
         response = self.client.post(url, invalid_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def geocode_response(lon, lat):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {'features': [{'geometry': {'coordinates': [lon, lat]}}]}
+    return response
+
+
+def directions_response(legs, waypoints, way_points=None):
+    response = mock.Mock(status_code=200)
+    properties = {'segments': [{'distance': distance, 'duration': duration} for distance, duration in legs]}
+    if way_points is not None:
+        properties['way_points'] = way_points
+    response.json.return_value = {
+        'features': [{
+            'properties': properties,
+            'geometry': {'coordinates': waypoints},
+        }]
+    }
+    return response
+
+
+@override_settings(OPENROUTESERVICE_API_KEY='test-key')
+class GeocodeCacheTests(TestCase):
+    def setUp(self):
+        geocode_cache.clear()
+        route_cache.clear()
+
+    @mock.patch('trips.utils.ors_client.get')
+    def test_repeated_location_is_geocoded_once(self, mock_get):
+        """Test that a normalized location only hits the geocoding API once"""
+        mock_get.return_value = geocode_response(-71.06, 42.36)
+        self.assertEqual(get_coordinates("Boston, MA"), (-71.06, 42.36))
+        self.assertEqual(get_coordinates("  boston,   MA "), (-71.06, 42.36))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(geocode_cache.stats()['memory_hits'], 1)
+
+    @mock.patch('trips.utils.ors_client.get')
+    def test_database_tier_survives_memory_clear(self, mock_get):
+        """Test that the database tier answers when the in-process tier is empty"""
+        mock_get.return_value = geocode_response(-75.16, 39.95)
+        get_coordinates("Philadelphia, PA")
+        geocode_cache.clear()
+        self.assertEqual(get_coordinates("Philadelphia, PA"), (-75.16, 39.95))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(geocode_cache.stats()['db_hits'], 1)
+
+    @mock.patch('trips.utils.ors_client.get')
+    def test_expired_entries_are_refreshed(self, mock_get):
+        """Test that entries older than the TTL are geocoded again"""
+        mock_get.return_value = geocode_response(-87.63, 41.88)
+        GeocodeCacheEntry.objects.create(
+            query="chicago, il",
+            longitude=0.0,
+            latitude=0.0,
+            created_at=timezone.now() - datetime.timedelta(seconds=geocode_cache.ttl + 1)
+        )
+        self.assertEqual(get_coordinates("Chicago, IL"), (-87.63, 41.88))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(GeocodeCacheEntry.objects.get(query="chicago, il").longitude, -87.63)
+
+    def test_database_hit_keeps_remaining_ttl(self):
+        """Test that a database hit is only kept in memory for the rest of the row's lifetime"""
+        GeocodeCacheEntry.objects.create(
+            query="chicago, il",
+            longitude=-87.63,
+            latitude=41.88,
+            created_at=timezone.now() - datetime.timedelta(seconds=geocode_cache.ttl - 60)
+        )
+        with mock.patch.object(geocode_cache.memory, 'set') as memory_set:
+            self.assertEqual(geocode_cache.get("Chicago, IL"), (-87.63, 41.88))
+        self.assertTrue(0 < memory_set.call_args.args[2] <= 60)
+
+    def test_lru_eviction(self):
+        """Test that the in-process tier evicts the least recently used entry"""
+        cache = LocMemCache('test-lru', {'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 2}})
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    @mock.patch('trips.utils.ors_client.get')
+    def test_prewarm_command(self, mock_get):
+        """Test prewarming the cache from existing trips"""
+        mock_get.return_value = geocode_response(-74.0, 40.7)
+        Trip.objects.create(
+            current_location="New York, NY",
+            pickup_location="Boston, MA",
+            dropoff_location="new york, ny",
+            current_cycle_hours=0.0
+        )
+        call_command('prewarm_geocode_cache', stdout=mock.Mock())
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(GeocodeCacheEntry.objects.count(), 2)
+
+
+@override_settings(OPENROUTESERVICE_API_KEY='test-key')
+class RouteCacheTests(TestCase):
+    def setUp(self):
+        geocode_cache.clear()
+        route_cache.clear()
+
+    def test_polyline_round_trip(self):
+        """Test that encoded geometry decodes to the original waypoints"""
+        waypoints = [[-74.00597, 40.71427], [-73.5, 41.0], [-71.05977, 42.35843]]
+        self.assertEqual(polyline.decode(polyline.encode(waypoints)), waypoints)
+
+    @mock.patch('trips.utils.ors_client.post')
+    def test_route_is_cached_by_rounded_coordinates(self, mock_post):
+        """Test that nearby coordinates reuse the cached route"""
+        waypoints = [[-74.0, 40.7], [-71.06, 42.36]]
+        mock_post.return_value = directions_response([(350000.0, 14400.0)], waypoints)
+        first = calculate_route("-74.00001,40.70001", "-71.06,42.36")
+        second = calculate_route("-74.00002,40.70002", "-71.06,42.36")
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(second['waypoints'], waypoints)
+
+    @mock.patch('trips.utils.ors_client.post')
+    @mock.patch('trips.utils.ors_client.get')
+    def test_regenerating_unchanged_trip_makes_no_network_calls(self, mock_get, mock_post):
+        """Test that regenerating stops for an unchanged trip is served from the caches"""
+        mock_get.return_value = geocode_response(-74.0, 40.7)
+        mock_post.return_value = directions_response(
+            [(350000.0, 14400.0), (500000.0, 18000.0)],
+            [[-74.0, 40.7], [-71.06, 42.36], [-75.16, 39.95]]
+        )
+        trip = Trip.objects.create(
+            current_location="New York, NY",
+            pickup_location="Boston, MA",
+            dropoff_location="Philadelphia, PA",
+            current_cycle_hours=0.0
+        )
+        generate_stops_for_trip(trip)
+        calls = mock_get.call_count + mock_post.call_count
+
+        trip.stops.all().delete()
+        generate_stops_for_trip(trip)
+        self.assertEqual(mock_get.call_count + mock_post.call_count, calls)
+
+
+@override_settings(OPENROUTESERVICE_API_KEY='test-key')
+class MultiWaypointRoutingTests(TestCase):
+    def setUp(self):
+        geocode_cache.clear()
+        route_cache.clear()
+        self.trip = Trip.objects.create(
+            current_location="New York, NY",
+            pickup_location="Boston, MA",
+            dropoff_location="Philadelphia, PA",
+            current_cycle_hours=0.0
+        )
+
+    @mock.patch('trips.utils.ors_client.post')
+    @mock.patch('trips.utils.ors_client.get')
+    def test_trip_is_routed_with_one_directions_request(self, mock_get, mock_post):
+        """Test that a trip costs one geocode per distinct location and a single directions request"""
+        mock_get.return_value = geocode_response(-74.0, 40.7)
+        mock_post.return_value = directions_response(
+            [(350000.0, 4 * 3600.0), (500000.0, 5 * 3600.0)],
+            [[-74.0, 40.7], [-71.06, 42.36], [-75.16, 39.95]]
+        )
+        stops = generate_stops_for_trip(self.trip)
+
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(len(mock_post.call_args.kwargs['json']['coordinates']), 3)
+
+        pickup = next(stop for stop in stops if stop.type == 'pickup')
+        self.assertEqual(pickup.arrival_time, self.trip.start_time + datetime.timedelta(hours=4))
+        self.assertAlmostEqual(self.trip.total_distance, 850000.0 * 0.000621371)
+
+    @mock.patch('trips.utils.ors_client.post')
+    @mock.patch('trips.utils.ors_client.get')
+    def test_sequential_mode(self, mock_get, mock_post):
+        """Test that the sequential routing mode issues one directions request per leg"""
+        places = {
+            "New York, NY": (-74.0, 40.7),
+            "Boston, MA": (-71.06, 42.36),
+            "Philadelphia, PA": (-75.16, 39.95),
+        }
+        mock_get.side_effect = lambda url, **kwargs: geocode_response(*places[kwargs['params']['text']])
+        mock_post.return_value = directions_response([(350000.0, 4 * 3600.0)], [[-74.0, 40.7], [-71.06, 42.36]])
+        with self.settings(TRIP_ROUTING_MODE='sequential'):
+            generate_stops_for_trip(self.trip)
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(mock_get.call_count, 3)
+
+
+class ORSClientTests(TestCase):
+    def setUp(self):
+        self.ors = ORSClient(
+            base_url='https://ors.test',
+            connect_timeout=1.0,
+            read_timeout=2.0,
+            max_retries=2,
+            backoff_base=0,
+            backoff_max=0,
+            pool_size=2,
+            circuit_failure_threshold=2,
+            circuit_reset_timeout=60.0,
+        )
+
+    @mock.patch('requests.Session.request')
+    def test_retries_server_errors(self, mock_request):
+        """Test that 5xx responses are retried and timeouts are always applied"""
+        mock_request.side_effect = [mock.Mock(status_code=503, text=''), mock.Mock(status_code=200)]
+        response = self.ors.get('geocode/search', params={'text': 'Boston, MA'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual(mock_request.call_args.args, ('GET', 'https://ors.test/geocode/search'))
+        self.assertEqual(mock_request.call_args.kwargs['timeout'], (1.0, 2.0))
+
+    @mock.patch('requests.Session.request')
+    def test_client_errors_are_not_retried(self, mock_request):
+        """Test that 4xx responses are returned to the caller without retrying"""
+        mock_request.return_value = mock.Mock(status_code=400)
+        self.assertEqual(self.ors.get('geocode/search').status_code, 400)
+        self.assertEqual(mock_request.call_count, 1)
+
+    @mock.patch('requests.Session.request')
+    def test_circuit_opens_after_repeated_failures(self, mock_request):
+        """Test that the circuit breaker rejects calls once failures pile up"""
+        mock_request.side_effect = requests.ConnectionError("connection refused")
+        for _ in range(2):
+            with self.assertRaises(RoutingError):
+                self.ors.post('v2/directions/driving-hgv', json={})
+        self.assertEqual(mock_request.call_count, 6)
+        self.assertEqual(self.ors.breaker.state, 'open')
+
+        with self.assertRaises(CircuitOpenError):
+            self.ors.post('v2/directions/driving-hgv', json={})
+        self.assertEqual(mock_request.call_count, 6)
+
+
+class AsyncORSClientTests(TestCase):
+    def client_for(self, handler):
+        return AsyncORSClient(
+            base_url='https://ors.test',
+            connect_timeout=1.0,
+            read_timeout=2.0,
+            max_retries=2,
+            backoff_base=0,
+            backoff_max=0,
+            pool_size=2,
+            circuit_failure_threshold=2,
+            circuit_reset_timeout=60.0,
+            transport=httpx.MockTransport(handler),
+        )
+
+    def test_retries_server_errors(self):
+        """Test that the async client retries 5xx responses like the sync client"""
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            return httpx.Response(503 if len(requests_seen) == 1 else 200, json={})
+
+        ors = self.client_for(handler)
+        response = asyncio.run(ors.get('geocode/search', params={'text': 'Boston, MA'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(requests_seen), 2)
+        self.assertEqual(str(requests_seen[-1].url), 'https://ors.test/geocode/search?text=Boston%2C+MA')
+
+    def test_client_per_loop_and_close(self):
+        """Test that a loop reuses its httpx client until aclose() closes it"""
+        ors = self.client_for(lambda request: httpx.Response(200, json={}))
+
+        async def requests_then_close():
+            await ors.get('geocode/search')
+            client = ors.client
+            await ors.get('geocode/search')
+            self.assertIs(ors.client, client)
+            await ors.aclose()
+            self.assertTrue(client.is_closed)
+            self.assertIsNot(ors.client, client)
+            await ors.aclose()
+
+        asyncio.run(requests_then_close())
+
+    def test_circuit_opens_after_repeated_failures(self):
+        """Test that connection errors are retried and then open the circuit"""
+        def handler(request):
+            raise httpx.ConnectError("connection refused", request=request)
+
+        ors = self.client_for(handler)
+        for _ in range(2):
+            with self.assertRaises(RoutingError):
+                asyncio.run(ors.post('v2/directions/driving-hgv', json={}))
+        with self.assertRaises(CircuitOpenError):
+            asyncio.run(ors.post('v2/directions/driving-hgv', json={}))
+
+
+@override_settings(TRIP_PLANNING={'ASYNC': False, 'EXECUTOR': 'worker', 'WORKERS': 1})
+class AsyncPlanningTests(APITestCase):
+    def setUp(self):
+        self.trip_data = {
+            "current_location": "New York, NY",
+            "pickup_location": "Boston, MA",
+            "dropoff_location": "Philadelphia, PA",
+            "current_cycle_hours": 20.0,
+            "status": "planned"
+        }
+
+    def create_async(self):
+        response = self.client.post(reverse('trip-list') + '?async=true', self.trip_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response
+
+    @mock.patch('trips.planning.generate_eld_logs_for_trip')
+    @mock.patch('trips.planning.generate_stops_for_trip')
+    def test_async_create_returns_job(self, mock_stops, mock_logs):
+        """Test that async creation queues a job and the worker completes it"""
+        response = self.create_async()
+        self.assertEqual(response.data['status'], 'queued')
+        mock_stops.assert_not_called()
+
+        status_url = reverse('trip-planning-status', kwargs={'pk': response.data['trip_id']})
+        self.assertEqual(response.data['status_url'], status_url)
+        self.assertEqual(self.client.get(status_url).data['progress'], 0)
+
+        call_command('run_planning_worker', '--once', stdout=mock.Mock())
+        mock_stops.assert_called_once()
+        mock_logs.assert_called_once()
+
+        job = self.client.get(status_url).data
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['progress'], 100)
+
+    @mock.patch('trips.planning.generate_stops_for_trip')
+    def test_failed_job_reports_error(self, mock_stops):
+        """Test that planning errors are recorded on the job"""
+        mock_stops.side_effect = ValueError("Error calculating route: No route found")
+        response = self.create_async()
+        call_command('run_planning_worker', '--once', stdout=mock.Mock())
+
+        job = PlanningJob.objects.get(pk=response.data['job_id'])
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.step, 'stops')
+        self.assertIn("No route found", job.error)
+
+    @mock.patch('trips.planning.generate_eld_logs_for_trip')
+    @mock.patch('trips.planning.generate_stops_for_trip')
+    def test_failed_job_removes_partial_plan(self, mock_stops, mock_logs):
+        """Test that stops written before a planning step failed are removed"""
+        def add_stop(trip):
+            Stop.objects.create(trip=trip, location="Boston, MA", type='pickup',
+                                arrival_time=trip.start_time, duration=1.0, sequence=1)
+        mock_stops.side_effect = add_stop
+        mock_logs.side_effect = ValueError("Log generation failed")
+        response = self.create_async()
+        call_command('run_planning_worker', '--once', stdout=mock.Mock())
+
+        self.assertEqual(PlanningJob.objects.get(pk=response.data['job_id']).status, 'failed')
+        self.assertFalse(Stop.objects.filter(trip_id=response.data['trip_id']).exists())
+
+    @mock.patch('trips.planning.generate_eld_logs_for_trip')
+    @mock.patch('trips.planning.generate_stops_for_trip')
+    def test_timed_out_job_is_reclaimed(self, mock_stops, mock_logs):
+        """Test that a job left running by a dead worker is claimed again and restarted cleanly"""
+        stale = PlanningJob.objects.create(
+            trip=Trip.objects.create(**self.trip_data), status='running', step='stops',
+            started_at=timezone.now() - datetime.timedelta(hours=1)
+        )
+        Stop.objects.create(trip=stale.trip, location="Boston, MA", type='pickup',
+                            arrival_time=stale.trip.start_time, duration=1.0, sequence=1)
+        busy = PlanningJob.objects.create(
+            trip=Trip.objects.create(**self.trip_data), status='running', step='stops', started_at=timezone.now()
+        )
+
+        call_command('run_planning_worker', '--once', stdout=mock.Mock())
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'succeeded')
+        self.assertFalse(Stop.objects.filter(trip=stale.trip).exists())
+        mock_stops.assert_called_once_with(stale.trip)
+        self.assertEqual(PlanningJob.objects.get(pk=busy.pk).status, 'running')
+
+    def test_planning_status_without_job(self):
+        """Test the planning status of a trip that was never queued"""
+        trip = Trip.objects.create(**self.trip_data)
+        response = self.client.get(reverse('trip-planning-status', kwargs={'pk': trip.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(OPENROUTESERVICE_API_KEY='test-key')
+class BulkTripCreateTests(APITestCase):
+    places = {
+        "New York, NY": (-74.0, 40.7),
+        "Boston, MA": (-71.06, 42.36),
+        "Philadelphia, PA": (-75.16, 39.95),
+        "Chicago, IL": (-87.63, 41.88),
+    }
+
+    def setUp(self):
+        geocode_cache.clear()
+        route_cache.clear()
+
+    def fake_geocode(self, path, **kwargs):
+        coordinates = self.places.get(kwargs['params']['text'])
+        if coordinates is None:
+            response = mock.Mock(status_code=200)
+            response.json.return_value = {'features': []}
+            return response
+        return geocode_response(*coordinates)
+
+    def trip(self, current, pickup, dropoff, cycle_hours=10.0):
+        return {
+            "current_location": current,
+            "pickup_location": pickup,
+            "dropoff_location": dropoff,
+            "current_cycle_hours": cycle_hours,
+        }
+
+    @mock.patch('trips.utils.ors_client.post')
+    @mock.patch('trips.utils.ors_client.get')
+    def test_bulk_create_reports_partial_failures(self, mock_get, mock_post):
+        """Test that a batch is created with shared lookups and per-item failures"""
+        mock_get.side_effect = self.fake_geocode
+        mock_post.return_value = directions_response(
+            [(350000.0, 4 * 3600.0), (500000.0, 5 * 3600.0)],
+            [[-74.0, 40.7], [-71.06, 42.36], [-75.16, 39.95]]
+        )
+        payload = [
+            self.trip("New York, NY", "Boston, MA", "Philadelphia, PA"),
+            self.trip("New York, NY", "Boston, MA", "Philadelphia, PA"),
+            self.trip("Chicago, IL", "Boston, MA", "Philadelphia, PA", cycle_hours=80.0),
+            self.trip("Atlantis", "Boston, MA", "Philadelphia, PA"),
+        ]
+        response = self.client.post(reverse('trip-bulk'), payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS, response.data)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['created', 'created', 'failed', 'failed']
+        )
+        self.assertIn('errors', response.data['results'][2])
+        self.assertIn("Atlantis", response.data['results'][3]['error'])
+        self.assertTrue(response.data['results'][0]['trip']['stops'])
+
+        # Invalid items are not geocoded, and shared locations and routes are looked up once
+        self.assertEqual(mock_get.call_count, 4)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(Trip.objects.count(), 2)
+        self.assertEqual(Stop.objects.filter(trip__in=Trip.objects.all()).count(), 2 * len(response.data['results'][0]['trip']['stops']))
+
+    @mock.patch('trips.utils.ors_client.post')
+    @mock.patch('trips.utils.ors_client.get')
+    def test_bulk_create_counts_same_driver_trips(self, mock_get, mock_post):
+        """Test that a driver's trips in one batch count each other's hours as if planned one at a time"""
+        mock_get.side_effect = self.fake_geocode
+        mock_post.return_value = directions_response(
+            [(350000.0, 4 * 3600.0), (500000.0, 5 * 3600.0)],
+            [[-74.0, 40.7], [-71.06, 42.36], [-75.16, 39.95]]
+        )
+        driver = Driver.objects.create(name="Dana", license_number="D-1")
+        later = self.trip("New York, NY", "Boston, MA", "Philadelphia, PA")
+        later.update(driver=driver.pk, start_time="2024-03-01T12:00:00Z")
+        earlier = self.trip("New York, NY", "Boston, MA", "Philadelphia, PA")
+        earlier.update(driver=driver.pk, start_time="2024-03-01T06:00:00Z")
+        response = self.client.post(reverse('trip-bulk'), [later, earlier], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        later_log, earlier_log = (
+            ELDLog.objects.get(trip_id=result['trip']['id'], date=datetime.date(2024, 3, 1))
+            for result in response.data['results']
+        )
+        earlier_hours = earlier_log.driving_hours + earlier_log.on_duty_not_driving_hours
+        later_hours = later_log.driving_hours + later_log.on_duty_not_driving_hours
+        self.assertAlmostEqual(earlier_log.cycle_hours_used, 10.0 + earlier_hours + later_hours)
+        self.assertAlmostEqual(later_log.cycle_hours_used, 10.0 + earlier_hours + later_hours)
+
+        # The stored logs match what planning the trips one at a time produces
+        for trip in Trip.objects.filter(driver=driver):
+            self.assertEqual(sync_eld_logs_for_trip(trip), {'written': 0, 'deleted': 0})
+
+    def test_bulk_create_requires_list(self):
+        """Test that a bulk request must be a non-empty list"""
+        response = self.client.post(reverse('trip-bulk'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+@override_settings(OPENROUTESERVICE_API_KEY='test-key')
+class TripPlanDryRunTests(APITestCase):
+    places = BulkTripCreateTests.places
+
+    def setUp(self):
+        geocode_cache.clear()
+        route_cache.clear()
+        self.url = reverse('trip-plan')
+
+    def fake_geocode(self, path, **kwargs):
+        coordinates = self.places.get(kwargs['params']['text'])
+        if coordinates is None:
+            response = mock.Mock(status_code=200)
+            response.json.return_value = {'features': []}
+            return response
+        return geocode_response(*coordinates)
+
+    def trip(self, current, pickup, dropoff, **extra):
+        return {
+            "current_location": current,
+            "pickup_location": pickup,
+            "dropoff_location": dropoff,
+            "current_cycle_hours": 10.0,
+            "start_time": "2024-03-01T06:00:00Z",
+            **extra
+        }
+
+    @mock.patch('trips.utils.ors_client.post')
+    @mock.patch('trips.utils.ors_client.get')
+    def test_plan_candidates_without_saving(self, mock_get, mock_post):
+        """Test that candidate trips are planned with stops, ELD days and ETAs but nothing is saved"""
+        mock_get.side_effect = self.fake_geocode
+        mock_post.return_value = directions_response(
+            [(350000.0, 4 * 3600.0), (1500000.0, 15 * 3600.0)],
+            [[-74.0, 40.7], [-71.06, 42.36], [-75.16, 39.95]],
+            way_points=[0, 1, 2]
+        )
+        driver = Driver.objects.create(name="Dana", license_number="D-1")
+        payload = [
+            self.trip("New York, NY", "Boston, MA", "Philadelphia, PA", driver=driver.pk),
+            self.trip("New York, NY", "Boston, MA", "Philadelphia, PA"),
+            self.trip("Atlantis", "Boston, MA", "Philadelphia, PA"),
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS, response.data)
+        self.assertEqual((response.data['planned'], response.data['failed']), (2, 1))
+        result = response.data['results'][0]
+        self.assertEqual(result['status'], 'planned')
+        self.assertAlmostEqual(result['total_distance'], meters_to_miles(1850000.0))
+        self.assertEqual([stop['type'] for stop in result['stops']], ['pickup', 'rest', 'fuel', 'dropoff'])
+        self.assertEqual(response.json()['results'][0]['estimated_arrival'], result['stops'][-1]['arrival_time'])
+        self.assertAlmostEqual(sum(log['driving_hours'] for log in result['eld_logs']), 19.0)
+        self.assertEqual(result['eld_logs'][0]['date'], '2024-03-01')
+        self.assertIn("Atlantis", response.data['results'][2]['error'])
+
+        # One directions request for the shared route, and no trip, stop, log or ledger rows
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(Trip.objects.count(), 0)
+        self.assertEqual(Stop.objects.count(), 0)
+        self.assertEqual(ELDLog.objects.count(), 0)
+        self.assertEqual(RouteGeometry.objects.count(), 0)
+        self.assertEqual(DriverDutyDay.objects.count(), 0)
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if re.match(r'\s*(INSERT|UPDATE|DELETE)', query['sql'])
+            and 'cacheentry' not in query['sql']
+        ]
+        self.assertEqual(writes, [])
+
+    @mock.patch('trips.utils.ors_client.post')
+    @mock.patch('trips.utils.ors_client.get')
+    def test_plan_single_trip_matches_create(self, mock_get, mock_post):
+        """Test that a single dry-run plan returns the same stops the trip gets when created"""
+        mock_get.side_effect = self.fake_geocode
+        mock_post.return_value = directions_response(
+            [(350000.0, 4 * 3600.0), (500000.0, 5 * 3600.0)],
+            [[-74.0, 40.7], [-71.06, 42.36], [-75.16, 39.95]]
+        )
+        payload = self.trip("New York, NY", "Boston, MA", "Philadelphia, PA")
+        planned = self.client.post(self.url, payload, format='json')
+        self.assertEqual(planned.status_code, status.HTTP_200_OK)
+
+        created = self.client.post(reverse('trip-bulk'), [payload], format='json')
+        stops = created.data['results'][0]['trip']['stops']
+        self.assertEqual(
+            planned.data['results'][0]['stops'],
+            [{field: stop[field] for field in ('location', 'type', 'arrival_time', 'duration', 'sequence')} for stop in stops]
+        )
+
+    def test_plan_rejects_empty_payload(self):
+        """Test that a plan request needs at least one trip"""
+        response = self.client.post(self.url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(OPENROUTESERVICE_API_KEY='test-key')
+class AsyncTripViewTests(TestCase):
+    places = BulkTripCreateTests.places
+    geocode_delay = 0.2
+
+    def setUp(self):
+        geocode_cache.clear()
+        route_cache.clear()
+
+    async def fake_geocode(self, path, **kwargs):
+        # Simulate OpenRouteService latency so sequential calls would be noticeably slower
+        await asyncio.sleep(self.geocode_delay)
+        return TripPlanDryRunTests.fake_geocode(self, path, **kwargs)
+
+    def trip(self, current, pickup, dropoff):
+        return {
+            "current_location": current,
+            "pickup_location": pickup,
+            "dropoff_location": dropoff,
+            "current_cycle_hours": 10.0,
+            "start_time": "2024-03-01T06:00:00Z",
+        }
+
+    def route(self):
+        return directions_response(
+            [(350000.0, 4 * 3600.0), (500000.0, 5 * 3600.0)],
+            [[-74.0, 40.7], [-71.06, 42.36], [-75.16, 39.95]],
+            way_points=[0, 1, 2]
+        )
+
+    @mock.patch('trips.async_views.async_ors_client.aclose', new_callable=mock.AsyncMock)
+    def test_client_closed_outside_asgi(self, mock_aclose):
+        """Test that the per-loop httpx client is closed after requests served under WSGI only"""
+        self.client.post(reverse('trip-async-plan'), [], content_type='application/json')
+        mock_aclose.assert_awaited_once()
+
+        async_to_sync(self.async_client.post)(reverse('trip-async-plan'), [], content_type='application/json')
+        mock_aclose.assert_awaited_once()
+
+    @mock.patch('trips.async_utils.async_ors_client.post', new_callable=mock.AsyncMock)
+    @mock.patch('trips.async_utils.async_ors_client.get', new_callable=mock.AsyncMock)
+    async def test_create_geocodes_concurrently(self, mock_get, mock_post):
+        """Test that the async create endpoint geocodes a trip's locations concurrently"""
+        mock_get.side_effect = self.fake_geocode
+        mock_post.return_value = self.route()
+
+        started = time.perf_counter()
+        response = await self.async_client.post(
+            reverse('trip-async-create'),
+            self.trip("New York, NY", "Boston, MA", "Philadelphia, PA"),
+            content_type='application/json'
+        )
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertEqual(mock_get.await_count, 3)
+        self.assertLess(elapsed, 3 * self.geocode_delay)
+        data = response.json()
+        self.assertEqual([stop['type'] for stop in data['stops']], ['pickup', 'dropoff'])
+        self.assertEqual(await Stop.objects.filter(trip_id=data['id']).acount(), 2)
+        self.assertEqual(await ELDLog.objects.filter(trip_id=data['id']).acount(), 1)
+
+    @mock.patch('trips.async_utils.async_ors_client.get', new_callable=mock.AsyncMock)
+    async def test_create_routing_error_saves_nothing(self, mock_get):
+        """Test that a trip that cannot be routed is rejected without being saved"""
+        mock_get.side_effect = self.fake_geocode
+        response = await self.async_client.post(
+            reverse('trip-async-create'),
+            self.trip("Atlantis", "Boston, MA", "Philadelphia, PA"),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Atlantis", response.json()['error'])
+        self.assertEqual(await Trip.objects.acount(), 0)
+
+    @mock.patch('trips.async_utils.async_ors_client.post', new_callable=mock.AsyncMock)
+    @mock.patch('trips.async_utils.async_ors_client.get', new_callable=mock.AsyncMock)
+    @mock.patch('trips.utils.ors_client.post')
+    @mock.patch('trips.utils.ors_client.get')
+    def test_plan_matches_sync_plan(self, mock_get, mock_post, mock_async_get, mock_async_post):
+        """Test that the async plan endpoint returns the same body and status as TripViewSet.plan"""
+        mock_get.side_effect = lambda path, **kwargs: TripPlanDryRunTests.fake_geocode(self, path, **kwargs)
+        mock_post.return_value = self.route()
+        mock_async_get.side_effect = self.fake_geocode
+        mock_async_post.return_value = self.route()
+        payload = json.dumps([
+            self.trip("New York, NY", "Boston, MA", "Philadelphia, PA"),
+            self.trip("Atlantis", "Boston, MA", "Philadelphia, PA"),
+            {"current_location": "New York, NY"},
+        ])
+
+        expected = self.client.post(reverse('trip-plan'), payload, content_type='application/json')
+        # Make the async variant go to OpenRouteService too
+        geocode_cache.clear()
+        route_cache.clear()
+        GeocodeCacheEntry.objects.all().delete()
+        RouteCacheEntry.objects.all().delete()
+        response = async_to_sync(self.async_client.post)(
+            reverse('trip-async-plan'), payload, content_type='application/json'
+        )
+
+        self.assertEqual(expected.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual((mock_async_get.await_count, mock_async_post.await_count), (4, 1))
+
+    async def test_plan_rejects_invalid_json(self):
+        """Test that a malformed body is rejected"""
+        response = await self.async_client.post(reverse('trip-async-plan'), '{', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class QueryPlanTests(APITestCase):
+    """
+    Runs EXPLAIN on every query the main read endpoints issue against a seeded dataset
+    and checks that none of them scans or sorts the trip, stop or log tables without an index.
+    """
+    TRIPS = 300
+    STOPS_PER_TRIP = 12
+    LOGS_PER_TRIP = 10
+    TABLES = ('trips_trip', 'trips_stop', 'eld_logs_eldlog')
+
+    @classmethod
+    def setUpTestData(cls):
+        start = timezone.now() - datetime.timedelta(days=365)
+        trips = Trip.objects.bulk_create([
+            Trip(
+                current_location=f"Yard {i}",
+                pickup_location=f"Shipper {i}",
+                dropoff_location=f"Receiver {i}",
+                current_cycle_hours=0.0,
+                start_time=start + datetime.timedelta(days=i)
+            )
+            for i in range(cls.TRIPS)
+        ])
+        Stop.objects.bulk_create([
+            Stop(
+                trip=trip,
+                location=f"Stop {n}",
+                type='rest',
+                arrival_time=trip.start_time + datetime.timedelta(hours=6 * n),
+                duration=1.0,
+                sequence=n
+            )
+            for trip in trips for n in range(1, cls.STOPS_PER_TRIP + 1)
+        ])
+        ELDLog.objects.bulk_create([
+            ELDLog(
+                trip=trip,
+                date=(trip.start_time + datetime.timedelta(days=n)).date(),
+                off_duty_hours=24.0
+            )
+            for trip in trips for n in range(cls.LOGS_PER_TRIP)
+        ])
+        cls.trip = trips[cls.TRIPS // 2]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assert_queries_use_indexes(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                if connection.vendor == 'sqlite':
+                    cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                    plan = '\n'.join(row[-1] for row in cursor.fetchall())
+                else:
+                    # Small tables favour sequential scans, so only count them when no index is usable
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+                    cursor.execute(f"EXPLAIN {sql}")
+                    plan = '\n'.join(row[0] for row in cursor.fetchall())
+            for table in self.TABLES:
+                full_scan = re.compile(rf"^(SCAN {table}$|Seq Scan on {table}\b)", re.MULTILINE)
+                self.assertNotRegex(plan, full_scan, f"Full scan of {table} for:\n{sql}\n{plan}")
+            self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan, f"Unindexed sort for:\n{sql}\n{plan}")
+
+    def test_trip_list_uses_indexes(self):
+        """Test that listing trips, including deep keyset pages, uses the (created_at, id) index"""
+        self.assert_queries_use_indexes(reverse('trip-list'))
+        next_url = self.client.get(reverse('trip-list'), {'page_size': 100}).data['next']
+        self.assert_queries_use_indexes(next_url)
+
+    def test_trip_stops_use_indexes(self):
+        """Test that a trip's stops are read through the (trip, sequence) index"""
+        self.assert_queries_use_indexes(reverse('trip-stops', kwargs={'pk': self.trip.pk}))
+
+    def test_trip_eld_logs_use_indexes(self):
+        """Test that a trip's logs are read through the (trip, date) index"""
+        self.assert_queries_use_indexes(reverse('trip-eld-logs', kwargs={'pk': self.trip.pk}))
+
+    def test_eld_log_filters_use_indexes(self):
+        """Test that ELD log trip and date filters use an index"""
+        start_date = self.trip.start_time.date()
+        end_date = start_date + datetime.timedelta(days=3)
+        self.assert_queries_use_indexes(reverse('eldlog-list'), {'trip_id': self.trip.pk})
+        self.assert_queries_use_indexes(
+            reverse('eldlog-list'),
+            {'trip_id': self.trip.pk, 'start_date': start_date, 'end_date': end_date}
+        )
+        self.assert_queries_use_indexes(reverse('eldlog-list'), {'start_date': start_date, 'end_date': end_date})
+        self.assert_queries_use_indexes(reverse('eldlog-by-trip'), {'trip_id': self.trip.pk})
+        self.assert_queries_use_indexes(reverse('eldlog-list'), {'violation': 'driving_11h'})
+
+
+class TripListQueryTests(APITestCase):
+    def setUp(self):
+        response_cache.clear()
+        for i in range(5):
+            trip = Trip.objects.create(
+                current_location=f"Yard {i}",
+                pickup_location=f"Shipper {i}",
+                dropoff_location=f"Receiver {i}",
+                current_cycle_hours=0.0
+            )
+            for sequence in (2, 1, 3):
+                Stop.objects.create(
+                    trip=trip,
+                    location=f"Stop {sequence}",
+                    type='rest',
+                    arrival_time=timezone.now(),
+                    duration=1.0,
+                    sequence=sequence
+                )
+
+    def test_list_prefetches_stops(self):
+        """Test that listing trips does not run a stops query per trip"""
+        # trips page, stops for the page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('trip-list'))
+        trips = response.data['results']
+        self.assertEqual(len(trips), 5)
+        self.assertEqual([stop['sequence'] for stop in trips[0]['stops']], [1, 2, 3])
+
+    def test_sparse_fieldset_skips_stops(self):
+        """Test that ?fields= limits the response and skips loading stops"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('trip-list'), {'fields': 'id,status'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status'})
+
+    def test_expand_stops(self):
+        """Test that ?expand=stops adds stops to a sparse fieldset"""
+        trip = Trip.objects.first()
+        # The trip's version is looked up first to check the response cache
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse('trip-detail', kwargs={'pk': trip.pk}),
+                {'fields': 'id', 'expand': 'stops'}
+            )
+        self.assertEqual(set(response.data), {'id', 'stops'})
+        self.assertEqual(len(response.data['stops']), 3)
+
+
+class TripPaginationTests(APITestCase):
+    def setUp(self):
+        created_at = timezone.now()
+        trips = [
+            Trip.objects.create(
+                current_location=f"Yard {i}",
+                pickup_location=f"Shipper {i}",
+                dropoff_location=f"Receiver {i}",
+                current_cycle_hours=0.0
+            )
+            for i in range(7)
+        ]
+        # Give several trips the same created_at so the id tie-breaker matters
+        Trip.objects.filter(pk__in=[trip.pk for trip in trips[:4]]).update(created_at=created_at)
+        self.expected = list(Trip.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, url, link):
+        """Follow next or previous links from url, returning the pages visited"""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([trip['id'] for trip in response.data['results']])
+            url = response.data[link]
+        return pages, response
+
+    def test_walk_forward_and_back(self):
+        """Test that following next and previous links visits every trip exactly once"""
+        pages, last_page = self.walk(reverse('trip-list') + '?fields=id&page_size=3', 'next')
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), self.expected)
+
+        pages, first_page = self.walk(last_page.data['previous'], 'previous')
+        self.assertEqual(sum(reversed(pages), []), self.expected[:6])
+        self.assertIsNotNone(first_page.data['next'])
+
+    def test_count_is_optional(self):
+        """Test that the total count is only computed on request"""
+        response = self.client.get(reverse('trip-list'))
+        self.assertNotIn('count', response.data)
+        response = self.client.get(reverse('trip-list'), {'count': 'true'})
+        self.assertEqual(response.data['count'], 7)
+
+    def test_page_size_is_capped(self):
+        """Test that page_size cannot exceed the maximum"""
+        with mock.patch.object(TripPagination, 'max_page_size', 5):
+            response = self.client.get(reverse('trip-list'), {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = self.client.get(reverse('trip-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Well-formed cursors whose values don't fit the ordering fields
+        for values in (["yesterday", 1], ["2024-03-01T00:00:00Z", "one"], [None, 1], [{}, []]):
+            token = base64.urlsafe_b64encode(json.dumps({'v': values, 'r': False}).encode()).decode()
+            response = self.client.get(reverse('trip-list'), {'cursor': token})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, values)
+
+    def test_sparse_page_builds_cursor_without_extra_queries(self):
+        """Test that the ordering fields are loaded even when ?fields= leaves them out"""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('trip-list'), {'fields': 'id', 'page_size': 3})
+        self.assertIsNotNone(response.data['next'])
+
+
+class IncrementalRegenerationTests(APITestCase):
+    def setUp(self):
+        self.trip = Trip.objects.create(
+            current_location="Seattle, WA",
+            pickup_location="Portland, OR",
+            dropoff_location="Miami, FL",
+            current_cycle_hours=0.0,
+            start_time=datetime.datetime(2024, 3, 1, 6, 0, tzinfo=datetime.timezone.utc)
+        )
+        self.legs = ({'distance': 400000.0, 'duration': 4 * 3600.0}, {'distance': 4800000.0, 'duration': 40 * 3600.0})
+        with mock.patch('trips.utils.calculate_trip_route', return_value={'legs': list(self.legs), 'waypoints': []}):
+            generate_stops_for_trip(self.trip)
+        generate_eld_logs_for_trip(self.trip)
+
+    def regenerate(self, dropoff_hours):
+        legs = (self.legs[0], {**self.legs[1], 'duration': dropoff_hours * 3600.0})
+        with mock.patch('trips.utils.calculate_trip_route', return_value={'legs': list(legs), 'waypoints': []}):
+            return self.client.post(reverse('trip-regenerate-stops', kwargs={'pk': self.trip.pk}))
+
+    def test_unchanged_route_touches_nothing(self):
+        """Test that regenerating an unchanged route writes nothing and keeps the trip's version"""
+        self.assertIsNone(sync_stops_for_trip(self.trip, list(self.trip.stops.all())))
+        version = Trip.objects.get(pk=self.trip.pk).version
+        with CaptureQueriesContext(connection) as queries:
+            response = self.regenerate(40)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(writes, [])
+        self.assertEqual(Trip.objects.get(pk=self.trip.pk).version, version)
+
+        self.regenerate(42)
+        self.assertEqual(Trip.objects.get(pk=self.trip.pk).version, version + 1)
+
+    def test_late_change_keeps_earlier_rows(self):
+        """Test that a change at the end of the trip only rewrites the stops and logs it affects"""
+        stops = {stop.sequence: (stop.pk, stop.updated_at) for stop in self.trip.stops.all()}
+        logs = {log.date: (log.pk, log.updated_at) for log in self.trip.eld_logs.all()}
+
+        response = self.regenerate(42)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        new_stops = list(self.trip.stops.all())
+        self.assertEqual([stop.sequence for stop in new_stops], list(range(1, len(new_stops) + 1)))
+        # The longer second leg first moves the fuel stop after the first rest
+        self.assertEqual([(stop.pk, stop.updated_at) for stop in new_stops[:2]], [stops[sequence] for sequence in (1, 2)])
+        self.assertNotEqual(new_stops[2].updated_at, stops[3][1])
+
+        new_logs = list(self.trip.eld_logs.all())
+        self.assertEqual((new_logs[0].pk, new_logs[0].updated_at), logs[new_logs[0].date])
+        self.assertEqual(new_logs[-1].pk, logs[new_logs[-1].date][0])
+        self.assertNotEqual(new_logs[-1].updated_at, logs[new_logs[-1].date][1])
+        self.assertEqual(
+            [log.driving_hours for log in new_logs],
+            [log.driving_hours for log in build_eld_logs_for_trip(self.trip, new_stops)]
+        )
+
+    def test_shorter_route_deletes_leftovers(self):
+        """Test that stops and logs past the new end of the trip are removed"""
+        stop_count = self.trip.stops.count()
+        log_count = self.trip.eld_logs.count()
+
+        self.regenerate(10)
+
+        self.assertLess(self.trip.stops.count(), stop_count)
+        self.assertLess(self.trip.eld_logs.count(), log_count)
+        self.assertEqual(self.trip.stops.order_by('sequence').last().type, 'dropoff')
+
+
+    def test_moved_start_drops_old_days(self):
+        """Test that moving the start later removes the logs of the days the trip no longer covers"""
+        self.trip.start_time = datetime.datetime(2024, 3, 5, 6, 0, tzinfo=datetime.timezone.utc)
+        self.trip.save()
+
+        self.assertEqual(self.regenerate(40).status_code, status.HTTP_200_OK)
+
+        dates = list(self.trip.eld_logs.values_list('date', flat=True))
+        self.assertEqual(dates[0], datetime.date(2024, 3, 5))
+        self.assertEqual(dates, [log.date for log in build_eld_logs_for_trip(self.trip, list(self.trip.stops.all()))])
+
+    def test_missing_logs_are_created(self):
+        """Test that a trip whose logs were removed gets all of them back, not only the changed days"""
+        self.trip.eld_logs.all().delete()
+
+        self.regenerate(42)
+
+        self.assertEqual(
+            list(self.trip.eld_logs.values_list('date', flat=True)),
+            [log.date for log in build_eld_logs_for_trip(self.trip, list(self.trip.stops.all()))]
+        )
+
+@override_settings(OPENROUTESERVICE_API_KEY='test-key')
+class RouteInterpolationTests(TestCase):
+    def setUp(self):
+        # A straight route east along the equator: 10 degrees (~1112 km) to the pickup, then 30 more
+        self.waypoints = [[longitude / 10, 0.0] for longitude in range(0, 401)]
+        self.legs = [
+            {'distance': 1112000.0, 'duration': 10 * 3600.0, 'way_points': [0, 100]},
+            {'distance': 3336000.0, 'duration': 40 * 3600.0, 'way_points': [100, 400]},
+        ]
+        self.route = RouteIndex(self.waypoints, self.legs)
+        self.trip = Trip(
+            current_location="0,0",
+            pickup_location="10,0",
+            dropoff_location="40,0",
+            current_cycle_hours=0.0,
+            start_time=datetime.datetime(2024, 3, 1, 6, 0, tzinfo=datetime.timezone.utc)
+        )
+
+    def test_index_matches_leg_distances_and_durations(self):
+        """Test that cumulative distance and time line up with each leg"""
+        self.assertAlmostEqual(self.route.total_distance, 4448000.0, places=3)
+        self.assertAlmostEqual(self.route.total_time, 50 * 3600.0, places=3)
+        self.assertAlmostEqual(self.route.times_at_distances([1112000.0])[0], 10 * 3600.0, places=3)
+
+        # Halfway through the second leg in time is halfway along it in space
+        longitude, latitude = self.route.positions_at_times([30 * 3600.0])[0]
+        self.assertAlmostEqual(longitude, 25.0, places=6)
+        self.assertAlmostEqual(latitude, 0.0, places=6)
+        self.assertEqual(self.route.location_at_time(10 ** 9), "40.000000,0.000000")
+
+    def test_stops_are_placed_along_the_route(self):
+        """Test that rest and fuel stops get coordinates and fuel stops fall at 1000-mile marks"""
+        stops = build_stops_for_trip(self.trip, self.legs[0], self.legs[1], self.route)
+
+        times = [stop.arrival_time for stop in stops]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual([stop.sequence for stop in stops], list(range(1, len(stops) + 1)))
+
+        fuel_stops = [stop for stop in stops if stop.type == 'fuel']
+        self.assertEqual(len(fuel_stops), int(meters_to_miles(4448000.0) / 1000))
+        miles = [
+            meters_to_miles(float(longitude) / 40.0 * 4448000.0)
+            for longitude, _ in (map(float, stop.location.split(',')) for stop in fuel_stops)
+        ]
+        for mark, mile in zip((1000, 2000), miles):
+            self.assertAlmostEqual(mile, mark, delta=0.5)
+
+        rests = [stop for stop in stops if stop.type == 'rest']
+        self.assertTrue(rests)
+        self.assertTrue(all(stop.location.endswith(',0.000000') for stop in rests))
+
+    def test_fetch_route_records_leg_waypoints(self):
+        """Test that each leg keeps the waypoint indices of its geometry"""
+        response = directions_response(
+            [(1112000.0, 36000.0), (3336000.0, 144000.0)], self.waypoints, way_points=[0, 100, 400]
+        )
+        with mock.patch('trips.utils.ors_client.post', return_value=response):
+            route = fetch_route([[0, 0], [10, 0], [40, 0]])
+        self.assertEqual([leg['way_points'] for leg in route['legs']], [[0, 100], [100, 400]])
+
+        first = {'distance': 1.0, 'duration': 1.0, 'waypoints': self.waypoints[:101], 'legs': [{**self.legs[0]}]}
+        second = {'distance': 2.0, 'duration': 2.0, 'waypoints': self.waypoints[100:],
+                  'legs': [{**self.legs[1], 'way_points': [0, 300]}]}
+        joined = join_routes(first, second)
+        self.assertEqual(len(joined['waypoints']), 401)
+        self.assertEqual([leg['way_points'] for leg in joined['legs']], [[0, 100], [100, 400]])
+
+    def test_long_route_performance(self):
+        """Test that indexing and placing stops on a 50,000 point route is fast"""
+        waypoints = [[-122.3 + 42.1 * i / 49999, 47.6 - 21.8 * i / 49999] for i in range(50000)]
+        legs = [
+            {'distance': 250000.0, 'duration': 3 * 3600.0, 'way_points': [0, 3000]},
+            {'distance': 4600000.0, 'duration': 45 * 3600.0, 'way_points': [3000, 49999]},
+        ]
+        start = time.perf_counter()
+        route = RouteIndex(waypoints, legs)
+        build_stops_for_trip(self.trip, legs[0], legs[1], route)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+
+@override_settings(OPENROUTESERVICE_API_KEY='test-key')
+class RouteGeometryTests(APITestCase):
+    def setUp(self):
+        geocode_cache.clear()
+        route_cache.clear()
+        self.trip = Trip.objects.create(
+            current_location="0,0",
+            pickup_location="1,0",
+            dropoff_location="2,0",
+            current_cycle_hours=0.0
+        )
+        # A straight line east with a 0.01 degree (~1.1 km) detour north in the middle
+        self.waypoints = [[i / 100, 0.0] for i in range(201)]
+        self.waypoints[150] = [1.5, 0.01]
+        self.url = reverse('trip-route', kwargs={'pk': self.trip.pk})
+
+    def plan(self):
+        response = directions_response(
+            [(111000.0, 7200.0), (111000.0, 7200.0)], self.waypoints, way_points=[0, 100, 200]
+        )
+        with mock.patch('trips.utils.ors_client.post', return_value=response):
+            generate_stops_for_trip(self.trip)
+
+    def test_geometry_is_stored_with_the_stops(self):
+        """Test that planning a trip stores its route as a polyline with per-leg data"""
+        self.plan()
+        geometry = RouteGeometry.objects.get(trip=self.trip)
+        self.assertEqual(geometry.point_count, 201)
+        self.assertEqual(geometry.coordinates, self.waypoints)
+        self.assertEqual([leg['way_points'] for leg in geometry.legs], [[0, 100], [100, 200]])
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['route']['polyline'], geometry.polyline)
+        self.assertEqual(response.data['route']['point_count'], 201)
+
+    def test_simplified_geometry(self):
+        """Test Douglas-Peucker simplification at a requested tolerance"""
+        self.plan()
+        response = self.client.get(self.url, {'tolerance': 100, 'encoding': 'coordinates'})
+        self.assertEqual(response.data['route']['coordinates'], [[0.0, 0.0], [1.49, 0.0], [1.5, 0.01], [1.51, 0.0], [2.0, 0.0]])
+
+        # The ~1.1 km detour disappears at a coarser tolerance
+        response = self.client.get(self.url, {'tolerance': 2000})
+        self.assertEqual(polyline.decode(response.data['route']['polyline']), [[0.0, 0.0], [2.0, 0.0]])
+        self.assertEqual(response.data['route']['point_count'], 2)
+
+    def test_route_without_geometry(self):
+        """Test trips without a stored route and invalid parameters"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['route'])
+
+        for tolerance in ('-5', 'nan', 'inf'):
+            self.assertEqual(self.client.get(self.url, {'tolerance': tolerance}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'encoding': 'wkt'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HOSEngineTests(TestCase):
+    """Test the HOS scheduling engine on plain legs, without models or the routing API"""
+
+    def test_short_trip(self):
+        """Test that a short trip only has the pickup and dropoff"""
+        schedule = plan_schedule(Leg(100.0, 2.0), Leg(200.0, 4.0))
+        self.assertEqual(
+            [(stop.type, stop.start, stop.duration) for stop in schedule.stops],
+            [('pickup', 2.0, 1.0), ('dropoff', 7.0, 1.0)]
+        )
+        self.assertEqual(schedule.total_distance, 300.0)
+        self.assertEqual(schedule.duration, 8.0)
+
+    def test_driving_limits_and_break(self):
+        """Test the 30-minute break after the pickup and rests at the 11 and 14-hour limits"""
+        schedule = plan_schedule(Leg(450.0, 9.0), Leg(500.0, 18.0))
+        self.assertEqual(
+            [(stop.type, stop.start) for stop in schedule.stops],
+            [('pickup', 9.0), ('break', 10.0), ('rest', 14.0), ('rest', 35.0), ('dropoff', 48.5)]
+        )
+        # 3.5 hours fit before the 14-hour on-duty limit, then 11 hours, then the last 3.5
+        self.assertEqual([stop.driven for stop in schedule.stops], [9.0, 9.0, 12.5, 23.5, 27.0])
+
+    def test_fuel_stops(self):
+        """Test that fuel stops are due every 1000 miles at each leg's average speed"""
+        self.assertEqual(fuel_stop_hours((Leg(500.0, 10.0), Leg(2000.0, 20.0))), [15.0, 25.0])
+        schedule = plan_schedule(Leg(500.0, 10.0), Leg(2000.0, 20.0))
+        fuel = [stop for stop in schedule.stops if stop.type == 'fuel']
+        self.assertEqual([stop.driven for stop in fuel], [15.0, 25.0])
+
+        # Explicit due times (e.g. located along the route geometry) take precedence
+        schedule = plan_schedule(Leg(500.0, 10.0), Leg(2000.0, 20.0), fuel_due=[12.0])
+        self.assertEqual([stop.driven for stop in schedule.stops if stop.type == 'fuel'], [12.0])
+
+    def test_timeline_covers_the_whole_trip(self):
+        """Test that the duty-status timeline is contiguous and splits rests into sleeper berth and off duty"""
+        schedule = plan_schedule(Leg(600.0, 12.0), Leg(2400.0, 45.0))
+        timeline = schedule.timeline()
+
+        self.assertEqual(timeline[0].start, 0.0)
+        self.assertEqual(timeline[-1].end, schedule.duration)
+        for previous, segment in zip(timeline, timeline[1:]):
+            self.assertEqual(previous.end, segment.start)
+
+        driving = sum(segment.end - segment.start for segment in timeline if segment.status == 'driving')
+        self.assertAlmostEqual(driving, 57.0)
+        rests = sum(1 for stop in schedule.stops if stop.type == 'rest')
+        self.assertEqual(sum(1 for segment in timeline if segment.status == 'sleeper_berth'), rests)
+        self.assertAlmostEqual(
+            sum(segment.end - segment.start for segment in timeline if segment.status == 'off_duty'),
+            rests * 2.0 + 0.5
+        )
+
+    def test_matches_persisted_stops(self):
+        """Test that build_stops_for_trip persists the engine's schedule unchanged"""
+        trip = Trip(
+            current_location="A", pickup_location="B", dropoff_location="C",
+            current_cycle_hours=0.0,
+            start_time=datetime.datetime(2024, 3, 1, 6, 0, tzinfo=datetime.timezone.utc)
+        )
+        to_pickup = {'distance': 804672.0, 'duration': 9 * 3600.0}
+        to_dropoff = {'distance': 3218688.0, 'duration': 40 * 3600.0}
+        stops = build_stops_for_trip(trip, to_pickup, to_dropoff)
+        schedule = plan_schedule(
+            Leg(meters_to_miles(to_pickup['distance']), 9.0),
+            Leg(meters_to_miles(to_dropoff['distance']), 40.0)
+        )
+        self.assertEqual([stop.type for stop in stops], [stop.type for stop in schedule.stops])
+        self.assertEqual(
+            [stop.arrival_time for stop in stops],
+            [trip.start_time + datetime.timedelta(hours=stop.start) for stop in schedule.stops]
+        )
+        self.assertEqual(stops[-1].location, "C")
+        self.assertAlmostEqual(trip.total_distance, schedule.total_distance)
+
+    def test_plans_thousands_of_schedules_per_second(self):
+        """Test that what-if planning is cheap enough to run in bulk"""
+        self.assertEqual(PlannedStop.__slots__, ('type', 'start', 'duration', 'driven', 'leg'))
+        started = time.perf_counter()
+        for hours in range(2000):
+            plan_schedule(Leg(300.0, 6.0), Leg(1500.0 + hours, 25.0 + hours % 40))
+        self.assertLess(time.perf_counter() - started, 2.0)
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.trip = Trip.objects.create(
+            current_location="Yard",
+            pickup_location="Shipper",
+            dropoff_location="Receiver",
+            current_cycle_hours=0.0,
+            start_time=datetime.datetime(2024, 3, 1, 6, 0, tzinfo=datetime.timezone.utc)
+        )
+        self.legs = ({'distance': 400000.0, 'duration': 4 * 3600.0}, {'distance': 1600000.0, 'duration': 16 * 3600.0})
+        with mock.patch('trips.utils.calculate_trip_route', return_value={'legs': list(self.legs), 'waypoints': []}):
+            generate_stops_for_trip(self.trip)
+        generate_eld_logs_for_trip(self.trip)
+
+    def test_cached_responses_and_etags(self):
+        """Test that repeated polls are served from the cache and If-None-Match returns 304"""
+        for name in ('trip-detail', 'trip-stops', 'trip-eld-logs'):
+            url = reverse(name, kwargs={'pk': self.trip.pk})
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            etag = first['ETag']
+
+            # A cache hit only looks up the trip's version
+            with self.assertNumQueries(1):
+                second = self.client.get(url)
+            self.assertEqual(second.json(), first.json())
+            self.assertEqual(second['ETag'], etag)
+
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+
+        # Sparse fieldsets are cached separately
+        url = reverse('trip-detail', kwargs={'pk': self.trip.pk})
+        sparse = self.client.get(url, {'fields': 'id,status'})
+        self.assertEqual(set(sparse.data), {'id', 'status'})
+        self.assertNotEqual(sparse['ETag'], etag)
+        self.assertEqual(response_cache.stats()['not_modified'], 3)
+
+    def test_regenerate_and_update_invalidate(self):
+        """Test that regenerating stops or logs and updating the trip change the ETag"""
+        url = reverse('trip-stops', kwargs={'pk': self.trip.pk})
+        etag = self.client.get(url)['ETag']
+        stop_count = len(self.client.get(url).data)
+
+        legs = (self.legs[0], {**self.legs[1], 'duration': 30 * 3600.0})
+        with mock.patch('trips.utils.calculate_trip_route', return_value={'legs': list(legs), 'waypoints': []}):
+            self.client.post(reverse('trip-regenerate-stops', kwargs={'pk': self.trip.pk}))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(len(response.data), stop_count)
+        etag = response['ETag']
+
+        # Regenerating unchanged logs writes nothing and keeps the cached responses
+        self.client.post(reverse('trip-regenerate-eld-logs', kwargs={'pk': self.trip.pk}))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        detail_url = reverse('trip-detail', kwargs={'pk': self.trip.pk})
+        detail_etag = self.client.get(detail_url)['ETag']
+        self.client.patch(detail_url, {'status': 'in_progress'}, format='json')
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'in_progress')
+
+    def test_model_saves_invalidate(self):
+        """Test that saving a trip or its stops outside the API (e.g. in the admin) changes the ETag"""
+        url = reverse('trip-detail', kwargs={'pk': self.trip.pk})
+        etag = self.client.get(url)['ETag']
+
+        stop = Stop.objects.filter(trip=self.trip).first()
+        stop.duration += 1.0
+        stop.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        trip = Trip.objects.get(pk=self.trip.pk)
+        version = trip.version
+        trip.status = 'completed'
+        trip.save(update_fields=['status'])
+        self.assertEqual(trip.version, version + 1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'completed')
+
+        stop.delete()
+        self.assertEqual(Trip.objects.get(pk=self.trip.pk).version, version + 2)
+
+    def test_log_saves_invalidate(self):
+        """Test that saving or deleting an ELD log outside the API (e.g. in the admin) changes the ETag"""
+        url = reverse('trip-eld-logs', kwargs={'pk': self.trip.pk})
+        etag = self.client.get(url)['ETag']
+
+        log = ELDLog.objects.filter(trip=self.trip).first()
+        log.driving_hours += 1.0
+        log.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        log.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(log.date.isoformat(), [entry['date'] for entry in response.json()])
+
+    def test_missing_trip(self):
+        """Test that unknown trips still return 404"""
+        response = self.client.get(reverse('trip-detail', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+
+
+class CacheBackendTests(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def check_eviction(self, cache, evicted):
+        """Fill a two-entry cache after reading the first key and check which key is evicted"""
+        cache.set('a', {'value': 1})
+        cache.set('b', {'value': 2})
+        self.assertEqual(cache.get('a'), {'value': 1})
+        cache.set('c', {'value': 3})
+        self.assertIsNone(cache.get(evicted))
+        self.assertEqual(cache.get('c'), {'value': 3})
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['sets']), (2, 1, 3))
+        self.assertEqual((stats['evictions'], stats['entries'], stats['max_entries']), (1, 2, 2))
+
+    def test_sqlite_backend_lru(self):
+        """Test that the SQLite backend evicts the least recently read entry"""
+        cache = SQLiteCache(f"{self.directory.name}/lru.sqlite3", {'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 2}})
+        self.check_eviction(cache, 'b')
+
+    def test_sqlite_backend_fifo(self):
+        """Test that the SQLite backend can evict the oldest entry instead"""
+        cache = SQLiteCache(
+            f"{self.directory.name}/fifo.sqlite3",
+            {'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 2, 'EVICTION': 'fifo'}}
+        )
+        self.check_eviction(cache, 'a')
+
+    def test_sqlite_backend_operations(self):
+        """Test expiry, add, touch and delete on the SQLite backend"""
+        cache = SQLiteCache(f"{self.directory.name}/ops.sqlite3", {})
+        cache.set('expired', 1, timeout=-1)
+        self.assertIsNone(cache.get('expired'))
+        self.assertTrue(cache.add('key', 1))
+        self.assertFalse(cache.add('key', 2))
+        self.assertEqual(cache.get('key'), 1)
+        self.assertTrue(cache.touch('key', timeout=None))
+        self.assertTrue(cache.has_key('key'))
+        self.assertTrue(cache.delete('key'))
+        self.assertFalse(cache.has_key('key'))
+
+    def test_sqlite_backend_recounts_every_n_writes(self):
+        """Test that the SQLite backend only counts its entries once every MAX_ENTRIES / 100 writes"""
+        cache = SQLiteCache(f"{self.directory.name}/count.sqlite3", {'OPTIONS': {'MAX_ENTRIES': 1000}})
+        statements = []
+        cache.connection.set_trace_callback(statements.append)
+        for index in range(25):
+            cache.set(f'key-{index}', index)
+        self.assertEqual(sum('COUNT(*)' in statement for statement in statements), 3)
+        self.assertEqual(cache.stats()['entries'], 25)
+
+    def test_stats_mixin_requires_entry_count(self):
+        """Test that a backend without entry_count() cannot be created"""
+        class UncountedCache(StatsMixin):
+            pass
+
+        with self.assertRaises(TypeError):
+            UncountedCache()
+
+    def test_file_backend_stats(self):
+        """Test that the file backend counts writes and culls"""
+        cache = FileBasedCache(f"{self.directory.name}/files", {'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_FREQUENCY': 2}})
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        stats = cache.stats()
+        self.assertEqual((stats['sets'], stats['evictions'], stats['entries']), (3, 1, 2))
+        self.assertEqual(stats['eviction'], 'random')
+
+    def test_cache_stats_endpoint(self):
+        """Test that cache stats are reported per named cache to staff users only"""
+        url = reverse('cache-stats')
+        self.assertIn(self.client.get(url).status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+        self.client.force_authenticate(User.objects.create_user('ops', is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['caches']), {'default', 'geocode', 'routes', 'responses'})
+        for stats in response.data['caches'].values():
+            self.assertIn(stats['backend'], ('LocMemCache', 'FileBasedCache', 'SQLiteCache'))
+            self.assertIn('evictions', stats)
+        self.assertIn('memory_hits', response.data['routes'])
+
+
+class DatabaseProfileTests(TestCase):
+    def connect(self, path):
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': path}, alias='profile-test')
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_sqlite_pragmas_applied_on_connect(self):
+        """Test that new SQLite connections use WAL, synchronous=NORMAL, mmap and a busy timeout"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        wrapper = self.connect(f"{directory.name}/profile.sqlite3")
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertGreater(self.pragma(wrapper, 'mmap_size'), 0)
+
+    def test_pragmas_can_be_disabled(self):
+        """Test that an empty SQLITE_PRAGMAS leaves SQLite's defaults alone"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with self.settings(SQLITE_PRAGMAS={}):
+            wrapper = self.connect(f"{directory.name}/default.sqlite3")
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
@@ -1,10 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TripViewSet
+from .views import DriverViewSet, TripViewSet
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'trips', TripViewSet)
+router.register(r'drivers', DriverViewSet)
 
 urlpatterns = [
+    # Ahead of the router, which would otherwise treat "async" as a trip id
+    path('trips/async/', async_views.create_trip, name='trip-async-create'),
+    path('trips/async/plan/', async_views.plan_trips, name='trip-async-plan'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
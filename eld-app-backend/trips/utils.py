@@ -1,36 +1,66 @@
 import os
-import requests
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from .models import Trip, Stop
-
-def get_coordinates(location):
-    """
-    Convert a location string to coordinates using OpenRouteService geocoding API.
-    Returns a tuple of (longitude, latitude).
-    """
+from .models import Trip, Stop, RouteGeometry
+from .geocache import geocode_cache
+from .routecache import route_cache
+from .ors_client import ors_client
+from .interpolation import RouteIndex, format_coordinates
+from .hos import Leg, plan_schedule, fuel_stop_miles
+from . import polyline
+
+def get_api_key():
+    """Return the OpenRouteService API key, raising if it is not configured"""
     api_key = settings.OPENROUTESERVICE_API_KEY
     if not api_key:
         raise ValueError("OpenRouteService API key is not set")
+    return api_key
 
-    # If location is already in coordinate format (e.g., "-73.935242,40.730610"), return it
+def parse_coordinates(location):
+    """
+    Parse a location already in coordinate format (e.g., "-73.935242,40.730610").
+    Returns a tuple of (longitude, latitude), or None if the location is a place name.
+    """
     if ',' in location and all(part.replace('.', '').replace('-', '').isdigit() for part in location.split(',')):
         lon, lat = location.split(',')
         return float(lon), float(lat)
+    return None
 
-    # Otherwise, geocode the location
-    url = f"https://api.openrouteservice.org/geocode/search"
-    headers = {
-        'Authorization': api_key,
+def api_headers():
+    """Authorization and content type headers of OpenRouteService API requests"""
+    return {
+        'Authorization': get_api_key(),
         'Content-Type': 'application/json; charset=utf-8'
     }
-    params = {
-        'text': location,
-        'size': 1
+
+def geocode_request(location):
+    """Keyword arguments of a geocoding API request for a location"""
+    return {'headers': api_headers(), 'params': {'text': location, 'size': 1}}
+
+def route_request(coordinates):
+    """Keyword arguments of a directions API request through a list of coordinates"""
+    return {
+        'headers': api_headers(),
+        'json': {
+            'coordinates': coordinates,
+            'instructions': True,
+            'format': 'geojson'
+        }
     }
 
-    response = requests.get(url, headers=headers, params=params)
+def fetch_coordinates(location):
+    """
+    Geocode a location with the OpenRouteService geocoding API, bypassing the cache.
+    Does not touch the database, so it is safe to call from worker threads.
+    """
+    response = ors_client.get('geocode/search', **geocode_request(location))
+    return parse_geocode_response(location, response)
+
+def parse_geocode_response(location, response):
+    """Read (longitude, latitude) from a geocoding API response (from requests or httpx)"""
     if response.status_code != 200:
         raise ValueError(f"Failed to geocode location: {response.text}")
 
@@ -42,31 +72,77 @@ def get_coordinates(location):
     coordinates = data['features'][0]['geometry']['coordinates']
     return coordinates[0], coordinates[1]
 
-def calculate_route(origin, destination):
+def get_coordinates(location):
     """
-    Calculate a route between two locations using OpenRouteService API.
-    Returns a dictionary with distance (in meters), duration (in seconds), and waypoints.
+    Convert a location string to coordinates using OpenRouteService geocoding API.
+    Returns a tuple of (longitude, latitude).
     """
-    api_key = settings.OPENROUTESERVICE_API_KEY
-    if not api_key:
-        raise ValueError("OpenRouteService API key is not set")
+    get_api_key()
 
-    # Convert locations to coordinates if they're not already
-    origin_coords = get_coordinates(origin)
-    destination_coords = get_coordinates(destination)
+    # If location is already in coordinate format, return it
+    coordinates = parse_coordinates(location)
+    if coordinates is not None:
+        return coordinates
 
-    url = "https://api.openrouteservice.org/v2/directions/driving-hgv"
-    headers = {
-        'Authorization': api_key,
-        'Content-Type': 'application/json; charset=utf-8'
-    }
-    data = {
-        'coordinates': [origin_coords, destination_coords],
-        'instructions': True,
-        'format': 'geojson'
-    }
+    # Serve repeated locations from the geocode cache
+    cached = geocode_cache.get(location)
+    if cached is not None:
+        return cached
+
+    # Otherwise, geocode the location
+    coordinates = fetch_coordinates(location)
+    geocode_cache.set(location, coordinates)
+    return coordinates
+
+def lookup_locations(locations):
+    """
+    Resolve the distinct locations that are coordinates or in the geocode cache.
+    Returns (resolved, pending): a location -> coordinates dictionary and the locations to geocode.
+    """
+    resolved = {}
+    pending = []
+    for location in dict.fromkeys(locations):
+        coordinates = parse_coordinates(location)
+        if coordinates is None:
+            coordinates = geocode_cache.get(location)
+        if coordinates is None:
+            pending.append(location)
+        else:
+            resolved[location] = coordinates
+    return resolved, pending
+
+def geocode_locations(locations):
+    """
+    Geocode several locations at once.
+    Each distinct location is resolved once; cache misses are fetched concurrently.
+    Returns a list of (longitude, latitude) tuples in the same order as the input.
+    """
+    get_api_key()
+
+    resolved, pending = lookup_locations(locations)
+    if pending:
+        # Cache writes stay on this thread; the workers only make HTTP calls
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            for location, coordinates in zip(pending, executor.map(fetch_coordinates, pending)):
+                geocode_cache.set(location, coordinates)
+                resolved[location] = coordinates
+
+    return [resolved[location] for location in locations]
 
-    response = requests.post(url, headers=headers, json=data)
+def fetch_route(coordinates, profile='driving-hgv'):
+    """
+    Request a route through a list of (longitude, latitude) coordinates from the OpenRouteService
+    directions API, bypassing the cache. Does not touch the database, so it is safe to call from
+    worker threads.
+    """
+    response = ors_client.post(f'v2/directions/{profile}', **route_request(coordinates))
+    return parse_route_response(coordinates, response)
+
+def parse_route_response(coordinates, response):
+    """
+    Read the route dictionary (see fetch_route) for the requested coordinates from a directions API
+    response (from requests or httpx).
+    """
     if response.status_code != 200:
         raise ValueError(f"Failed to calculate route: {response.text}")
 
@@ -79,23 +155,104 @@ def calculate_route(origin, destination):
 
     properties = features[0].get('properties', {})
     segments = properties.get('segments', [])
-    if not segments:
+    if len(segments) != len(coordinates) - 1:
         raise ValueError("No route segments found")
 
-    # Get total distance (in meters) and duration (in seconds)
-    distance = segments[0].get('distance', 0)  # meters
-    duration = segments[0].get('duration', 0)  # seconds
+    # One segment per leg, with distance (in meters) and duration (in seconds)
+    legs = [
+        {'distance': segment.get('distance', 0), 'duration': segment.get('duration', 0)}
+        for segment in segments
+    ]
+
+    # Indices of the requested coordinates in the waypoints, so each leg's geometry can be found
+    way_points = properties.get('way_points', [])
+    if len(way_points) == len(coordinates):
+        for leg, start, end in zip(legs, way_points, way_points[1:]):
+            leg['way_points'] = [start, end]
 
     # Get waypoints
     geometry = features[0].get('geometry', {})
     waypoints = geometry.get('coordinates', [])
 
     return {
-        'distance': distance,
-        'duration': duration,
-        'waypoints': waypoints
+        'distance': sum(leg['distance'] for leg in legs),
+        'duration': sum(leg['duration'] for leg in legs),
+        'waypoints': waypoints,
+        'legs': legs
+    }
+
+def calculate_multi_route(locations, profile='driving-hgv'):
+    """
+    Calculate a route through several locations with a single OpenRouteService directions request.
+    Returns a dictionary with total distance (in meters), total duration (in seconds), waypoints,
+    and a list of legs with the distance and duration between consecutive locations.
+    Results are cached per profile and rounded coordinate sequence.
+    """
+    get_api_key()
+
+    # Convert locations to coordinates if they're not already
+    coordinates = geocode_locations(locations)
+
+    cached = route_cache.get(coordinates, profile)
+    if cached is not None:
+        return cached
+
+    route = fetch_route(coordinates, profile)
+    route_cache.set(coordinates, profile, route)
+    return route
+
+def calculate_route(origin, destination, profile='driving-hgv'):
+    """
+    Calculate a route between two locations using OpenRouteService API.
+    Returns a dictionary with distance (in meters), duration (in seconds), and waypoints.
+    Results are cached per profile and rounded coordinate pair.
+    """
+    return calculate_multi_route([origin, destination], profile)
+
+def join_routes(first, second):
+    """
+    Join two routes where the second starts at the end of the first into one route,
+    shifting the second route's leg waypoint indices onto the joined waypoints.
+    """
+    if not first['waypoints'] or not second['waypoints']:
+        waypoints = []
+        offset = None
+    else:
+        waypoints = first['waypoints'] + second['waypoints'][1:]
+        offset = len(first['waypoints']) - 1
+
+    legs = list(first['legs'])
+    for leg in second['legs']:
+        leg = {'distance': leg['distance'], 'duration': leg['duration'], 'way_points': leg.get('way_points')}
+        if offset is None or leg['way_points'] is None:
+            del leg['way_points']
+        else:
+            leg['way_points'] = [index + offset for index in leg['way_points']]
+        legs.append(leg)
+
+    return {
+        'distance': first['distance'] + second['distance'],
+        'duration': first['duration'] + second['duration'],
+        'waypoints': waypoints,
+        'legs': legs
     }
 
+def calculate_trip_route(trip):
+    """
+    Route a trip from its current location through the pickup to the dropoff.
+    With TRIP_ROUTING_MODE 'multi_waypoint' (the default) the three locations are geocoded
+    concurrently and routed with one directions request; 'sequential' routes each leg separately.
+    Returns a route dictionary whose two legs are current->pickup and pickup->dropoff.
+    """
+    locations = [trip.current_location, trip.pickup_location, trip.dropoff_location]
+    if getattr(settings, 'TRIP_ROUTING_MODE', 'multi_waypoint') == 'sequential':
+        return join_routes(
+            calculate_route(locations[0], locations[1]),
+            calculate_route(locations[1], locations[2]),
+        )
+
+    return calculate_multi_route(locations)
+
 def meters_to_miles(meters):
     """Convert meters to miles"""
     return meters * 0.000621371
@@ -104,159 +261,185 @@ def seconds_to_hours(seconds):
     """Convert seconds to hours"""
     return seconds / 3600
 
-def generate_stops_for_trip(trip):
+def miles_to_meters(miles):
+    """Convert miles to meters"""
+    return miles / 0.000621371
+
+def plan_trip_route(trip):
     """
-    Generate stops for a trip, including pickup, dropoff, rest stops, and fuel stops.
+    Route a trip for stop planning.
+    Returns (route, route_index), where route_index is a RouteIndex over the route geometry,
+    or None if the route has no waypoints.
     """
-    # Calculate route from current location to pickup
     try:
-        current_to_pickup = calculate_route(trip.current_location, trip.pickup_location)
-        pickup_to_dropoff = calculate_route(trip.pickup_location, trip.dropoff_location)
+        route = calculate_trip_route(trip)
     except ValueError as e:
         raise ValueError(f"Error calculating route: {str(e)}")
+    return route, RouteIndex.from_route(route)
 
-    # Convert distances to miles and durations to hours
-    current_to_pickup_distance = meters_to_miles(current_to_pickup['distance'])
-    current_to_pickup_duration = seconds_to_hours(current_to_pickup['duration'])
-
-    pickup_to_dropoff_distance = meters_to_miles(pickup_to_dropoff['distance'])
-    pickup_to_dropoff_duration = seconds_to_hours(pickup_to_dropoff['duration'])
+def build_route_geometry(trip, route, precision=5):
+    """
+    Build the (unsaved) RouteGeometry of a trip from a route dictionary,
+    or return None if the route has no waypoints.
+    """
+    waypoints = route.get('waypoints') or []
+    if len(waypoints) < 2:
+        return None
+    return RouteGeometry(
+        trip=trip,
+        distance=route['distance'],
+        duration=route['duration'],
+        polyline=polyline.encode(waypoints, precision),
+        precision=precision,
+        point_count=len(waypoints),
+        legs=route['legs']
+    )
+
+# RouteGeometry columns compared before a stored geometry is rewritten
+ROUTE_GEOMETRY_FIELDS = ['distance', 'duration', 'polyline', 'precision', 'point_count', 'legs']
+
+def save_route_geometry(trip, route):
+    """Store the route geometry of a trip, leaving an identical stored geometry untouched"""
+    geometry = build_route_geometry(trip, route)
+    existing = RouteGeometry.objects.filter(trip=trip).first()
+    if geometry is None:
+        if existing is not None:
+            existing.delete()
+        return None
+    if existing is not None and all(getattr(existing, field) == getattr(geometry, field) for field in ROUTE_GEOMETRY_FIELDS):
+        return existing
+    geometry.save()
+    return geometry
+
+def generate_stops_for_trip(trip, route=None):
+    """
+    Generate stops for a trip, including pickup, dropoff, rest stops, and fuel stops.
+    The trip is routed first unless its route dictionary is given.
+    """
+    # Calculate the current->pickup and pickup->dropoff legs
+    if route is None:
+        route, route_index = plan_trip_route(trip)
+    else:
+        route_index = RouteIndex.from_route(route)
 
-    # Calculate total distance and update trip
-    total_distance = current_to_pickup_distance + pickup_to_dropoff_distance
-    trip.total_distance = total_distance
+    stops = build_stops_for_trip(trip, route['legs'][0], route['legs'][1], route_index)
     trip.save()
 
-    # Initialize variables
-    stops = []
-    current_time = trip.start_time
-    current_driving_hours = 0
-    current_duty_hours = 0
-    sequence = 1
+    # Save all stops and the route geometry
+    Stop.objects.bulk_create(stops)
+    save_route_geometry(trip, route)
 
-    # Add pickup stop
-    pickup_arrival_time = current_time + datetime.timedelta(hours=current_to_pickup_duration)
-    stops.append(Stop(
-        trip=trip,
-        location=trip.pickup_location,
-        type='pickup',
-        arrival_time=pickup_arrival_time,
-        duration=1.0,  # 1 hour for pickup
-        sequence=sequence
-    ))
-
-    # Update time and hours
-    current_time = pickup_arrival_time + datetime.timedelta(hours=1)
-    current_driving_hours += current_to_pickup_duration
-    current_duty_hours += current_to_pickup_duration + 1  # Driving + pickup time
-    sequence += 1
-
-    # Check if we need a rest stop after pickup
-    if current_driving_hours >= 8:
-        # Add a 30-minute break after 8 hours of driving
-        stops.append(Stop(
-            trip=trip,
-            location=trip.pickup_location,  # Break at the pickup location
-            type='break',
-            arrival_time=current_time,
-            duration=0.5,  # 30 minutes
-            sequence=sequence
-        ))
-        current_time += datetime.timedelta(hours=0.5)
-        current_duty_hours += 0.5
-        current_driving_hours = 0  # Reset driving hours after break
-        sequence += 1
-
-    # Check if we need a rest stop during the drive to dropoff
-    remaining_drive_time = pickup_to_dropoff_duration
-    current_location = trip.pickup_location
-
-    # If the remaining drive time would exceed 11 hours of driving or 14 hours on duty,
-    # we need to add rest stops
-    while remaining_drive_time > 0:
-        # How much more driving can be done before hitting limits
-        driving_limit = min(11 - current_driving_hours, 14 - current_duty_hours)
-
-        if driving_limit <= 0 or current_duty_hours >= 14:
-            # Need a 10-hour rest period (8 hours in sleeper berth + 2 hours off duty)
-            stops.append(Stop(
-                trip=trip,
-                location=current_location,
-                type='rest',
-                arrival_time=current_time,
-                duration=10.0,
-                sequence=sequence
-            ))
-            current_time += datetime.timedelta(hours=10)
-            current_driving_hours = 0
-            current_duty_hours = 0
-            sequence += 1
+    return stops
+
+def regenerate_stops_for_trip(trip):
+    """
+    Re-plan a trip's stops and apply them in place with sync_stops_for_trip.
+    Returns the moment from which the trip's duty timeline changed, or None if nothing changed.
+    """
+    route, route_index = plan_trip_route(trip)
+    return apply_trip_route(trip, route, route_index)
+
+def apply_trip_route(trip, route, route_index):
+    """
+    Save a routed trip with its geometry and sync its stops to the route (see regenerate_stops_for_trip).
+    The trip row is only saved if its distance changed. Makes no routing requests, so callers can
+    run it in a transaction with their own writes.
+    """
+    previous_distance = trip.total_distance
+    stops = build_stops_for_trip(trip, route['legs'][0], route['legs'][1], route_index)
+    with transaction.atomic():
+        if trip.total_distance != previous_distance:
+            trip.save(update_fields=['total_distance', 'updated_at'])
+        save_route_geometry(trip, route)
+        return sync_stops_for_trip(trip, stops)
+
+# Stop columns compared and rewritten when stops are synced
+STOP_SYNC_FIELDS = ['location', 'type', 'arrival_time', 'duration']
+
+def sync_stops_for_trip(trip, stops):
+    """
+    Make a trip's stored stops match a freshly built list, pairing them by sequence.
+    Changed stops are updated, new sequences inserted and leftover ones deleted; identical stops are
+    not touched. Returns the moment from which the trip's duty timeline changed (the end of the last
+    stop before the first change, or the trip start), or None if nothing changed.
+    """
+    existing = {stop.sequence: stop for stop in trip.stops.all()}
+    to_update = []
+    to_create = []
+    changed_since = None
+    previous_end = trip.start_time
+
+    for stop in sorted(stops, key=lambda stop: stop.sequence):
+        current = existing.pop(stop.sequence, None)
+        if current is None:
+            to_create.append(stop)
+        elif any(getattr(current, field) != getattr(stop, field) for field in STOP_SYNC_FIELDS):
+            for field in STOP_SYNC_FIELDS:
+                setattr(current, field, getattr(stop, field))
+            to_update.append(current)
+        elif changed_since is None:
+            previous_end = stop.arrival_time + datetime.timedelta(hours=stop.duration)
             continue
 
-        if driving_limit < remaining_drive_time:
-            # Drive as much as allowed, then add a rest stop
-            # For simplicity, we'll assume we can find a rest stop at the right time
-            drive_time = driving_limit
-            remaining_drive_time -= drive_time
-
-            # Update current location (simplified - in reality would need to find a point along the route)
-            # Here we just use the dropoff location as a placeholder
-            current_location = trip.dropoff_location
-
-            current_time += datetime.timedelta(hours=drive_time)
-            current_driving_hours += drive_time
-            current_duty_hours += drive_time
-
-            # Add a rest stop
-            stops.append(Stop(
-                trip=trip,
-                location=current_location,
-                type='rest',
-                arrival_time=current_time,
-                duration=10.0,  # 10-hour rest period
-                sequence=sequence
-            ))
-            current_time += datetime.timedelta(hours=10)
-            current_driving_hours = 0
-            current_duty_hours = 0
-            sequence += 1
-        else:
-            # Can complete the remaining drive without a rest
-            current_time += datetime.timedelta(hours=remaining_drive_time)
-            current_driving_hours += remaining_drive_time
-            current_duty_hours += remaining_drive_time
-            remaining_drive_time = 0
-
-    # Add fuel stops if the total distance is over 1000 miles
-    # For simplicity, we'll add one fuel stop for every 1000 miles
-    fuel_stops_needed = int(total_distance / 1000)
-    if fuel_stops_needed > 0:
-        # Simplified: add fuel stops at equal intervals
-        for i in range(fuel_stops_needed):
-            # Calculate a position along the route (simplified)
-            fuel_stop_location = trip.dropoff_location  # Placeholder
-
-            stops.append(Stop(
-                trip=trip,
-                location=fuel_stop_location,
-                type='fuel',
-                arrival_time=current_time - datetime.timedelta(hours=pickup_to_dropoff_duration / 2),  # Approximate middle of journey
-                duration=0.5,  # 30 minutes for fueling
-                sequence=sequence
-            ))
-            sequence += 1
-
-    # Add dropoff stop
-    stops.append(Stop(
-        trip=trip,
-        location=trip.dropoff_location,
-        type='dropoff',
-        arrival_time=current_time,
-        duration=1.0,  # 1 hour for dropoff
-        sequence=sequence
-    ))
-
-    # Save all stops
-    Stop.objects.bulk_create(stops)
+        if changed_since is None:
+            changed_since = previous_end
+
+    if existing and changed_since is None:
+        changed_since = previous_end
+
+    if to_update:
+        # bulk_update does not apply auto_now
+        now = timezone.now()
+        for stop in to_update:
+            stop.updated_at = now
+        Stop.objects.bulk_update(to_update, STOP_SYNC_FIELDS + ['updated_at'])
+    if to_create:
+        Stop.objects.bulk_create(to_create)
+    if existing:
+        Stop.objects.filter(pk__in=[stop.pk for stop in existing.values()]).delete()
+
+    return changed_since
 
-    return stops
\ No newline at end of file
+def build_stops_for_trip(trip, current_to_pickup, pickup_to_dropoff, route_index=None):
+    """
+    Build the (unsaved) stops for a trip from its current->pickup and pickup->dropoff legs,
+    applying the HOS driving and on-duty limits. Sets trip.total_distance but does not save the trip.
+
+    The schedule itself comes from trips.hos.plan_schedule. With a RouteIndex over the trip's route
+    geometry, fuel stops are due where the route reaches each 1000-mile mark and rest and fuel stops
+    are placed at their coordinates along the route; without one they are labelled with the location
+    the leg is heading to.
+    """
+    # Convert distances to miles and durations to hours
+    to_pickup = Leg(meters_to_miles(current_to_pickup['distance']), seconds_to_hours(current_to_pickup['duration']))
+    to_dropoff = Leg(meters_to_miles(pickup_to_dropoff['distance']), seconds_to_hours(pickup_to_dropoff['duration']))
+
+    fuel_due = None
+    if route_index is not None:
+        fuel_meters = [miles_to_meters(miles) for miles in fuel_stop_miles(to_pickup.distance + to_dropoff.distance)]
+        fuel_due = [seconds_to_hours(seconds) for seconds in route_index.times_at_distances(fuel_meters)]
+
+    schedule = plan_schedule(to_pickup, to_dropoff, fuel_due)
+    trip.total_distance = schedule.total_distance
+
+    # Pickups, breaks and dropoffs happen at the trip's locations; rests and fuel stops along the way
+    destinations = (trip.pickup_location, trip.dropoff_location)
+    locations = {'pickup': trip.pickup_location, 'break': trip.pickup_location, 'dropoff': trip.dropoff_location}
+    en_route = [stop for stop in schedule.stops if stop.type not in locations]
+    if route_index is not None and en_route:
+        positions = route_index.positions_at_times([stop.driven * 3600 for stop in en_route])
+        en_route_locations = {id(stop): format_coordinates(*position) for stop, position in zip(en_route, positions)}
+    else:
+        en_route_locations = {id(stop): destinations[stop.leg] for stop in en_route}
+
+    return [
+        Stop(
+            trip=trip,
+            location=locations.get(stop.type) or en_route_locations[id(stop)],
+            type=stop.type,
+            arrival_time=trip.start_time + datetime.timedelta(hours=stop.start),
+            duration=stop.duration,
+            sequence=sequence
+        )
+        for sequence, stop in enumerate(schedule.stops, start=1)
+    ]
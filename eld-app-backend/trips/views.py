@@ -3,17 +3,164 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from .models import Trip, Stop
-from .serializers import TripSerializer, TripCreateSerializer, StopSerializer
-from .utils import generate_stops_for_trip
-from eld_logs.utils import generate_eld_logs_for_trip
-from eld_logs.serializers import ELDLogSerializer
+from django.urls import reverse
+import datetime
+import math
+from django.utils import timezone
+from django.utils.http import parse_etags
+from .models import Driver, Trip, Stop, RouteGeometry
+from . import polyline
+from django.db import transaction
+from django.db.models import Prefetch
+from .serializers import (
+    DriverSerializer, TripSerializer, TripCreateSerializer, StopSerializer, PlannedStopSerializer,
+    PlanningJobSerializer, get_requested_fields
+)
+from .utils import generate_stops_for_trip, plan_trip_route, apply_trip_route
+from .planning import enqueue_trip_planning, get_planning_config
+from .bulk import create_trips_in_bulk, plan_trips_in_bulk
+from .responsecache import response_cache
+from eld_logs.utils import generate_eld_logs_for_trip, sync_eld_logs_for_trip, refresh_driver_logs
+from eld_logs.serializers import ELDLogSerializer, PlannedELDLogSerializer
+from eld_logs.ledger import CYCLE_LIMIT_HOURS, get_cycle_hours_used, refresh_hos_snapshots
+from eld_app.pagination import KeysetPagination
+
+class TripPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+def validate_trip_payload(data, request_name='plan', allow_single=True):
+    """
+    Validate the body of a plan or bulk request: a non-empty list of trips, or a single trip if
+    allow_single is set.
+    Returns (item_errors, items): the validation errors of every submitted trip ({} if valid) and
+    the validated data of the valid ones. Raises ValueError if the body itself is unusable.
+    """
+    max_items = get_planning_config()['BULK_MAX_ITEMS']
+    payload = [data] if allow_single and isinstance(data, dict) else data
+    if not isinstance(payload, list) or not payload:
+        expected = "a trip or a non-empty list of trips" if allow_single else "a non-empty list of trips"
+        raise ValueError(f"Expected {expected}")
+    if len(payload) > max_items:
+        raise ValueError(f"A {request_name} request can contain at most {max_items} trips")
+
+    serializer = TripCreateSerializer(data=payload, many=True)
+    if serializer.is_valid():
+        return [{} for _ in payload], list(serializer.validated_data)
+    # Validate each valid item on its own so the rest can still be planned
+    item_errors = serializer.errors
+    items = [
+        serializer.child.run_validation(item)
+        for item, errors in zip(payload, item_errors) if not errors
+    ]
+    return item_errors, items
+
+def plan_results(item_errors, planned):
+    """
+    Build the body and status of a plan response from the validation errors of every submitted
+    trip and the planning outcomes of the valid ones (see plan_trips_in_bulk).
+    """
+    planned = iter(planned)
+    results = []
+    for index, errors in enumerate(item_errors):
+        if errors:
+            results.append({'index': index, 'status': 'failed', 'errors': errors})
+            continue
+        outcome = next(planned)
+        if 'error' in outcome:
+            results.append({'index': index, 'status': 'failed', 'error': outcome['error']})
+            continue
+        trip, stops = outcome['trip'], outcome['stops']
+        dropoff = stops[-1]
+        results.append({
+            'index': index,
+            'status': 'planned',
+            'total_distance': trip.total_distance,
+            'start_time': trip.start_time,
+            'estimated_arrival': dropoff.arrival_time,
+            'estimated_completion': dropoff.arrival_time + datetime.timedelta(hours=dropoff.duration),
+            'stops': PlannedStopSerializer(stops, many=True).data,
+            'eld_logs': PlannedELDLogSerializer(outcome['logs'], many=True).data,
+        })
+
+    planned_count = sum(1 for result in results if result['status'] == 'planned')
+    if planned_count == len(results):
+        response_status = status.HTTP_200_OK
+    elif planned_count:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_400_BAD_REQUEST
+    return (
+        {'planned': planned_count, 'failed': len(results) - planned_count, 'results': results},
+        response_status
+    )
+
+class DriverViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for drivers.
+    """
+    queryset = Driver.objects.all()
+    serializer_class = DriverSerializer
+
+    def perform_create(self, serializer):
+        driver = serializer.save()
+        # New drivers start with a full set of hours in the availability snapshot
+        refresh_hos_snapshots([driver.pk])
+
+    @action(detail=True, methods=['get'])
+    def cycle(self, request, pk=None):
+        """
+        Hours used and remaining in the driver's 70-hour/8-day cycle on a date (default today),
+        read from the cycle ledger.
+        """
+        driver = self.get_object()
+        date = request.query_params.get('date', None)
+        if date is None:
+            date = timezone.now().date()
+        else:
+            try:
+                date = datetime.date.fromisoformat(date)
+            except ValueError:
+                return Response(
+                    {"error": "date must be in YYYY-MM-DD format"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        used = get_cycle_hours_used(driver.pk, date)
+        return Response({
+            'driver': driver.pk,
+            'date': date,
+            'cycle_hours_used': used,
+            'cycle_hours_remaining': max(0.0, CYCLE_LIMIT_HOURS - used),
+        })
 
 class TripViewSet(viewsets.ModelViewSet):
     """
     API endpoint for trips.
     """
     queryset = Trip.objects.all()
+    pagination_class = TripPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+
+        # Only load the columns the response will contain
+        requested = get_requested_fields(self.request)
+        trip_fields = [
+            name for name in TripSerializer.Meta.fields
+            if name != 'stops' and (requested is None or name in requested)
+        ]
+        # The pagination ordering is always loaded too, as next/previous cursors are built from it
+        ordering_fields = [field.lstrip('-') for field in self.pagination_class.ordering]
+        queryset = queryset.only('id', *ordering_fields, *trip_fields)
+
+        # Load all stops in one ordered query instead of one query per trip
+        if requested is None or 'stops' in requested:
+            # (ordering by trip first lets the (trip, sequence) index serve the sort)
+            stops = Stop.objects.only('trip_id', *StopSerializer.Meta.fields).order_by('trip_id', 'sequence')
+            queryset = queryset.prefetch_related(Prefetch('stops', queryset=stops))
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -27,6 +174,19 @@ class TripViewSet(viewsets.ModelViewSet):
         # Create the trip
         trip = serializer.save()
 
+        if self.use_async_planning(request):
+            # Plan in the background and let the client poll the job status
+            job = enqueue_trip_planning(trip)
+            return Response(
+                {
+                    'job_id': job.id,
+                    'trip_id': trip.id,
+                    'status': job.status,
+                    'status_url': reverse('trip-planning-status', kwargs={'pk': trip.pk}),
+                },
+                status=status.HTTP_202_ACCEPTED
+            )
+
         try:
             # Generate stops for the trip
             stops = generate_stops_for_trip(trip)
@@ -45,39 +205,230 @@ class TripViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    def cached_trip_response(self, request, pk, view, render):
+        """
+        Serve a trip's response from the response cache, keyed on the trip's version.
+        A matching If-None-Match gets a 304 without serializing anything; otherwise render() builds
+        the response data on a cache miss.
+        """
+        try:
+            trip = Trip.objects.filter(pk=pk).values_list('pk', 'version', 'created_at').first()
+        except (TypeError, ValueError):
+            trip = None
+        if trip is None:
+            # Let the view raise its usual 404
+            return Response(render())
+
+        etag = response_cache.etag(trip, view, request.query_params)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response_cache.not_modified()
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = response_cache.make_key(trip, view, request.query_params)
+            data = response_cache.get(key)
+            if data is None:
+                data = render()
+                response_cache.set(key, data)
+            response = Response(data)
+        response['ETag'] = etag
+        # Clients may keep the response but must revalidate it before reuse
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_trip_response(
+            request, kwargs['pk'], 'retrieve',
+            lambda: self.get_serializer(self.get_object()).data
+        )
+
+    def perform_update(self, serializer):
+        previous_driver_id = serializer.instance.driver_id
+        trip = serializer.save()
+        if trip.driver_id != previous_driver_id:
+            # Move the trip's hours from one driver's cycle ledger to the other's
+            dates = list(trip.eld_logs.values_list('date', flat=True))
+            refresh_driver_logs(previous_driver_id, dates)
+            refresh_driver_logs(trip.driver_id, dates)
+
+    def perform_destroy(self, instance):
+        dates = list(instance.eld_logs.values_list('date', flat=True))
+        driver_id = instance.driver_id
+        instance.delete()
+        refresh_driver_logs(driver_id, dates)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create and plan many trips in one request.
+        Returns one result per submitted trip so partial failures can be reported.
+        """
+        try:
+            item_errors, items = validate_trip_payload(request.data, 'bulk', allow_single=False)
+            planned = iter(create_trips_in_bulk(items) if items else [])
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = []
+        for index, errors in enumerate(item_errors):
+            if errors:
+                results.append({'index': index, 'status': 'failed', 'errors': errors})
+                continue
+            outcome = next(planned)
+            if 'error' in outcome:
+                results.append({'index': index, 'status': 'failed', 'error': outcome['error']})
+            else:
+                results.append({'index': index, 'status': 'created', 'trip_id': outcome['trip'].id})
+
+        created_ids = [result['trip_id'] for result in results if result['status'] == 'created']
+        trips = Trip.objects.filter(pk__in=created_ids).prefetch_related('stops')
+        trip_data = {trip.id: TripSerializer(trip).data for trip in trips}
+        for result in results:
+            if result['status'] == 'created':
+                result['trip'] = trip_data[result.pop('trip_id')]
+
+        if len(created_ids) == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif created_ids:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {'created': len(created_ids), 'failed': len(results) - len(created_ids), 'results': results},
+            status=response_status
+        )
+
+    @action(detail=False, methods=['post'])
+    def plan(self, request):
+        """
+        Dry-run planning of one trip or a list of candidate trips: returns the stops, ELD day
+        breakdown, total distance and ETA of each without saving anything.
+        """
+        try:
+            item_errors, items = validate_trip_payload(request.data)
+            planned = plan_trips_in_bulk(items) if items else []
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data, response_status = plan_results(item_errors, planned)
+        return Response(data, status=response_status)
+
+    def use_async_planning(self, request):
+        """
+        Plan asynchronously if requested with ?async=true, falling back to the TRIP_PLANNING setting.
+        """
+        requested = request.query_params.get('async', None)
+        if requested is not None:
+            return requested.lower() in ('1', 'true', 'yes')
+        return get_planning_config()['ASYNC']
+
+    @action(detail=True, methods=['get'], url_path='planning-status')
+    def planning_status(self, request, pk=None):
+        """
+        Get the status of the latest planning job for a trip.
+        """
+        trip = self.get_object()
+        job = trip.planning_jobs.order_by('-created_at').first()
+        if job is None:
+            return Response(
+                {"error": "No planning job found for this trip"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        serializer = PlanningJobSerializer(job)
+        return Response(serializer.data)
+
     @action(detail=True, methods=['get'])
     def stops(self, request, pk=None):
         """
         Get all stops for a trip.
         """
-        trip = self.get_object()
-        stops = trip.stops.all().order_by('sequence')
-        serializer = StopSerializer(stops, many=True)
-        return Response(serializer.data)
+        def render():
+            stops = self.get_object().stops.all().order_by('sequence')
+            return StopSerializer(stops, many=True).data
+        return self.cached_trip_response(request, pk, 'stops', render)
 
     @action(detail=True, methods=['get'])
     def eld_logs(self, request, pk=None):
         """
         Get all ELD logs for a trip.
         """
+        def render():
+            logs = self.get_object().eld_logs.all().order_by('date')
+            return ELDLogSerializer(logs, many=True).data
+        return self.cached_trip_response(request, pk, 'eld_logs', render)
+
+    @action(detail=True, methods=['get'])
+    def route(self, request, pk=None):
+        """
+        Get the stored route geometry of a trip as an encoded polyline ("route" is null if the trip
+        has none). Pass tolerance=<meters> to simplify it server-side with Douglas-Peucker, and
+        encoding=coordinates to get a list of [longitude, latitude] pairs instead of a polyline.
+        """
         trip = self.get_object()
-        logs = trip.eld_logs.all().order_by('date')
-        serializer = ELDLogSerializer(logs, many=True)
-        return Response(serializer.data)
+
+        try:
+            tolerance = float(request.query_params.get('tolerance', 0))
+        except ValueError:
+            tolerance = -1
+        if not math.isfinite(tolerance) or tolerance < 0:
+            return Response(
+                {"error": "tolerance must be a non-negative number of meters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        encoding = request.query_params.get('encoding', 'polyline')
+        if encoding not in ('polyline', 'coordinates'):
+            return Response(
+                {"error": "encoding must be polyline or coordinates"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        geometry = RouteGeometry.objects.filter(trip=trip).first()
+        if geometry is None:
+            return Response({'trip': trip.pk, 'route': None})
+
+        route = {
+            'distance': geometry.distance,
+            'duration': geometry.duration,
+            'legs': geometry.legs,
+            'tolerance': tolerance,
+        }
+        if tolerance == 0 and encoding == 'polyline':
+            # Serve the stored encoding as is
+            route.update(point_count=geometry.point_count, polyline=geometry.polyline, precision=geometry.precision)
+        else:
+            coordinates = geometry.coordinates
+            if tolerance > 0:
+                coordinates = polyline.simplify(coordinates, tolerance)
+            route['point_count'] = len(coordinates)
+            if encoding == 'polyline':
+                route.update(polyline=polyline.encode(coordinates, geometry.precision), precision=geometry.precision)
+            else:
+                route['coordinates'] = coordinates
+
+        return Response({'trip': trip.pk, 'route': route})
 
     @action(detail=True, methods=['post'])
     def regenerate_stops(self, request, pk=None):
         """
         Regenerate stops for a trip.
+        Stops are updated in place, and ELD logs are refreshed from the first day that changed.
         """
         trip = self.get_object()
 
-        # Delete existing stops
-        trip.stops.all().delete()
-
         try:
-            # Generate new stops
-            stops = generate_stops_for_trip(trip)
+            # Route first, then apply the new stops and update the logs they affect in one transaction
+            route, route_index = plan_trip_route(trip)
+            with transaction.atomic():
+                # A changed distance saves, and so bumps, the trip; stops and logs are bulk-written
+                changed_since = apply_trip_route(trip, route, route_index)
+                if changed_since is not None:
+                    sync_eld_logs_for_trip(trip, since=changed_since)
+                    trip.bump_version()
 
             # Return the updated trip
             serializer = TripSerializer(trip)
@@ -92,15 +443,15 @@ class TripViewSet(viewsets.ModelViewSet):
     def regenerate_eld_logs(self, request, pk=None):
         """
         Regenerate ELD logs for a trip.
+        Only logs that changed are rewritten; unchanged days are left untouched.
         """
         trip = self.get_object()
 
-        # Delete existing logs
-        trip.eld_logs.all().delete()
-
         try:
-            # Generate new logs
-            logs = generate_eld_logs_for_trip(trip)
+            # Upsert the logs that differ from the stored ones
+            counts = sync_eld_logs_for_trip(trip)
+            if counts['written'] or counts['deleted']:
+                trip.bump_version()
 
             # Return the updated trip
             serializer = TripSerializer(trip)